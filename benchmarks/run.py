@@ -0,0 +1,347 @@
+"""Benchmark parsing, storing, querying & reporting at several statement sizes.
+
+For each size a synthetic statement is generated (see `statement_generator.py`), then
+every stage is timed `--repeat` times:-
+
+    * `PDFParser.parse` (parsed records are checked against generated records).
+    * `Mutation.insert_transactions` & `Mutation.bulk_insert_transactions`, each on
+      empty tables.
+    * Every `Query` method, on `Transaction` table & on rollup tables.
+    * Point queries called `_REPEATED_CALLS` times in a row (statement building,
+      compilation & connection checkout of each call).
+    * `ReportGenerator` & `SQLReportGenerator` reports.
+
+Results are written as json (one entry per stage & size), a previous result file can
+be given with `--baseline` to print the change of every stage, eg: between commits.
+
+A throwaway database `--db-name` is created on the given postgres server (a local
+server or a disposable cluster) and dropped after the run, it should not exist. With
+`--sqlite`, an embedded database file is created instead (see `Init.sqlite`), a
+postgres result given as `--baseline` compares both backends.
+
+    Usage:-
+
+    python -m benchmarks.run --db-user nick --pages 1 10 50 --output head.json \
+        --baseline main.json
+    python -m benchmarks.run --sqlite /tmp/benchmark.db --baseline head.json
+"""
+from typing import List, Optional, Callable, Dict, Tuple, Any
+from datetime import date, datetime, timezone
+from statistics import median
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+from sqlalchemy import Engine, text
+
+from benchmarks.statement_generator import generate_statement
+from pdfparser.datastructure import TransactionRecord, PoolSettings
+from pdfparser.pdf_parser import PDFParser
+from pdfparser.report_generator import ReportGenerator, SQLReportGenerator
+from pdfparser.store import Init, Mutation, Query
+
+_DEFAULT_PAGES: Tuple[int, ...] = (1, 10, 50)
+_DEFAULT_REPEAT: int = 3
+_DEFAULT_DB_NAME: str = "pdfparser_benchmark"
+_TRUNCATE_TABLES: str = (
+    'truncate "Transaction", "BrokerDailyRollup", "DailyRollup", "IngestionLedger" '
+    "restart identity"
+)
+_SQLITE_TABLES: Tuple[str, ...] = (
+    "Transaction",
+    "BrokerDailyRollup",
+    "DailyRollup",
+    "IngestionLedger",
+)
+# Calls of a point query timed as one stage.
+_REPEATED_CALLS: int = 1000
+# Change (of median time) above this ratio is marked as a regression.
+_REGRESSION_RATIO: float = 1.1
+
+
+def run_suite(
+    db_constructor: Init,
+    pages: List[int],
+    rows_per_page: int,
+    edge_case_share: float,
+    engine: str = "tabula",
+    repeat: int = _DEFAULT_REPEAT,
+) -> dict:
+    """Time every stage for each statement size in `pages`, on an existing empty
+    database.
+    """
+    results: List[dict] = []
+    db_engine: Engine = db_constructor.create_engine()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for page_count in pages:
+                path: str = os.path.join(tmp_dir, f"statement_{page_count}.pdf")
+                with open(path, "wb") as file:
+                    expected: List[TransactionRecord] = generate_statement(
+                        file, page_count, rows_per_page, edge_case_share
+                    )
+                size: dict = {"pages": page_count, "rows": len(expected)}
+                for name, timing in _time_stages(
+                    db_engine, path, expected, engine, repeat
+                ):
+                    results.append({**size, "name": name, **timing})
+    finally:
+        db_engine.dispose()
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            "backend": db_engine.dialect.name,
+            "engine": engine,
+            "rows_per_page": rows_per_page,
+            "edge_case_share": edge_case_share,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _time_stages(
+    db_engine: Engine,
+    path: str,
+    expected: List[TransactionRecord],
+    engine: str,
+    repeat: int,
+) -> List[Tuple[str, dict]]:
+    """(name, timing) of every stage for a statement."""
+
+    def parse() -> List[TransactionRecord]:
+        with open(path, "rb") as file:
+            return PDFParser(file, engine=engine).parse()
+
+    if parse() != expected:
+        raise RuntimeError(f"Parsed records of {path} differ from generated records.")
+    timings: List[Tuple[str, dict]] = [("parse", _timed(parse, repeat))]
+
+    mutation: Mutation = Mutation(db_engine, maintain_rollups=True)
+    for name, insert in (
+        ("insert_transactions", mutation.insert_transactions),
+        ("bulk_insert_transactions", mutation.bulk_insert_transactions),
+    ):
+        timings.append(
+            (name, _timed(lambda: insert(expected), repeat, _truncate(db_engine)))
+        )
+
+    # Tables hold the statement from here.
+    period: Tuple[date, date] = (
+        min(record.settlement_date for record in expected),
+        max(record.settlement_date for record in expected),
+    )
+    broker: str = expected[0].broker
+    # Batch apis against a call per day / broker.
+    days: List[Tuple[date, date]] = [
+        (day, day) for day in sorted({record.settlement_date for record in expected})
+    ]
+    brokers: List[str] = sorted({record.broker for record in expected})
+    for label, query in (
+        ("query", Query(db_engine)),
+        ("query[rollups]", Query(db_engine, use_rollups=True)),
+    ):
+        stages: Dict[str, Callable[[], Any]] = {
+            "get_loan_amount": lambda: query.get_loan_amount(*period),
+            "get_highest_loan_amt_by_broker": lambda: (
+                query.get_highest_loan_amt_by_broker(broker)
+            ),
+            "get_loan_amount[each day]": lambda: [
+                query.get_loan_amount(*day) for day in days
+            ],
+            "get_loan_amounts[each day]": lambda: query.get_loan_amounts(days),
+            "get_highest_loan_amt_by_broker[each broker]": lambda: [
+                query.get_highest_loan_amt_by_broker(name) for name in brokers
+            ],
+            "get_highest_loan_amt_by_brokers": lambda: (
+                query.get_highest_loan_amt_by_brokers(brokers)
+            ),
+            "get_ingestion": lambda: query.get_ingestion("0" * 64),
+            f"get_loan_amount[{_REPEATED_CALLS} calls]": lambda: [
+                query.get_loan_amount(*period) for _ in range(_REPEATED_CALLS)
+            ],
+            f"get_highest_loan_amt_by_broker[{_REPEATED_CALLS} calls]": lambda: [
+                query.get_highest_loan_amt_by_broker(broker)
+                for _ in range(_REPEATED_CALLS)
+            ],
+            f"get_ingestion[{_REPEATED_CALLS} calls]": lambda: [
+                query.get_ingestion("0" * 64) for _ in range(_REPEATED_CALLS)
+            ],
+            "get_broker_level_loan_amount_with_date": (
+                query.get_broker_level_loan_amount_with_date
+            ),
+            "get_total_loan_amount_by_date": query.get_total_loan_amount_by_date,
+            "get_tier_level_loan_count_by_date": (
+                query.get_tier_level_loan_count_by_date
+            ),
+            **{
+                f"get_broker_loan_amounts_by_period[{period_name}]": (
+                    lambda period_name=period_name: (
+                        query.get_broker_loan_amounts_by_period(period_name)
+                    )
+                )
+                for period_name in ("day", "week", "month")
+            },
+        }
+        timings.extend(
+            (f"{label}.{name}", _timed(stage, repeat)) for name, stage in stages.items()
+        )
+
+        # `ReportGenerator` fetches all loan amounts while initialised.
+        timings.append(
+            (
+                f"{label}.ReportGenerator.__init__",
+                _timed(lambda: ReportGenerator(query), repeat),
+            )
+        )
+        for generator in (ReportGenerator(query), SQLReportGenerator(query)):
+            timings.extend(
+                (
+                    f"{label}.{type(generator).__name__}.{report}",
+                    _timed(getattr(generator, report), repeat),
+                )
+                for report in (
+                    "generate_broker_report",
+                    "generate_total_loan_report",
+                    "generate_tier_level_report",
+                )
+            )
+    return timings
+
+
+def _timed(
+    func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None
+) -> dict:
+    """Wall time (seconds) of `repeat` calls, `setup` is called before each call
+    (not timed).
+    """
+    runs: List[float] = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start: float = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": median(runs), "runs": runs}
+
+
+def _truncate(db_engine: Engine) -> Callable[[], None]:
+    """Setup which empties all tables."""
+
+    def truncate() -> None:
+        with db_engine.connect() as conn:
+            if db_engine.dialect.name == "sqlite":
+                # No `truncate` in SQLite, ids restart if a table is empty.
+                for table in _SQLITE_TABLES:
+                    conn.execute(text(f'delete from "{table}"'))
+            else:
+                conn.execute(text(_TRUNCATE_TABLES))
+
+    return truncate
+
+
+def _git_commit() -> Optional[str]:
+    """Current commit of the working directory, `None` if not in a git repository."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """Lines with change of median time of every stage found in both results."""
+    before: Dict[Tuple[int, str], float] = {
+        (result["pages"], result["name"]): result["median"]
+        for result in baseline["results"]
+    }
+    lines: List[str] = []
+    for result in current["results"]:
+        key: Tuple[int, str] = (result["pages"], result["name"])
+        if key not in before:
+            continue
+        ratio: float = result["median"] / before[key] if before[key] else 1.0
+        lines.append(
+            f"{result['pages']:>4} pages  {result['name']:<70} "
+            f"{before[key]:>9.4f}s -> {result['median']:>9.4f}s  x{ratio:.2f}"
+            + ("  REGRESSION" if ratio > _REGRESSION_RATIO else "")
+        )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Benchmark parse, insert, query & report stages."
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=list(_DEFAULT_PAGES))
+    parser.add_argument("--rows-per-page", type=int, default=42)
+    parser.add_argument("--edge-case-share", type=float, default=0.2)
+    parser.add_argument("--engine", choices=("tabula", "positional"), default="tabula")
+    parser.add_argument("--repeat", type=int, default=_DEFAULT_REPEAT)
+    parser.add_argument("--output", help="Result json file (printed if not given).")
+    parser.add_argument("--baseline", help="Result json file to compare with.")
+    parser.add_argument(
+        "--sqlite", help="Embedded database file, instead of a postgres server."
+    )
+    parser.add_argument("--db-user")
+    parser.add_argument("--db-password", default="")
+    parser.add_argument("--db-host", default="localhost")
+    parser.add_argument("--db-port", type=int, default=5432)
+    parser.add_argument("--db-name", default=_DEFAULT_DB_NAME)
+    parser.add_argument(
+        "--prepare-threshold",
+        type=int,
+        help="Prepare statements on the server (psycopg driver, see `PoolSettings`).",
+    )
+    args: argparse.Namespace = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat should be a positive integer.")
+    if not args.sqlite and not args.db_user:
+        parser.error("--db-user is required without --sqlite.")
+
+    pool: PoolSettings = PoolSettings(prepare_threshold=args.prepare_threshold)
+    db_constructor: Init = (
+        Init.sqlite(args.sqlite, pool)
+        if args.sqlite
+        else Init(
+            args.db_user,
+            args.db_password,
+            args.db_host,
+            args.db_port,
+            args.db_name,
+            pool,
+        )
+    )
+    db_constructor.create_db()
+    try:
+        result: dict = run_suite(
+            db_constructor,
+            args.pages,
+            args.rows_per_page,
+            args.edge_case_share,
+            args.engine,
+            args.repeat,
+        )
+    finally:
+        db_constructor.drop_db()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+    if args.baseline:
+        with open(args.baseline) as file:
+            print("\n".join(compare(json.load(file), result)))
+
+
+if __name__ == "__main__":
+    main()
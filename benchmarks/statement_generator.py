@@ -0,0 +1,298 @@
+"""Generate synthetic statement pdfs in the predefined layout (see `pdf_parser.py`).
+
+Pages are written directly as pdf objects with the standard Helvetica font, columns
+are placed at the same positions as in `tests/transaction.pdf`. A share of rows are
+edge cases, which are found in real statements:-
+
+    * Thousands separators in every amount column (eg: 204,550.00 & 1,075.99).
+    * Missing sub broker.
+    * Borrower name running into description (extracted as a single cell).
+
+NOTE: tabula separates columns by the gaps found on a page, if no borrower name runs
+into description (eg: `edge_case_share` 0) borrower name & description are extracted
+as separate cells, which are rejected by `RecordConverter`.
+
+    Usage:-
+
+    python -m benchmarks.statement_generator /tmp/statement.pdf --pages 50
+"""
+from typing import List, Optional, Tuple, BinaryIO
+from datetime import date, timedelta
+import argparse
+import random
+import zlib
+
+from pdfparser.datastructure import TransactionRecord
+
+_PAGE_WIDTH: float = 1093.56
+_PAGE_HEIGHT: float = 772.99
+_FONT_SIZE: float = 10.0
+_HEADER_Y: Tuple[float, float] = (710.32, 695.82)
+_FIRST_ROW_Y: float = 681.17
+_ROW_HEIGHT: float = 14.49
+_MAX_ROWS_PER_PAGE: int = 45
+_DEFAULT_ROWS_PER_PAGE: int = 42
+_DEFAULT_EDGE_CASE_SHARE: float = 0.2
+# x position of each column, amounts are right aligned to their column end.
+_APP_ID_X: float = 37.581
+_XREF_X: float = 87.295
+_SETTLEMENT_DATE_X: float = 144.98
+_BROKER_X: float = 206.69
+_SUB_BROKER_X: float = 425.52
+_BORROWER_NAME_X: float = 531.36
+_DESCRIPTION_X: float = 704.53
+_TOTAL_LOAN_AMOUNT_END: float = 908.0
+_COMM_RATE_END: float = 945.0
+_UPFRONT_END: float = 1000.0
+_UPFRONT_INCL_GST_END: float = 1066.0
+# (x, upper line, lower line) of column labels, some labels are on two lines.
+_HEADER: Tuple[Tuple[float, str, str], ...] = (
+    (_APP_ID_X, "", "App ID"),
+    (_XREF_X, "", "Xref"),
+    (_SETTLEMENT_DATE_X, "Settlement ", "Date"),
+    (_BROKER_X, "", "Broker"),
+    (_SUB_BROKER_X, "", "Sub Broker"),
+    (_BORROWER_NAME_X, "", "Borrower Name"),
+    (_DESCRIPTION_X, "", "Description"),
+    (849.64, "Total Loan ", "Amount "),
+    (913.69, "Comm ", "Rate"),
+    (951.43, "", "Upfront"),
+    (1003.48, "Upfront Incl ", "GST"),
+)
+# Helvetica glyph widths (1/1000 of font size), others are taken as
+# `_DEFAULT_GLYPH_WIDTH`.
+_GLYPH_WIDTHS: dict = {
+    **dict.fromkeys("0123456789", 556),
+    **dict.fromkeys(" ,./'", 278),
+    **dict(zip("ABCDEFGHIJKLMNOPQRSTUVWXYZ", (667, 667, 722, 722, 667, 611, 778,
+        722, 278, 500, 667, 556, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667,
+        944, 667, 667, 611))),
+    **dict(zip("abcdefghijklmnopqrstuvwxyz", (556, 556, 500, 556, 556, 278, 556,
+        556, 222, 222, 500, 222, 833, 556, 556, 556, 556, 333, 500, 278, 556, 500,
+        722, 500, 500, 500))),
+}  # fmt: skip
+_DEFAULT_GLYPH_WIDTH: int = 556
+_BROKERS: Tuple[str, ...] = (
+    "Cheston La'Porte",
+    "Auswide Financial Solutions Pty Ltd",
+    "Trevor Wright",
+    "Demi McAndrew",
+    "Stratton Finance VIC",
+    "Aagam Pabari",
+    "Rhiannon Clancy-Burns",
+    "Loan Market Brisbane",
+)
+_SUB_BROKERS: Tuple[str, ...] = (
+    "Carole Leedham",
+    "Mohammad Jamshed",
+    "Sarah Kim",
+    "Liam O'Brien",
+)
+_FIRST_NAMES: Tuple[str, ...] = (
+    "CHELSEA", "ALANA", "JEREMY", "ANGUS", "BRENDEN", "SARA", "ANJAN", "OLIVIA",
+)  # fmt: skip
+_LAST_NAMES: Tuple[str, ...] = (
+    "VANDERAA", "MANZOTTI", "TREGUER", "THOMPSON", "WOOD", "FLOWER", "GUPTA",
+)  # fmt: skip
+_MIDDLE_NAMES: Tuple[str, ...] = ("JO", "LEE", "MAY", "ANN", "KAI")
+_DESCRIPTION: str = "Upfront Commission"
+_COMM_RATE: float = 1.8
+_GST_RATE: float = 0.1
+_FIRST_SETTLEMENT_DATE: date = date(2023, 10, 2)
+_SETTLEMENT_DAYS: int = 60
+_FIRST_APP_ID: int = 80_100_000
+_FIRST_XREF: int = 100_300_000
+
+
+def generate_statement(
+    file: BinaryIO,
+    pages: int,
+    rows_per_page: int = _DEFAULT_ROWS_PER_PAGE,
+    edge_case_share: float = _DEFAULT_EDGE_CASE_SHARE,
+    seed: Optional[int] = 0,
+) -> List[TransactionRecord]:
+    """Write a statement pdf of `pages` pages to `file`, return its records.
+
+    Each edge case is present in about `edge_case_share` (0 to 1) of the rows.
+    Records are unique (xref + total-loan-amount), same `seed` writes the same pdf.
+    """
+    if pages < 1:
+        raise ValueError("pages should be a positive integer.")
+    if not 1 <= rows_per_page <= _MAX_ROWS_PER_PAGE:
+        raise ValueError(f"rows_per_page should be from 1 to {_MAX_ROWS_PER_PAGE}.")
+    if not 0 <= edge_case_share <= 1:
+        raise ValueError("edge_case_share should be from 0 to 1.")
+
+    rand: random.Random = random.Random(seed)
+    records: List[TransactionRecord] = [
+        _random_record(rand, row, edge_case_share)
+        for row in range(pages * rows_per_page)
+    ]
+    contents: List[bytes] = [
+        _page_content(records[start : start + rows_per_page])
+        for start in range(0, len(records), rows_per_page)
+    ]
+    _write_pdf(file, contents)
+    return records
+
+
+def _random_record(
+    rand: random.Random, row: int, edge_case_share: float
+) -> TransactionRecord:
+    """A record, edge cases are picked independently with `edge_case_share`."""
+    if rand.random() < edge_case_share:
+        # Upfront is above 1,000 too.
+        total_loan_amount: float = rand.randrange(100_000_00, 500_000_00) / 100
+    else:
+        total_loan_amount = rand.randrange(5_000_00, 50_000_00) / 100
+    upfront: float = round(total_loan_amount * _COMM_RATE / 100, 2)
+    names: List[str] = [rand.choice(_FIRST_NAMES), rand.choice(_LAST_NAMES)]
+    if rand.random() < edge_case_share:
+        # Name is longer than its column, description follows the name. Short
+        # middle names are added, so description still ends before loan amount.
+        while _text_width(" ".join(names)) <= _DESCRIPTION_X - _BORROWER_NAME_X:
+            names.insert(-1, rand.choice(_MIDDLE_NAMES))
+    return TransactionRecord(
+        app_id=_FIRST_APP_ID + row,
+        xref=_FIRST_XREF + row,
+        settlement_date=_FIRST_SETTLEMENT_DATE
+        + timedelta(days=rand.randrange(_SETTLEMENT_DAYS)),
+        broker=rand.choice(_BROKERS),
+        sub_broker=(
+            None if rand.random() < edge_case_share else rand.choice(_SUB_BROKERS)
+        ),
+        borrower_name=" ".join(names),
+        description=_DESCRIPTION,
+        total_loan_amount=total_loan_amount,
+        comm_rate=_COMM_RATE,
+        upfront=upfront,
+        upfront_incl_gst=round(upfront * (1 + _GST_RATE), 2),
+    )
+
+
+def _page_content(records: List[TransactionRecord]) -> bytes:
+    """Content stream of a page, column header followed by records."""
+    lines: List[str] = []
+    for x, upper, lower in _HEADER:
+        if upper:
+            lines.append(_text(x, _HEADER_Y[0], upper))
+        lines.append(_text(x, _HEADER_Y[1], lower))
+
+    for pos, record in enumerate(records):
+        y: float = _FIRST_ROW_Y - pos * _ROW_HEIGHT
+        lines.extend(
+            [
+                # A space before xref, app-id & xref are extracted as one cell.
+                _text(
+                    _XREF_X - _text_width(f"{record.app_id} "), y, str(record.app_id)
+                ),
+                _text(_XREF_X, y, str(record.xref)),
+                _text(
+                    _SETTLEMENT_DATE_X, y, record.settlement_date.strftime("%d/%m/%Y")
+                ),
+                _text(_BROKER_X, y, f" {record.broker}"),
+                _text(_BORROWER_NAME_X, y, record.borrower_name),
+                _text(
+                    max(
+                        _DESCRIPTION_X,
+                        _BORROWER_NAME_X + _text_width(f"{record.borrower_name} "),
+                    ),
+                    y,
+                    record.description,
+                ),
+                _amount(_TOTAL_LOAN_AMOUNT_END, y, record.total_loan_amount),
+                _amount(_COMM_RATE_END, y, record.comm_rate),
+                _amount(_UPFRONT_END, y, record.upfront),
+                _amount(_UPFRONT_INCL_GST_END, y, record.upfront_incl_gst),
+            ]
+        )
+        if record.sub_broker:
+            # After broker, in reading order.
+            lines.insert(-9, _text(_SUB_BROKER_X, y, f" {record.sub_broker}"))
+    return "\n".join(lines).encode("latin-1")
+
+
+def _text(x: float, y: float, text: str) -> str:
+    """Text showing operators of `text` at (`x`, `y`)."""
+    escaped: str = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return f"BT /F1 {_FONT_SIZE} Tf {x:.2f} {y:.2f} Td ({escaped}) Tj ET"
+
+
+def _amount(end: float, y: float, amount: float) -> str:
+    """Text operators of an amount (with thousands separators) right aligned to
+    `end`.
+    """
+    text: str = f"{amount:,.2f}"
+    return _text(end - _text_width(text), y, text)
+
+
+def _text_width(text: str) -> float:
+    """Width of `text` in Helvetica."""
+    return (
+        sum(_GLYPH_WIDTHS.get(char, _DEFAULT_GLYPH_WIDTH) for char in text)
+        * _FONT_SIZE
+        / 1000
+    )
+
+
+def _write_pdf(file: BinaryIO, contents: List[bytes]) -> None:
+    """Write a pdf with a page for each content stream."""
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then page & content of pages.
+    page_refs: str = " ".join(f"{4 + 2 * pos} 0 R" for pos in range(len(contents)))
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{page_refs}] /Count {len(contents)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+    ]
+    for pos, content in enumerate(contents):
+        stream: bytes = zlib.compress(content)
+        objects.append(
+            (
+                f"<< /Type /Page /Parent 2 0 R "
+                f"/MediaBox [0 0 {_PAGE_WIDTH} {_PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * pos} 0 R >>"
+            ).encode()
+        )
+        objects.append(
+            f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode()
+            + stream
+            + b"\nendstream"
+        )
+
+    offsets: List[int] = []
+    written: int = file.write(b"%PDF-1.4\n")
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(written)
+        written += file.write(f"{number} 0 obj\n".encode() + obj + b"\nendobj\n")
+    file.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    file.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+    file.write(
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{written}\n%%EOF\n".encode()
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Generate a synthetic statement pdf."
+    )
+    parser.add_argument("path", help="Path of pdf file to write.")
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--rows-per-page", type=int, default=_DEFAULT_ROWS_PER_PAGE)
+    parser.add_argument(
+        "--edge-case-share", type=float, default=_DEFAULT_EDGE_CASE_SHARE
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    with open(args.path, "wb") as file:
+        records: List[TransactionRecord] = generate_statement(
+            file, args.pages, args.rows_per_page, args.edge_case_share, args.seed
+        )
+    print(f"{len(records)} records are written to {args.path}.")
+
+
+if __name__ == "__main__":
+    main()
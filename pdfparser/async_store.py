@@ -0,0 +1,298 @@
+"""Asyncio variants of `Mutation`, `Query` & `SQLReportGenerator`.
+
+Statements & semantics are the same as `store.py` (duplicates are skipped, rollups
+are updated in the same transaction as inserted records), only database round trips
+are awaited. Requires asyncpg driver (`poetry install -E async`).
+
+    Usage:-
+
+    engine = create_async_engine("nick", "", "localhost", 5432, "transaction_db")
+    await AsyncMutation(engine).bulk_insert_transactions(records)
+    reports = await AsyncReportGenerator(AsyncQuery(engine)).generate_reports()
+    await engine.dispose()
+"""
+from typing import Any, Dict, Optional, List, Iterable, Tuple, Union, TYPE_CHECKING
+from datetime import date
+import asyncio
+
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine as sa_create_async_engine,
+)
+
+from pdfparser.datastructure import (
+    TransactionRecord,
+    InsertSummary,
+    IngestionOutcome,
+    PoolSettings,
+)
+from pdfparser.report_generator import SQLReportGenerator
+from pdfparser.metrics import MetricsRegistry, stage
+from pdfparser.record_batch import RecordBatch
+from pdfparser.store import (
+    Mutation,
+    Query,
+    DEFAULT_BATCH_SIZE,
+    TRANSACTION_ISOLATION_LEVEL,
+)
+
+if TYPE_CHECKING:
+    from pdfparser.cache import QueryCache
+
+
+def create_async_engine(
+    username: str,
+    password: str,
+    host: str,
+    port: int,
+    db_name: str,
+    pool: Optional[PoolSettings] = None,
+) -> AsyncEngine:
+    """Create an async database engine (same options as `Init.create_engine`).
+
+    asyncpg prepares every statement on the server and keeps them per connection,
+    `prepare_threshold` of `pool` is not used.
+
+    Engine should be disposed after use (`await engine.dispose()`).
+    """
+    pool = pool if pool else PoolSettings()
+    return sa_create_async_engine(
+        f"postgresql+asyncpg://{username}:{password}@{host}:{port}/{db_name}",
+        isolation_level="AUTOCOMMIT",
+        pool_size=pool.size,
+        max_overflow=pool.max_overflow,
+        pool_pre_ping=pool.pre_ping,
+        pool_recycle=pool.recycle,
+    )
+
+
+class AsyncMutation:
+    """Async data manipulation apis, see `Mutation`."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        maintain_rollups: bool = False,
+        cache: Optional["QueryCache"] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        self._engine: AsyncEngine = engine
+        # Inserts are run by `Mutation` on the connection, inside a greenlet.
+        self._mutation: Mutation = Mutation(
+            engine.sync_engine, maintain_rollups, cache, metrics
+        )
+
+    async def insert_transactions(
+        self, transactions: Iterable[TransactionRecord]
+    ) -> None:
+        """Insert all records to database, skip duplicate records."""
+        async with self._engine.connect() as conn:
+            # Records & their rollup update are committed together.
+            await conn.execution_options(isolation_level=TRANSACTION_ISOLATION_LEVEL)
+            await conn.run_sync(self._mutation.insert_transactions_on, transactions)
+
+    async def bulk_insert_transactions(
+        self,
+        transactions: Union[Iterable[TransactionRecord], RecordBatch],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        use_copy: bool = False,
+    ) -> InsertSummary:
+        """Insert records in batches and return inserted & skipped counts.
+
+        See `Mutation.bulk_insert_transactions`, `use_copy` copies binary records
+        with asyncpg.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size should be a positive integer.")
+
+        async with self._engine.connect() as conn:
+            # Records & their rollup update are committed together.
+            await conn.execution_options(isolation_level=TRANSACTION_ISOLATION_LEVEL)
+            return await conn.run_sync(
+                self._mutation.bulk_insert_transactions_on,
+                transactions,
+                batch_size,
+                use_copy,
+            )
+
+    async def rebuild_rollups(self) -> None:
+        """Recompute rollup tables from `Transaction` table (backfill or repair)."""
+        async with self._engine.connect() as conn:
+            # Records & their rollup update are committed together.
+            await conn.execution_options(isolation_level=TRANSACTION_ISOLATION_LEVEL)
+            await conn.run_sync(self._mutation.rebuild_rollups_on)
+
+    async def record_ingestion(self, outcome: IngestionOutcome) -> None:
+        """Save outcome of an ingested file to ledger (replace if already saved)."""
+        async with self._engine.connect() as conn:
+            await conn.execute(self._mutation.record_ingestion_stmt(outcome))
+
+
+class AsyncQuery:
+    """Async data querying apis, see `Query`."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        use_rollups: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        self._engine: AsyncEngine = engine
+        # Statements are built by `Query`, only executed here.
+        self._query: Query = Query(engine.sync_engine, use_rollups)
+        self._metrics: Optional[MetricsRegistry] = metrics
+
+    async def get_loan_amount(
+        self, start_date: date, end_date: date
+    ) -> Optional[float]:
+        """Loan amount in a period."""
+        return await self._fetch_value(
+            "get_loan_amount",
+            self._query.loan_amount_stmt(),
+            {"start_date": start_date, "end_date": end_date},
+        )
+
+    async def get_highest_loan_amt_by_broker(self, broker: str) -> Optional[float]:
+        """Highest loan amount given by a broker."""
+        return await self._fetch_value(
+            "get_highest_loan_amt_by_broker",
+            self._query.highest_loan_amt_by_broker_stmt(),
+            {"broker": broker},
+        )
+
+    async def get_loan_amounts(
+        self, periods: List[Tuple[date, date]]
+    ) -> Dict[Tuple[date, date], Optional[float]]:
+        """Loan amount in each (start-date, end-date) period, in a single statement."""
+        if not periods:
+            return {}
+        return self._query.loan_amounts_result(
+            periods,
+            await self._fetch_dicts(
+                "get_loan_amounts",
+                self._query.loan_amounts_stmt(),
+                self._query.loan_amounts_params(periods),
+            ),
+        )
+
+    async def get_highest_loan_amt_by_brokers(
+        self, brokers: Optional[List[str]] = None
+    ) -> Dict[str, Optional[float]]:
+        """Highest loan amount given by each broker (all brokers if not given), in a
+        single statement.
+        """
+        if brokers is not None and not brokers:
+            return {}
+        return self._query.highest_loan_amts_result(
+            brokers,
+            await self._fetch_dicts(
+                "get_highest_loan_amt_by_brokers",
+                self._query.highest_loan_amt_by_brokers_stmt(brokers is not None),
+                None if brokers is None else {"brokers": brokers},
+            ),
+        )
+
+    async def get_ingestion(self, content_hash: str) -> Optional[IngestionOutcome]:
+        """Ledger entry of a file ingested before, `None` if not ingested yet."""
+        result = await self._fetch_value(
+            "get_ingestion",
+            self._query.ingestion_stmt(),
+            {"content_hash": content_hash},
+            row=True,
+        )
+        return None if not result else IngestionOutcome(**result._asdict())
+
+    async def get_broker_level_loan_amount_with_date(self) -> List[dict]:
+        """Return array of loan amount for a broker in a day."""
+        return await self._fetch_dicts(
+            "get_broker_level_loan_amount_with_date",
+            self._query.broker_level_loan_amount_with_date_stmt(),
+        )
+
+    async def get_total_loan_amount_by_date(self) -> List[dict]:
+        """Return total loan amount of each day."""
+        return await self._fetch_dicts(
+            "get_total_loan_amount_by_date",
+            self._query.total_loan_amount_by_date_stmt(),
+        )
+
+    async def get_tier_level_loan_count_by_date(self) -> List[dict]:
+        """Return number of loans in each tier of each day."""
+        return await self._fetch_dicts(
+            "get_tier_level_loan_count_by_date",
+            self._query.tier_level_loan_count_by_date_stmt(),
+        )
+
+    async def get_broker_loan_amounts_by_period(self, period: str) -> List[dict]:
+        """Return loan amounts (descending) of a broker in each period (`day`,
+        `week` or `month`).
+        """
+        return await self._fetch_dicts(
+            "get_broker_loan_amounts_by_period",
+            self._query.broker_loan_amounts_by_period_stmt(period),
+        )
+
+    async def _fetch_value(
+        self, method: str, stmt, params: Optional[dict] = None, row: bool = False
+    ) -> Any:
+        """First column of first row (whole row if `row`), `None` if there is no
+        row. Recorded as stage `query.<method>`.
+        """
+        with stage(self._metrics, f"query.{method}") as timer:
+            async with self._engine.connect() as conn:
+                result = (await conn.execute(stmt, params)).fetchone()
+            timer.rows = int(result is not None)
+        return None if not result else (result if row else result[0])
+
+    async def _fetch_dicts(
+        self, method: str, stmt, params: Optional[dict] = None
+    ) -> List[dict]:
+        """All rows as dicts. Recorded as stage `query.<method>`."""
+        with stage(self._metrics, f"query.{method}") as timer:
+            async with self._engine.connect() as conn:
+                rows: List[dict] = [
+                    row._asdict() for row in await conn.execute(stmt, params)
+                ]
+            timer.rows = len(rows)
+        return rows
+
+
+class AsyncReportGenerator:
+    """Generate predefined reports, see `SQLReportGenerator`.
+
+    Independent aggregates are queried concurrently, each on its own connection.
+    """
+
+    def __init__(self, query: AsyncQuery) -> None:
+        self._query: AsyncQuery = query
+
+    async def generate_reports(self) -> Tuple[dict, dict, dict]:
+        """Broker, total loan & tier level reports, generated concurrently."""
+        return await asyncio.gather(
+            self.generate_broker_report(),
+            self.generate_total_loan_report(),
+            self.generate_tier_level_report(),
+        )
+
+    async def generate_broker_report(self) -> dict:
+        """Generate all broker's report."""
+        return SQLReportGenerator.form_broker_report(
+            *await asyncio.gather(
+                *(
+                    self._query.get_broker_loan_amounts_by_period(period)
+                    for period in ("day", "week", "month")
+                )
+            )
+        )
+
+    async def generate_total_loan_report(self) -> dict:
+        """Total loan amount per day."""
+        return SQLReportGenerator.form_total_loan_report(
+            await self._query.get_total_loan_amount_by_date()
+        )
+
+    async def generate_tier_level_report(self) -> dict:
+        """Loan amount in each tier per day."""
+        return SQLReportGenerator.form_tier_level_report(
+            await self._query.get_tier_level_loan_count_by_date()
+        )
@@ -0,0 +1,240 @@
+"""Ingest a batch of pdf files in parallel.
+
+    * pdf files are parsed in a pool of worker processes (tabula/JVM bound work).
+    * Parsed records are handed to a single database writer through a bounded queue,
+      so parsing & database writes overlap and memory stays bounded.
+    * Failure of a file is recorded in the summary, other files are not affected.
+    * Files are checked (see `preflight.py`) before they are sent to a worker, an
+      invalid file never reaches tabula and a valid file is not validated again.
+    * Files found in ingestion ledger (same content) are not parsed again, unless
+      `--force` is given.
+    * With `--dedup`, duplicate records are removed before insert against keys
+      preloaded from database (see `dedup.py`).
+
+    Usage:-
+
+    python -m pdfparser.batch "/statements/2023-10/*.pdf" --workers 8
+
+Database settings are read from environment variables or `.env` file (see
+`settings.py`).
+"""
+from typing import List, Optional, Dict, Iterable, Set, Tuple
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, Future, FIRST_COMPLETED, wait
+from multiprocessing import get_context
+from queue import Queue
+from threading import Thread
+import argparse
+import glob
+import os
+
+from sqlalchemy import Engine
+
+from pdfparser.pdf_parser import PDFParser
+from pdfparser.datastructure import BatchSummary, IngestionOutcome, PreflightResult
+from pdfparser.record_batch import RecordBatch
+from pdfparser.ingestion import Ingestor, content_hash
+from pdfparser.dedup import Deduplicator
+from pdfparser.preflight import preflight
+from pdfparser.store import Init, Query, dispose_engines
+
+_DEFAULT_QUEUE_SIZE: int = 4
+
+
+@dataclass
+class _ParsedFile:
+    """A file handed over to database writer."""
+
+    path: str
+    content_hash: str
+    page_count: int = 0
+    # Records as columns, compact to pass from a worker process & to insert.
+    records: Optional[RecordBatch] = None
+    error: Optional[str] = None
+    already_ingested: bool = False
+    preflight: Optional[PreflightResult] = None
+
+
+class BatchIngestor:
+    """Parse pdf files in worker processes and store all records."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        workers: Optional[int] = None,
+        queue_size: int = _DEFAULT_QUEUE_SIZE,
+        force: bool = False,
+        deduplicator: Optional[Deduplicator] = None,
+        maintain_rollups: bool = False,
+    ) -> None:
+        self._ingestor: Ingestor = Ingestor(
+            engine, deduplicator=deduplicator, maintain_rollups=maintain_rollups
+        )
+        self._workers: int = workers or os.cpu_count() or 1
+        self._queue_size: int = queue_size
+        self._force: bool = force
+
+    def ingest(self, paths: Iterable[str]) -> BatchSummary:
+        """Parse & store all given files, return summary of the batch."""
+        summary: BatchSummary = BatchSummary()
+        queue: "Queue[Optional[_ParsedFile]]" = Queue(maxsize=self._queue_size)
+        writer: Thread = Thread(target=self._write, args=(queue, summary))
+        writer.start()
+
+        try:
+            # `spawn`, a forked worker hangs if this process has started a JVM.
+            with ProcessPoolExecutor(
+                max_workers=self._workers, mp_context=get_context("spawn")
+            ) as executor:
+                pending: Dict[Future, _ParsedFile] = {}
+                for path in paths:
+                    file: _ParsedFile = self._check_ledger(path)
+                    if file.already_ingested or file.error:
+                        queue.put(file)
+                        continue
+                    # Limit files in flight, parsed records wait in queue otherwise.
+                    if len(pending) >= self._workers + self._queue_size:
+                        self._hand_over(pending, queue)
+                    pending[executor.submit(_parse_file, path, file.preflight)] = file
+                while pending:
+                    self._hand_over(pending, queue)
+        finally:
+            # Writer stops after all queued files are stored.
+            queue.put(None)
+            writer.join()
+        return summary
+
+    def _check_ledger(self, path: str) -> _ParsedFile:
+        """Hash the file and check whether it is ingested already, check the pdf
+        otherwise.
+        """
+        try:
+            with open(path, "rb") as source:
+                file: _ParsedFile = _ParsedFile(path, content_hash(source))
+                if not self._force:
+                    file.already_ingested = bool(
+                        self._ingestor.get_ingestion(file.content_hash)
+                    )
+                if not file.already_ingested:
+                    if not path.endswith(".pdf"):
+                        raise TypeError("Only .pdf files are supported.")
+                    file.preflight = preflight(source)
+        except Exception as exc:
+            file = _ParsedFile(path, "", error=f"{type(exc).__name__}: {exc}")
+        return file
+
+    @staticmethod
+    def _hand_over(
+        pending: Dict[Future, _ParsedFile], queue: "Queue[Optional[_ParsedFile]]"
+    ) -> None:
+        """Wait for parsed files and pass them to writer (blocks if queue is full)."""
+        done: Set[Future]
+        done, _not_done = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            file: _ParsedFile = pending.pop(future)
+            try:
+                file.page_count, file.records = future.result()
+            except Exception as exc:
+                file.error = f"{type(exc).__name__}: {exc}"
+            queue.put(file)
+
+    def _write(
+        self, queue: "Queue[Optional[_ParsedFile]]", summary: BatchSummary
+    ) -> None:
+        """Store parsed files one by one, only writer updates the summary."""
+        while (file := queue.get()) is not None:
+            summary.files += 1
+            if file.already_ingested:
+                summary.already_ingested += 1
+                continue
+            if file.records is not None:
+                try:
+                    outcome: IngestionOutcome = self._ingestor.store(
+                        file.content_hash, file.page_count, file.records
+                    )
+                    summary.inserted += outcome.inserted
+                    summary.skipped += outcome.skipped
+                    if outcome.dedup:
+                        summary.deduplicated += len(outcome.dedup.duplicates)
+                    continue
+                except Exception as exc:
+                    file.error = f"{type(exc).__name__}: {exc}"
+            summary.failed += 1
+            summary.errors[file.path] = file.error
+
+
+def resolve_paths(source: str) -> List[str]:
+    """All pdf files in a directory, or files matching a glob pattern."""
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.pdf")))
+    return sorted(glob.glob(source))
+
+
+def _parse_file(
+    path: str, preflight_result: PreflightResult
+) -> Tuple[int, RecordBatch]:
+    """Parse a single checked pdf, return page count & records (executed in worker
+    process).
+    """
+    with open(path, "rb") as source:
+        parser: PDFParser = PDFParser(source, preflight=preflight_result)
+        records: RecordBatch = parser.parse_batch()
+    return parser.page_count, records
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Ingest all statement pdfs in a directory or glob pattern."
+    )
+    parser.add_argument("source", help="Directory or glob pattern of pdf files.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=_DEFAULT_QUEUE_SIZE)
+    parser.add_argument(
+        "--force", action="store_true", help="Ingest files found in ledger again."
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Remove duplicate records before insert (keys are loaded from database).",
+    )
+    parser.add_argument(
+        "--env-file", default=".env", help="Database settings (default: .env)."
+    )
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    try:
+        db_constructor: Init = Init.from_env(args.env_file)
+    except ValueError as exc:
+        parser.error(str(exc))
+    engine: Engine = db_constructor.get_engine()
+    try:
+        deduplicator: Optional[Deduplicator] = (
+            Deduplicator.from_database(Query(engine)) if args.dedup else None
+        )
+        # Rollup tables are kept up to date, same as `main.py` ingest command.
+        summary: BatchSummary = BatchIngestor(
+            engine,
+            args.workers,
+            args.queue_size,
+            args.force,
+            deduplicator,
+            maintain_rollups=True,
+        ).ingest(resolve_paths(args.source))
+    finally:
+        # Shared engine (see `Init.get_engine`).
+        dispose_engines()
+
+    print(
+        f"Files: {summary.files}, failed: {summary.failed}, "
+        f"already ingested: {summary.already_ingested}"
+    )
+    print(f"Rows inserted: {summary.inserted}, duplicates skipped: {summary.skipped}")
+    if args.dedup:
+        print(f"Duplicates removed before insert: {summary.deduplicated}")
+    for path, error in summary.errors.items():
+        print(f"{path}: {error}")
+
+
+if __name__ == "__main__":
+    main()
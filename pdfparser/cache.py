@@ -0,0 +1,214 @@
+"""Cache of query results & reports.
+
+Results are kept in a bounded LRU cache with TTL, keyed on source of the query
+(database & `use_rollups`, see `Query.source`), method & arguments.
+`Mutation` invalidates them when records are inserted (if it is given the cache):-
+
+    * `get_loan_amount` results of periods containing an inserted settlement date.
+    * `get_highest_loan_amt_by_broker` results of inserted brokers.
+    * Everything else (eg: reports), which depends on all records.
+
+Records inserted by other processes are not seen until the TTL expires.
+
+eg:-
+
+    cache: QueryCache = QueryCache(max_size=1024, ttl=60)
+    mutation: Mutation = Mutation(engine, cache=cache)
+    query: CachedQuery = CachedQuery(Query(engine), cache)
+    report_generator = CachedReportGenerator(Query(engine), cache)
+"""
+from typing import Any, Callable, Optional, Tuple, FrozenSet, Iterable, Type, Union
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import date
+from threading import Lock
+import time
+
+from pdfparser.datastructure import CacheStats
+from pdfparser.store import Query
+from pdfparser.report_generator import ReportGenerator, SQLReportGenerator
+
+_DEFAULT_MAX_SIZE: int = 1024
+_DEFAULT_TTL: float = 60.0
+
+
+@dataclass
+class _Entry:
+    """A cached value and the records it depends on."""
+
+    value: Any
+    expires_at: float
+    # Inclusive settlement date range, `None` if not limited to a period.
+    dates: Optional[Tuple[date, date]] = None
+    # Brokers, `None` if not limited to some brokers.
+    brokers: Optional[FrozenSet[str]] = None
+
+    def depends_on(
+        self, settlement_dates: FrozenSet[date], brokers: FrozenSet[str]
+    ) -> bool:
+        """Value may change if records of given dates & brokers are inserted."""
+        if self.dates is None and self.brokers is None:
+            return True
+        if self.dates is not None and any(
+            self.dates[0] <= settlement_date <= self.dates[1]
+            for settlement_date in settlement_dates
+        ):
+            return True
+        return self.brokers is not None and not self.brokers.isdisjoint(brokers)
+
+
+class QueryCache:
+    """Bounded LRU cache with TTL (seconds), safe to share between threads."""
+
+    def __init__(
+        self, max_size: int = _DEFAULT_MAX_SIZE, ttl: float = _DEFAULT_TTL
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size should be a positive integer.")
+        self._max_size: int = max_size
+        self._ttl: float = ttl
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._stats: CacheStats = CacheStats()
+        # Incremented by every invalidation, a value computed meanwhile may be stale.
+        self._generation: int = 0
+        self._lock: Lock = Lock()
+
+    @property
+    def stats(self) -> CacheStats:
+        """Copy of hit, miss, eviction & invalidation counters."""
+        with self._lock:
+            return replace(self._stats)
+
+    def get_or_compute(
+        self,
+        key: tuple,
+        compute: Callable[[], Any],
+        dates: Optional[Tuple[date, date]] = None,
+        brokers: Optional[Iterable[str]] = None,
+    ) -> Any:
+        """Cached value of `key`, `compute` and cache it if not cached or expired.
+
+        `dates` & `brokers` are the records value depends on (all records if none
+        of them is given). Value is not cached if records are inserted (cache is
+        invalidated) while it is computed.
+        """
+        with self._lock:
+            entry: Optional[_Entry] = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return entry.value
+            self._stats.misses += 1
+            generation: int = self._generation
+
+        # Computed without holding the lock, other keys are served meanwhile.
+        value: Any = compute()
+        with self._lock:
+            if generation != self._generation:
+                # Value may be read before the invalidating insert was committed.
+                return value
+            self._entries[key] = _Entry(
+                value,
+                time.monotonic() + self._ttl,
+                dates,
+                None if brokers is None else frozenset(brokers),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+        return value
+
+    def invalidate(
+        self, settlement_dates: Iterable[date], brokers: Iterable[str]
+    ) -> None:
+        """Remove values which depend on inserted records of given dates & brokers."""
+        settlement_dates = frozenset(settlement_dates)
+        brokers = frozenset(brokers)
+        if not settlement_dates and not brokers:
+            return
+        with self._lock:
+            self._generation += 1
+            for key in [
+                key
+                for key, entry in self._entries.items()
+                if entry.depends_on(settlement_dates, brokers)
+            ]:
+                del self._entries[key]
+                self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        """Remove all values (counters are kept)."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+class CachedQuery:
+    """`Query` apis served from cache when possible."""
+
+    def __init__(self, query: Query, cache: QueryCache) -> None:
+        self._query: Query = query
+        self._cache: QueryCache = cache
+
+    def get_loan_amount(self, start_date: date, end_date: date) -> Optional[float]:
+        """Loan amount in a period."""
+        return self._cache.get_or_compute(
+            (self._query.source, "get_loan_amount", start_date, end_date),
+            lambda: self._query.get_loan_amount(start_date, end_date),
+            dates=(start_date, end_date),
+        )
+
+    def get_highest_loan_amt_by_broker(self, broker: str) -> Optional[float]:
+        """Highest loan amount given by a broker."""
+        return self._cache.get_or_compute(
+            (self._query.source, "get_highest_loan_amt_by_broker", broker),
+            lambda: self._query.get_highest_loan_amt_by_broker(broker),
+            brokers=(broker,),
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        # Other apis are not cached.
+        return getattr(self._query, name)
+
+
+class CachedReportGenerator:
+    """Reports served from cache, generator is created only if a report is missing.
+
+    Returned reports are shared between callers, they should not be modified.
+    """
+
+    def __init__(
+        self,
+        query: Query,
+        cache: QueryCache,
+        generator_class: Type[
+            Union[ReportGenerator, SQLReportGenerator]
+        ] = SQLReportGenerator,
+    ) -> None:
+        self._query: Query = query
+        self._cache: QueryCache = cache
+        self._generator_class: Type[
+            Union[ReportGenerator, SQLReportGenerator]
+        ] = generator_class
+
+    def generate_broker_report(self) -> dict:
+        """All broker's report (see `ReportGenerator.generate_broker_report`)."""
+        return self._report("generate_broker_report")
+
+    def generate_total_loan_report(self) -> dict:
+        """Total loan amount per day (see `ReportGenerator.generate_total_loan_report`)."""
+        return self._report("generate_total_loan_report")
+
+    def generate_tier_level_report(self) -> dict:
+        """Loan amount in each tier per day (see
+        `ReportGenerator.generate_tier_level_report`).
+        """
+        return self._report("generate_tier_level_report")
+
+    def _report(self, method: str) -> dict:
+        """Cached report, reports depend on all records."""
+        return self._cache.get_or_compute(
+            (self._query.source, self._generator_class.__name__, method),
+            lambda: getattr(self._generator_class(self._query), method)(),
+        )
@@ -1,6 +1,7 @@
 """Custom datastructures."""
-from dataclasses import dataclass
-from datetime import date
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from datetime import date, datetime
 
 
 @dataclass
@@ -18,3 +19,145 @@ class TransactionRecord:
     comm_rate: float
     upfront: float
     upfront_incl_gst: float
+
+
+@dataclass
+class InsertSummary:
+    """Outcome of inserting records to database."""
+
+    inserted: int = 0
+    skipped: int = 0
+
+
+@dataclass
+class RejectedRow:
+    """A table row which could not be converted to a record."""
+
+    row_number: int
+    reason: str
+
+
+@dataclass
+class IngestionOutcome:
+    """Outcome of ingesting a pdf file, as stored in ingestion ledger."""
+
+    content_hash: str
+    page_count: int
+    row_count: int
+    inserted: int
+    skipped: int
+    ingested_at: datetime
+    # `True` if file was ingested before and not parsed again.
+    already_ingested: bool = False
+    # Records removed before insert by dedup stage (not saved in ledger), these are
+    # counted in `skipped` too.
+    dedup: Optional["DedupSummary"] = None
+
+
+@dataclass
+class BatchSummary:
+    """Outcome of ingesting a batch of pdf files."""
+
+    files: int = 0
+    failed: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    # Files ingested before (same content), not parsed again.
+    already_ingested: int = 0
+    # Skipped records removed by dedup stage, before reaching database.
+    deduplicated: int = 0
+    # File path -> error message.
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class CacheStats:
+    """Counters of a query cache."""
+
+    hits: int = 0
+    misses: int = 0
+    # Entries removed to stay within size limit.
+    evictions: int = 0
+    # Entries removed because of inserted records.
+    invalidations: int = 0
+
+
+@dataclass
+class StageMetrics:
+    """Metrics of a stage (a single call or totals of all calls)."""
+
+    calls: int = 0
+    # Wall time.
+    seconds: float = 0.0
+    rows: int = 0
+    bytes_read: int = 0
+    # Duplicate records skipped.
+    duplicates: int = 0
+    # Failed calls & rows which could not be converted.
+    failures: int = 0
+
+
+@dataclass
+class DuplicateRow:
+    """A record removed before inserting, as a duplicate."""
+
+    # 1 based position of the record in checked records.
+    row_number: int
+    reason: str
+
+
+@dataclass
+class DedupSummary:
+    """Outcome of removing duplicate records before inserting them."""
+
+    rows: int = 0
+    # Records repeated in checked records (first one is kept).
+    in_batch: int = 0
+    # Records stored in database already.
+    stored: int = 0
+    # Records reported by a bloom filter index but not stored (checked in database).
+    false_positives: int = 0
+    duplicates: List[DuplicateRow] = field(default_factory=list)
+
+
+@dataclass
+class PreflightResult:
+    """Outcome of checking a pdf before parsing it (see `preflight.py`)."""
+
+    page_count: int
+    # File size in bytes.
+    size: int
+    # x position where each column starts (header labels of first page).
+    column_starts: List[float] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection pool of an engine (see `Init.get_engine`), engines with the same
+    url & settings are shared.
+    """
+
+    # Connections kept open, and opened on demand above it.
+    size: int = 5
+    max_overflow: int = 10
+    # Test a connection before it is checked out (a round trip per checkout).
+    pre_ping: bool = False
+    # Seconds after which a connection is replaced, -1 to keep it.
+    recycle: int = -1
+    # Executions of a statement on a connection after which it is prepared on the
+    # server (psycopg driver), not prepared if `None`.
+    prepare_threshold: Optional[int] = None
+
+
+@dataclass
+class DatabaseSettings:
+    """Connection settings of a PostgreSQL server, or an embedded SQLite file."""
+
+    username: str = ""
+    password: str = ""
+    host: str = "localhost"
+    port: int = 5432
+    db_name: str = ""
+    # Embedded database file, used instead of a server if set.
+    sqlite_path: Optional[str] = None
+    pool: PoolSettings = field(default_factory=PoolSettings)
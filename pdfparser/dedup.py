@@ -0,0 +1,276 @@
+"""Remove duplicate records before they reach database.
+
+Unique (xref + total-loan-amount) key is enforced by database, but every duplicate
+sent to it costs a round trip (or a failed insert). `Deduplicator` runs between
+`PDFParser` & `Mutation`:-
+
+    * Records repeated in the parsed records are collapsed (first one is kept).
+    * Remaining records are checked against an index of stored keys, preloaded from
+      database: an exact set of keys, or a bloom filter for very large tables.
+    * Keys reported by a bloom filter may not be stored (false positive), they are
+      checked in database with a single statement before records are dropped.
+
+Database constraint is still the final check (eg: records inserted by another process
+after the index is loaded are skipped by `Mutation`).
+
+eg:-
+
+    deduplicator: Deduplicator = Deduplicator.from_database(Query(engine))
+    records, summary = deduplicator.dedup(PDFParser(source).parse_batch())
+    Mutation(engine).bulk_insert_transactions(records)
+    deduplicator.add(records)
+"""
+from typing import Iterable, List, Optional, Set, Tuple, Union
+import math
+
+import numpy as np
+import pandas as pd
+
+from pdfparser.datastructure import TransactionRecord, DedupSummary, DuplicateRow
+from pdfparser.metrics import MetricsRegistry, stage
+from pdfparser.record_batch import RecordBatch
+from pdfparser.store import Query, DEFAULT_YIELD_PER
+
+# Tables up to this many records are indexed by an exact set of keys.
+DEFAULT_EXACT_LIMIT: int = 1_000_000
+DEFAULT_FALSE_POSITIVE_RATE: float = 0.01
+# Bloom filter is sized for this many times the stored keys (room for new keys).
+_BLOOM_CAPACITY_FACTOR: int = 2
+_MIN_BLOOM_BITS: int = 1024
+# splitmix64 constants.
+_MIX_MULTIPLIERS: Tuple[np.uint64, np.uint64] = (
+    np.uint64(0xBF58476D1CE4E5B9),
+    np.uint64(0x94D049BB133111EB),
+)
+_SECOND_HASH_SEED: np.uint64 = np.uint64(0x9E3779B97F4A7C15)
+
+
+class KeyIndex:
+    """Index of stored (xref, total-loan-amount) keys."""
+
+    # `False` if `might_contain` can report keys which are not added.
+    exact: bool = True
+
+    def add(self, xrefs: np.ndarray, amounts: np.ndarray) -> None:
+        """Add keys."""
+        raise NotImplementedError
+
+    def might_contain(self, xrefs: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+        """Whether each key may have been added (boolean array)."""
+        raise NotImplementedError
+
+
+class ExactKeyIndex(KeyIndex):
+    """Set of keys."""
+
+    exact: bool = True
+
+    def __init__(self) -> None:
+        self._keys: Set[Tuple[int, float]] = set()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, xrefs: np.ndarray, amounts: np.ndarray) -> None:
+        self._keys.update(zip(xrefs.tolist(), amounts.tolist()))
+
+    def might_contain(self, xrefs: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+        return np.fromiter(
+            (key in self._keys for key in zip(xrefs.tolist(), amounts.tolist())),
+            dtype=bool,
+            count=len(xrefs),
+        )
+
+
+class BloomKeyIndex(KeyIndex):
+    """Bloom filter of keys, a bit array of about 10 bits per key at 1% false
+    positives (a key set takes over 100 bytes per key).
+    """
+
+    exact: bool = False
+
+    def __init__(
+        self, capacity: int, false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE
+    ) -> None:
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate should be between 0 and 1.")
+        capacity = max(capacity, 1)
+        self._size: int = max(
+            _MIN_BLOOM_BITS,
+            math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2),
+        )
+        self._hashes: int = max(1, round(self._size / capacity * math.log(2)))
+        self._bits: np.ndarray = np.zeros(-(-self._size // 8), dtype=np.uint8)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the bit array."""
+        return self._bits.nbytes
+
+    def add(self, xrefs: np.ndarray, amounts: np.ndarray) -> None:
+        positions: np.ndarray = self._positions(xrefs, amounts).ravel()
+        np.bitwise_or.at(
+            self._bits,
+            positions >> np.uint64(3),
+            np.left_shift(1, positions & np.uint64(7)).astype(np.uint8),
+        )
+
+    def might_contain(self, xrefs: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+        positions: np.ndarray = self._positions(xrefs, amounts)
+        bits: np.ndarray = (
+            self._bits[positions >> np.uint64(3)] >> (positions & np.uint64(7))
+        ) & 1
+        return bits.all(axis=1)
+
+    def _positions(self, xrefs: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+        """Bit position of each hash of each key (double hashing), shape (keys,
+        hashes).
+        """
+        # -0.0 + 0.0 is 0.0, equal amounts have equal bits.
+        amount_bits: np.ndarray = (
+            (np.asarray(amounts, dtype=np.float64) + 0.0).view(np.uint64).copy()
+        )
+        first: np.ndarray = _mix(
+            np.asarray(xrefs, dtype=np.int64).view(np.uint64) ^ _mix(amount_bits)
+        )
+        # Odd step, all hashes of a key differ.
+        second: np.ndarray = _mix(first ^ _SECOND_HASH_SEED) | np.uint64(1)
+        steps: np.ndarray = np.arange(self._hashes, dtype=np.uint64)
+        return (first[:, None] + steps[None, :] * second[:, None]) % np.uint64(
+            self._size
+        )
+
+
+class Deduplicator:
+    """Drop duplicate records, see module docstring."""
+
+    def __init__(
+        self,
+        query: Query,
+        index: KeyIndex,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        self._query: Query = query
+        self._index: KeyIndex = index
+        # Dedup is recorded as a stage (see `metrics.py`).
+        self._metrics: Optional[MetricsRegistry] = metrics
+
+    @classmethod
+    def from_database(
+        cls,
+        query: Query,
+        exact_limit: int = DEFAULT_EXACT_LIMIT,
+        false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+        yield_per: int = DEFAULT_YIELD_PER,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> "Deduplicator":
+        """Deduplicator with keys of all stored records, an exact index if there are
+        up to `exact_limit` records, a bloom filter otherwise.
+        """
+        count: int = query.get_transaction_count()
+        index: KeyIndex = (
+            ExactKeyIndex()
+            if count <= exact_limit
+            else BloomKeyIndex(count * _BLOOM_CAPACITY_FACTOR, false_positive_rate)
+        )
+        with stage(metrics, "dedup.load_index") as timer:
+            xrefs: List[int] = []
+            amounts: List[float] = []
+            for row in query.iter_transaction_keys(yield_per):
+                xrefs.append(row["xref"])
+                amounts.append(row["total_loan_amount"])
+                if len(xrefs) == yield_per:
+                    _add_keys(index, xrefs, amounts)
+                    xrefs, amounts = [], []
+            _add_keys(index, xrefs, amounts)
+            timer.rows = count
+        return cls(query, index, metrics)
+
+    def dedup(
+        self, records: Union[RecordBatch, Iterable[TransactionRecord]]
+    ) -> Tuple[RecordBatch, DedupSummary]:
+        """Records which are neither repeated nor stored, and what was removed.
+
+        Row numbers of removed records are 1 based positions in `records`.
+        """
+        batch: RecordBatch = (
+            records
+            if isinstance(records, RecordBatch)
+            else RecordBatch.from_records(records)
+        )
+        if not len(batch):
+            return batch, DedupSummary()
+        with stage(self._metrics, "dedup") as timer:
+            summary: DedupSummary = DedupSummary(rows=len(batch))
+            reasons: np.ndarray = np.full(len(batch), None, dtype=object)
+
+            # First record of each key, for every record.
+            codes, _uniques = pd.factorize(
+                pd.MultiIndex.from_arrays([batch.xref, batch.total_loan_amount])
+            )
+            _unique_codes, first_rows, inverse = np.unique(
+                codes, return_index=True, return_inverse=True
+            )
+            first_row: np.ndarray = first_rows[inverse]
+            repeated: np.ndarray = first_row != np.arange(len(batch))
+            for pos in np.flatnonzero(repeated).tolist():
+                reasons[pos] = f"Duplicate of row {first_row[pos] + 1}."
+            summary.in_batch = int(repeated.sum())
+
+            candidates: np.ndarray = np.flatnonzero(~repeated)
+            found: np.ndarray = self._index.might_contain(
+                batch.xref[candidates], batch.total_loan_amount[candidates]
+            )
+            stored: np.ndarray = candidates[found]
+            if not self._index.exact and len(stored):
+                stored, summary.false_positives = self._check_stored(batch, stored)
+            reasons[stored] = "Already stored."
+            summary.stored = len(stored)
+
+            summary.duplicates = [
+                DuplicateRow(row_number=pos + 1, reason=reasons[pos])
+                for pos in np.flatnonzero(pd.notna(reasons)).tolist()
+            ]
+            timer.rows, timer.duplicates = len(batch), len(summary.duplicates)
+        return batch.take(pd.isna(reasons)), summary
+
+    def add(self, records: Union[RecordBatch, Iterable[TransactionRecord]]) -> None:
+        """Add keys of stored records to index (eg: after inserting them)."""
+        batch: RecordBatch = (
+            records
+            if isinstance(records, RecordBatch)
+            else RecordBatch.from_records(records)
+        )
+        self._index.add(batch.xref, batch.total_loan_amount)
+
+    def _check_stored(
+        self, batch: RecordBatch, candidates: np.ndarray
+    ) -> Tuple[np.ndarray, int]:
+        """Positions of candidates which are stored in database & number of false
+        positives.
+        """
+        xrefs: List[int] = batch.xref[candidates].tolist()
+        amounts: List[float] = batch.total_loan_amount[candidates].tolist()
+        stored_keys: Set[Tuple[int, float]] = self._query.get_stored_keys(
+            xrefs, amounts
+        )
+        stored: np.ndarray = np.fromiter(
+            (key in stored_keys for key in zip(xrefs, amounts)),
+            dtype=bool,
+            count=len(candidates),
+        )
+        return candidates[stored], int((~stored).sum())
+
+
+def _add_keys(index: KeyIndex, xrefs: List[int], amounts: List[float]) -> None:
+    """Add keys (as lists) to index."""
+    index.add(np.array(xrefs, dtype=np.int64), np.array(amounts, dtype=np.float64))
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer of each value (uint64, wraps around)."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * _MIX_MULTIPLIERS[0]
+    values = values ^ (values >> np.uint64(27))
+    values = values * _MIX_MULTIPLIERS[1]
+    return values ^ (values >> np.uint64(31))
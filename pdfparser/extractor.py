@@ -0,0 +1,302 @@
+"""Long lived (warm) tabula extractor.
+
+With `jpype1` installed tabula runs Java in process and keeps it for later calls,
+only the first call starts the Java runtime & loads tabula classes. A
+`WarmExtractor` does it in `start` (eg: while a service starts) instead of in the
+first parse, extractions are the same `tabula.read_pdf` calls afterwards. It is not
+faster than tabula after the first call, Java still compiles (JIT) pdf handling
+code during the first few extractions.
+
+Java runtime of the process is probed (a trivial Java call) before each extraction
+and by `is_healthy`. It can not be restarted in the same process, so if it stops
+answering the extractor fails over to a worker process (as if `isolated` is set).
+
+If `isolated` is set, Java runs in a dedicated worker process instead:-
+
+    * A JVM crash does not take the caller down, worker is restarted and the failed
+      extraction is retried once on the new worker.
+    * Worker is health checked with a ping before use.
+    * Slower than in process extraction, pdf & tables are sent between processes.
+
+Requires `jpype1` (`poetry install -E jpype`), without it tabula starts a Java
+process per call and `start` raises an error.
+
+eg:-
+
+    extractor: WarmExtractor = get_warm_extractor()
+    records = PDFParser(source, extractor=extractor).parse()
+"""
+from typing import List, Optional, Union, BinaryIO, Any
+from multiprocessing.connection import Connection
+from threading import Lock
+import atexit
+import io
+import multiprocessing
+
+from pandas.core.frame import DataFrame
+
+_PING: str = "ping"
+_PONG: str = "pong"
+_READY: str = "ready"
+_DEFAULT_START_TIMEOUT: float = 120.0
+_DEFAULT_HEALTH_TIMEOUT: float = 5.0
+_JAVA_OPTIONS: List[str] = ["-Djava.awt.headless=true", "-Dfile.encoding=UTF8"]
+
+_shared_extractor: Optional["WarmExtractor"] = None
+_shared_extractor_lock: Lock = Lock()
+
+
+class WarmExtractor:
+    """Extract tables with a Java runtime which is started once and reused.
+
+    Java runs in process, or in a worker process if `isolated` is set. Java options
+    are ignored if Java is already started in the process (eg: by a tabula call).
+    """
+
+    def __init__(
+        self,
+        java_options: Optional[List[str]] = None,
+        start_timeout: float = _DEFAULT_START_TIMEOUT,
+        isolated: bool = False,
+    ) -> None:
+        self._java_options: List[str] = java_options or _JAVA_OPTIONS
+        self._start_timeout: float = start_timeout
+        self._isolated: bool = isolated
+        # Java runtime of the process is started (only if not `isolated`).
+        self._started: bool = False
+        self._process: Optional[multiprocessing.Process] = None
+        self._conn: Optional[Connection] = None
+        # Worker serves one request at a time.
+        self._lock: Lock = Lock()
+
+    def start(self) -> None:
+        """Start Java runtime (& worker process), no-op if already running."""
+        with self._lock:
+            if not self._isolated:
+                self._start_in_process()
+            elif self._process is None or not self._process.is_alive():
+                self._start()
+
+    def restart(self) -> None:
+        """Stop the current worker (if any) and start a new one.
+
+        Java runtime of the process can not be restarted, same as `ensure_healthy`
+        if not `isolated`.
+        """
+        with self._lock:
+            if not self._isolated:
+                self._ensure_in_process()
+                return
+            self._stop()
+            self._start()
+
+    def close(self) -> None:
+        """Stop the worker process (Java runtime of the process runs until exit)."""
+        with self._lock:
+            self._stop()
+
+    def is_healthy(self, timeout: float = _DEFAULT_HEALTH_TIMEOUT) -> bool:
+        """Java runtime is started and answers a trivial Java call, or worker is
+        alive and answers a ping within `timeout` seconds if `isolated`.
+
+        An unhealthy worker is stopped, next extraction starts a new one (or fails
+        over to a worker if Java runtime of the process is not healthy).
+        """
+        with self._lock:
+            if not self._isolated:
+                return self._started and _is_java_alive()
+            return self._ping(timeout)
+
+    def ensure_healthy(self, timeout: float = _DEFAULT_HEALTH_TIMEOUT) -> None:
+        """Start Java runtime or restart the worker if it is not healthy."""
+        with self._lock:
+            if not self._isolated:
+                self._ensure_in_process()
+            elif not self._ping(timeout):
+                self._start()
+
+    def read_pdf(self, source: Union[str, BinaryIO], **options: Any) -> List[DataFrame]:
+        """Same as `tabula.read_pdf`, executed by the warm Java runtime."""
+        with self._lock:
+            if not self._isolated:
+                self._ensure_in_process()
+        # Not `isolated` anymore after a fail over.
+        if not self._isolated:
+            import tabula
+
+            return tabula.read_pdf(source, **options)
+
+        if not isinstance(source, str):
+            source.seek(0)
+            source = io.BytesIO(source.read())
+
+        with self._lock:
+            if not self._ping(_DEFAULT_HEALTH_TIMEOUT):
+                self._start()
+            try:
+                status, result = self._request((source, options))
+            except (EOFError, OSError):
+                # Worker crashed while extracting, retry once on a new worker.
+                self._stop()
+                self._start()
+                status, result = self._request((source, options))
+
+        if status == "error":
+            raise result
+        return result
+
+    def _start_in_process(self) -> None:
+        """Start Java runtime of the process once (caller holds the lock)."""
+        if not self._started:
+            _start_java(self._java_options)
+            self._started = True
+
+    def _ensure_in_process(self) -> None:
+        """Start Java runtime of the process, or fail over to a worker process if it
+        does not answer (caller holds the lock).
+        """
+        if not self._started:
+            self._start_in_process()
+        elif not _is_java_alive():
+            self._isolated = True
+            self._start()
+
+    def _request(self, request: Any) -> Any:
+        """Send a request to worker and wait for the reply."""
+        self._conn.send(request)
+        return self._conn.recv()
+
+    def _ping(self, timeout: float) -> bool:
+        """Ping worker and stop it if it does not answer (caller holds the lock)."""
+        if self._process is None:
+            return False
+        try:
+            self._conn.send(_PING)
+            if self._conn.poll(timeout) and self._conn.recv() == _PONG:
+                return True
+        except (EOFError, OSError):
+            pass
+        # A late answer should not be read as reply of next request.
+        self._stop()
+        return False
+
+    def _start(self) -> None:
+        """Start worker and wait until Java runtime is ready."""
+        # `spawn`, since a forked process may inherit a running JVM.
+        context = multiprocessing.get_context("spawn")
+        self._conn, worker_conn = context.Pipe()
+        process: multiprocessing.Process = context.Process(
+            target=_serve, args=(worker_conn, self._java_options), daemon=True
+        )
+        process.start()
+        self._process = process
+        worker_conn.close()
+
+        try:
+            if not self._conn.poll(self._start_timeout):
+                raise RuntimeError("Java runtime did not start in time.")
+            status, result = self._conn.recv()
+        except EOFError:
+            status, result = "error", RuntimeError("Extractor worker exited.")
+        except Exception:
+            self._stop()
+            raise
+        if status == "error":
+            self._stop()
+            raise result
+
+    def _stop(self) -> None:
+        """Stop worker, killing it if it does not exit."""
+        if self._process is None:
+            return
+        try:
+            self._conn.send(None)
+        except (EOFError, OSError):
+            pass
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+        self._process = None
+        self._conn = None
+
+
+def get_warm_extractor() -> WarmExtractor:
+    """Extractor shared by every `PDFParser` in the process (started on first use)."""
+    global _shared_extractor
+    with _shared_extractor_lock:
+        if _shared_extractor is None:
+            _shared_extractor = WarmExtractor()
+            atexit.register(_shared_extractor.close)
+    return _shared_extractor
+
+
+def _start_java(java_options: List[str]) -> None:
+    """Start Java runtime of the process and load pdf handling classes."""
+    import tabula
+    from tabula.backend import TabulaVm
+
+    # Starts the JVM & loads tabula classes, later calls reuse it.
+    if TabulaVm(java_options=list(java_options), silent=True).tabula is None:
+        raise RuntimeError("jpype is required for a warm extractor.")
+    # First extraction loads (& compiles) most of pdf handling classes.
+    tabula.read_pdf(io.BytesIO(_warm_up_pdf()), pages="all")
+
+
+def _is_java_alive() -> bool:
+    """Java runtime of the process is running and answers a trivial Java call."""
+    import jpype
+
+    if not jpype.isJVMStarted():
+        return False
+    try:
+        return jpype.JClass("java.lang.Runtime").getRuntime().availableProcessors() > 0
+    except Exception:
+        return False
+
+
+def _serve(conn: Connection, java_options: List[str]) -> None:
+    """Worker loop, start Java runtime once and extract tables on request."""
+    try:
+        import tabula
+
+        _start_java(java_options)
+    except Exception as exc:
+        conn.send(("error", RuntimeError(f"{type(exc).__name__}: {exc}")))
+        return
+    conn.send((_READY, None))
+
+    while (request := conn.recv()) is not None:
+        if request == _PING:
+            conn.send(_PONG)
+            continue
+        source, options = request
+        try:
+            conn.send(("ok", tabula.read_pdf(source, **options)))
+        except Exception as exc:
+            # Java exceptions can not be pickled, only the message is sent back.
+            conn.send(("error", RuntimeError(f"{type(exc).__name__}: {exc}")))
+
+
+def _warm_up_pdf() -> bytes:
+    """A minimal single page pdf with a one row table."""
+    content: bytes = b"BT /F1 10 Tf 20 80 Td (App ID) Tj 60 0 Td (Xref) Tj ET"
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 100] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf: bytes = b"%PDF-1.4\n"
+    offsets: List[int] = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref_offset: int = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    return pdf + b"startxref\n%d\n%%%%EOF\n" % xref_offset
@@ -0,0 +1,100 @@
+"""Ingest a pdf file once.
+
+Every ingested file is saved in `IngestionLedger` with sha256 of its content. The
+ledger is checked before parsing, so a byte-identical file (re-upload) returns the
+stored outcome immediately without validating, extracting or inserting anything.
+
+Given a `Deduplicator` (see `dedup.py`), duplicate records are removed before insert.
+Set `maintain_rollups` to update rollup tables (see `store.py`) with inserted records.
+"""
+from typing import BinaryIO, Optional, List, Union
+from datetime import datetime
+import hashlib
+
+from sqlalchemy import Engine
+
+from pdfparser.pdf_parser import PDFParser
+from pdfparser.extractor import WarmExtractor
+from pdfparser.datastructure import (
+    TransactionRecord,
+    InsertSummary,
+    IngestionOutcome,
+    DedupSummary,
+)
+from pdfparser.dedup import Deduplicator
+from pdfparser.record_batch import RecordBatch
+from pdfparser.store import Mutation, Query
+
+_HASH_CHUNK_SIZE: int = 1024 * 1024
+
+
+class Ingestor:
+    """Parse & store a pdf file unless the same file is ingested already."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        extractor: Optional[WarmExtractor] = None,
+        deduplicator: Optional[Deduplicator] = None,
+        maintain_rollups: bool = False,
+    ) -> None:
+        self._mutation: Mutation = Mutation(engine, maintain_rollups=maintain_rollups)
+        self._query: Query = Query(engine)
+        self._extractor: Optional[WarmExtractor] = extractor
+        self._deduplicator: Optional[Deduplicator] = deduplicator
+
+    def ingest(self, file: BinaryIO, force: bool = False) -> IngestionOutcome:
+        """Ingest the file, return the stored outcome if it is ingested before.
+
+        Set `force` to parse & insert the file again (ledger entry is replaced).
+        """
+        hash_: str = content_hash(file)
+        if not force:
+            outcome: Optional[IngestionOutcome] = self._query.get_ingestion(hash_)
+            if outcome:
+                outcome.already_ingested = True
+                return outcome
+
+        parser: PDFParser = PDFParser(file, self._extractor)
+        records: RecordBatch = parser.parse_batch()
+        return self.store(hash_, parser.page_count, records)
+
+    def store(
+        self,
+        hash_: str,
+        page_count: int,
+        records: Union[List[TransactionRecord], RecordBatch],
+    ) -> IngestionOutcome:
+        """Insert parsed records of a file and save it in ledger."""
+        row_count: int = len(records)
+        dedup: Optional[DedupSummary] = None
+        if self._deduplicator:
+            records, dedup = self._deduplicator.dedup(records)
+        summary: InsertSummary = self._mutation.bulk_insert_transactions(records)
+        if self._deduplicator:
+            self._deduplicator.add(records)
+        outcome: IngestionOutcome = IngestionOutcome(
+            content_hash=hash_,
+            page_count=page_count,
+            row_count=row_count,
+            inserted=summary.inserted,
+            skipped=summary.skipped + (len(dedup.duplicates) if dedup else 0),
+            ingested_at=datetime.now(),
+            dedup=dedup,
+        )
+        self._mutation.record_ingestion(outcome)
+        return outcome
+
+    def get_ingestion(self, hash_: str) -> Optional[IngestionOutcome]:
+        """Stored outcome of a file with given content hash."""
+        return self._query.get_ingestion(hash_)
+
+
+def content_hash(file: BinaryIO) -> str:
+    """sha256 of file content, file position is reset to the beginning."""
+    file.seek(0)
+    digest = hashlib.sha256()
+    while chunk := file.read(_HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
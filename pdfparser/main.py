@@ -1,61 +1,173 @@
-"""A module to execute functionalities."""
-from typing import List, Optional
+"""Command line interface.
+
+    Usage:-
+
+    python -m pdfparser.main ingest /statements/2023-10/*.pdf
+    python -m pdfparser.main query loan-amount 2023-10-17 2023-10-25
+    python -m pdfparser.main query max-by-broker "Cheston La'Porte"
+    python -m pdfparser.main report broker --format jsonl --output broker.jsonl
+
+Database settings are read from environment variables or `.env` file (see
+`settings.py`). Modules are imported by the command which needs them, query & report
+commands do not load pandas, tabula or Java runtime.
+"""
+from typing import List, Optional, TYPE_CHECKING
 from datetime import date
-from pprint import pprint
+import argparse
+import os
+import sys
 
-from sqlalchemy import Engine
-from sqlalchemy.exc import ProgrammingError
+if TYPE_CHECKING:
+    from pdfparser.store import Init
 
-from pdfparser.pdf_parser import PDFParser
-from pdfparser.datastructure import TransactionRecord
-from pdfparser.store import Init, Mutation, Query
-from pdfparser.report_generator import ReportGenerator
+_REPORT_METHODS: dict = {
+    "broker": "write_broker_report",
+    "total": "write_total_loan_report",
+    "tier": "write_tier_level_report",
+}
 
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser: argparse.ArgumentParser = _build_parser()
+    args: argparse.Namespace = parser.parse_args(argv)
+    from pdfparser.store import Init, dispose_engines
+
     try:
-        # todo: remove
-        # eg: db_constructor: Init = Init("nick", "", "localhost", 5432, "transaction_db")
-        db_constructor: Init = Init("<username>", "<password>", "<host>", "<port>", "<db_name>")
-        try:
-            db_constructor.create_db()
-        # Skipping DB already exists error (DB should be created only once.)
-        except ProgrammingError:
-            pass
-        engine: Engine = db_constructor.create_engine()
-        # ---------------------------------------------------------------------------
-        # todo: remove
-        # eg: with open("/Users/nick/pdfparser/tests/transaction.pdf", "rb") as source:
-        with open("</path-to/transaction.pdf>", "rb") as source:
-            records: List[TransactionRecord] = PDFParser(source).parse()
-        # ---------------------------------------------------------------------------
-        mutation: Mutation = Mutation(engine)
-        mutation.insert_transactions(records)
-        # ---------------------------------------------------------------------------
-        query: Query = Query(engine)
-        total_loan_amount: Optional[float] = query.get_loan_amount(
-            date(day=17, month=10, year=2023), date(day=25, month=10, year=2023)
-        )
-        print("Total loan amount from 2023-10-17 to 2023-10-25", "\n")
-        print(total_loan_amount, "\n\n")
-        max_loan_amount_by_broker: Optional[
-            float
-        ] = query.get_highest_loan_amt_by_broker("Cheston La'Porte")
-        print("Maximum loan amount by 'Cheston La'Porte'", "\n")
-        print(max_loan_amount_by_broker, "\n\n")
-        # ---------------------------------------------------------------------------
-        report_generator: ReportGenerator = ReportGenerator(query)
-        broker_report: dict = report_generator.generate_broker_report()
-        total_loan_amount_report: dict = report_generator.generate_total_loan_report()
-        tier_level_report: dict = report_generator.generate_tier_level_report()
-        print("Broker level report", "\n")
-        pprint(broker_report)
-        print("\n\n")
-        print("Total loan amount report", "\n")
-        pprint(total_loan_amount_report)
-        print("\n\n")
-        print("Tier level report", "\n")
-        pprint(tier_level_report)
+        db_constructor: Init = Init.from_env(args.env_file)
+    except ValueError as exc:
+        parser.error(str(exc))
+    try:
+        args.handler(db_constructor, args)
+    except BrokenPipeError:
+        # Output is closed early (eg: piped to `head`), python flushes stdout at
+        # exit again otherwise.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
     finally:
-        # Dispose engine after use.
-        engine.dispose()
+        # Commands use the shared engine (see `Init.get_engine`).
+        dispose_engines()
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Parser of all commands."""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="python -m pdfparser.main",
+        description="Ingest transaction statements, query & report loan amounts.",
+    )
+    parser.add_argument(
+        "--env-file", default=".env", help="Database settings (default: .env)."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest: argparse.ArgumentParser = commands.add_parser(
+        "ingest", help="Parse & store statement pdfs."
+    )
+    ingest.add_argument("files", nargs="+", help="Statement pdf files.")
+    ingest.add_argument(
+        "--force", action="store_true", help="Ingest files found in ledger again."
+    )
+    ingest.set_defaults(handler=_ingest)
+
+    query: argparse.ArgumentParser = commands.add_parser(
+        "query", help="Loan amount of a period or highest loan amount of a broker."
+    )
+    queries = query.add_subparsers(dest="query", required=True)
+    loan_amount: argparse.ArgumentParser = queries.add_parser(
+        "loan-amount", help="Total loan amount from start to end date (inclusive)."
+    )
+    loan_amount.add_argument("start_date", type=date.fromisoformat)
+    loan_amount.add_argument("end_date", type=date.fromisoformat)
+    loan_amount.set_defaults(handler=_query_loan_amount)
+    max_by_broker: argparse.ArgumentParser = queries.add_parser(
+        "max-by-broker", help="Highest loan amount given by a broker."
+    )
+    max_by_broker.add_argument("broker")
+    max_by_broker.set_defaults(handler=_query_max_by_broker)
+    for query_parser in (loan_amount, max_by_broker):
+        _add_rollups_argument(query_parser)
+
+    report: argparse.ArgumentParser = commands.add_parser(
+        "report", help="Write a predefined report as json."
+    )
+    report.add_argument("report", choices=tuple(_REPORT_METHODS))
+    report.add_argument("--format", choices=("json", "jsonl"), default="json")
+    report.add_argument("--output", help="Report file (printed if not given).")
+    _add_rollups_argument(report)
+    report.set_defaults(handler=_report)
+    return parser
+
+
+def _add_rollups_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--rollups", action="store_true", help="Read rollup tables (see `store.py`)."
+    )
+
+
+def _ingest(db_constructor: "Init", args: argparse.Namespace) -> None:
+    """Create database (or upgrade its schema) and ingest each file once."""
+    from sqlalchemy.exc import ProgrammingError
+
+    from pdfparser.ingestion import Ingestor
+    from pdfparser.datastructure import IngestionOutcome
+
+    try:
+        db_constructor.create_db()
+    # DB already exists (DB should be created only once), tables & indexes added
+    # after it was created are created.
+    except ProgrammingError:
+        db_constructor.migrate()
+    # Rollup tables are kept up to date for `--rollups` of query & report commands.
+    ingestor: Ingestor = Ingestor(db_constructor.get_engine(), maintain_rollups=True)
+    for path in args.files:
+        with open(path, "rb") as source:
+            outcome: IngestionOutcome = ingestor.ingest(source, args.force)
+        if outcome.already_ingested:
+            print(f"{path}: already ingested at {outcome.ingested_at}")
+            continue
+        print(
+            f"{path}: rows {outcome.row_count}, inserted {outcome.inserted}, "
+            f"duplicates skipped {outcome.skipped}"
+        )
+
+
+def _query_loan_amount(db_constructor: "Init", args: argparse.Namespace) -> None:
+    from pdfparser.store import Query
+
+    print(
+        Query(db_constructor.get_engine(), use_rollups=args.rollups).get_loan_amount(
+            args.start_date, args.end_date
+        )
+    )
+
+
+def _query_max_by_broker(db_constructor: "Init", args: argparse.Namespace) -> None:
+    from pdfparser.store import Query
+
+    print(
+        Query(
+            db_constructor.get_engine(), use_rollups=args.rollups
+        ).get_highest_loan_amt_by_broker(args.broker)
+    )
+
+
+def _report(db_constructor: "Init", args: argparse.Namespace) -> None:
+    """Stream the report to a file or stdout (see `report_writer.py`)."""
+    from pdfparser.store import Query
+    from pdfparser.report_writer import StreamingReportWriter
+
+    writer: StreamingReportWriter = StreamingReportWriter(
+        Query(db_constructor.get_engine(), use_rollups=args.rollups), args.format
+    )
+    write = getattr(writer, _REPORT_METHODS[args.report])
+    if args.output:
+        with open(args.output, "w") as out:
+            write(out)
+    else:
+        write(sys.stdout)
+        if args.format == "json":
+            print()
+
+
+if __name__ == "__main__":
+    main()
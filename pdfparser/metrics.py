@@ -0,0 +1,201 @@
+"""Per stage metrics of parsing, storing, querying & reporting.
+
+A `MetricsRegistry` given to `PDFParser`, `Mutation`, `Query` or a report generator
+records for every stage: calls, duration, rows, bytes read, duplicates skipped &
+failures (eg: rows which could not be converted). Without a registry (default) a
+stage costs a function call, nothing is timed or counted.
+
+Stages:-
+
+    * parse.validate, parse.extract, parse.convert (`PDFParser`).
+    * mutation.insert_transactions, mutation.bulk_insert_transactions,
+      mutation.rebuild_rollups (`Mutation`).
+    * query.<method> (`Query`, eg: query.get_loan_amount).
+    * report.<method> (report generators, eg: report.generate_broker_report).
+
+Metrics are exported in Prometheus text format, or passed to callbacks as each
+stage finishes.
+
+eg:-
+
+    metrics: MetricsRegistry = MetricsRegistry(callbacks=[print])
+    records = PDFParser(source, metrics=metrics).parse()
+    Mutation(engine, metrics=metrics).bulk_insert_transactions(records)
+    print(metrics.to_prometheus())
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+from dataclasses import replace
+from functools import wraps
+from threading import Lock
+from types import TracebackType
+import time
+
+from pdfparser.datastructure import StageMetrics
+
+_PROMETHEUS_PREFIX: str = "pdfparser_stage"
+# (metric name, `StageMetrics` field, help text) of exported metrics.
+_PROMETHEUS_METRICS: List[tuple] = [
+    ("calls_total", "calls", "Number of completed calls of a stage."),
+    ("seconds_total", "seconds", "Time spent in a stage."),
+    ("rows_total", "rows", "Rows processed by a stage."),
+    ("bytes_read_total", "bytes_read", "Bytes read by a stage."),
+    ("duplicates_total", "duplicates", "Duplicate records skipped by a stage."),
+    ("failures_total", "failures", "Failed calls & rejected rows of a stage."),
+]
+
+# Called with stage name & metrics of a single call.
+MetricsCallback = Callable[[str, StageMetrics], None]
+
+
+class StageTimer:
+    """Time a stage (context manager), counts of the call are set on it.
+
+    eg:-
+
+        with stage(metrics, "parse.convert") as timer:
+            timer.rows = len(records)
+    """
+
+    __slots__ = (
+        "_registry",
+        "_name",
+        "_start",
+        "rows",
+        "bytes_read",
+        "duplicates",
+        "failures",
+    )
+
+    def __init__(self, registry: Optional["MetricsRegistry"], name: str) -> None:
+        self._registry: Optional["MetricsRegistry"] = registry
+        self._name: str = name
+        self._start: float = 0.0
+        self.rows: int = 0
+        self.bytes_read: int = 0
+        self.duplicates: int = 0
+        self.failures: int = 0
+
+    def __enter__(self) -> "StageTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        _exc: Optional[BaseException],
+        _traceback: Optional[TracebackType],
+    ) -> None:
+        self._registry.record(
+            self._name,
+            StageMetrics(
+                calls=1,
+                seconds=time.perf_counter() - self._start,
+                rows=self.rows,
+                bytes_read=self.bytes_read,
+                duplicates=self.duplicates,
+                # A failed call counts once, in addition to rejected rows.
+                failures=self.failures + (exc_type is not None),
+            ),
+        )
+
+
+class _NullTimer(StageTimer):
+    """Timer of a disabled registry, does nothing (counts set on it are dropped)."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "StageTimer":
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        return None
+
+
+_NULL_TIMER: StageTimer = _NullTimer(None, "")
+
+
+class MetricsRegistry:
+    """Totals of every stage, safe to share between threads."""
+
+    def __init__(self, callbacks: Iterable[MetricsCallback] = ()) -> None:
+        self._callbacks: List[MetricsCallback] = list(callbacks)
+        self._stages: Dict[str, StageMetrics] = {}
+        self._lock: Lock = Lock()
+
+    def stage(self, name: str) -> StageTimer:
+        """Timer of a stage call."""
+        return StageTimer(self, name)
+
+    def record(self, name: str, metrics: StageMetrics) -> None:
+        """Add metrics of a stage call to totals & pass them to callbacks."""
+        with self._lock:
+            total: Optional[StageMetrics] = self._stages.get(name)
+            if total is None:
+                self._stages[name] = replace(metrics)
+            else:
+                total.calls += metrics.calls
+                total.seconds += metrics.seconds
+                total.rows += metrics.rows
+                total.bytes_read += metrics.bytes_read
+                total.duplicates += metrics.duplicates
+                total.failures += metrics.failures
+        for callback in self._callbacks:
+            callback(name, metrics)
+
+    def snapshot(self) -> Dict[str, StageMetrics]:
+        """Copy of totals of every stage, keyed by stage name."""
+        with self._lock:
+            return {name: replace(total) for name, total in self._stages.items()}
+
+    def reset(self) -> None:
+        """Remove all totals."""
+        with self._lock:
+            self._stages.clear()
+
+    def to_prometheus(self) -> str:
+        """Totals in Prometheus text exposition format.
+
+        eg: pdfparser_stage_seconds_total{stage="parse.extract"} 1.52
+        """
+        stages: Dict[str, StageMetrics] = self.snapshot()
+        lines: List[str] = []
+        for metric, field_name, help_text in _PROMETHEUS_METRICS:
+            name: str = f"{_PROMETHEUS_PREFIX}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for stage_name, total in sorted(stages.items()):
+                lines.append(
+                    f'{name}{{stage="{_escape_label(stage_name)}"}} '
+                    f"{getattr(total, field_name)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def stage(metrics: Optional[MetricsRegistry], name: str) -> StageTimer:
+    """Timer of a stage call, a shared no-op timer if metrics are disabled."""
+    return _NULL_TIMER if metrics is None else StageTimer(metrics, name)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """Record calls of a method as stage `name` in `self._metrics`, number of items
+    of the returned value (eg: a report) is recorded as rows.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            if self._metrics is None:
+                return method(self, *args, **kwargs)
+            with StageTimer(self._metrics, name) as timer:
+                result: Any = method(self, *args, **kwargs)
+                timer.rows = len(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _escape_label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,32 +1,159 @@
-"""Table definitions."""
+"""Table definitions (PostgreSQL, or an embedded SQLite database, see `Init`)."""
+from typing import List, Optional
+
 from sqlalchemy import (
     Table,
     Column,
     String,
     MetaData,
     BigInteger,
+    Integer,
     Date,
+    DateTime,
     Float,
     UniqueConstraint,
+    PrimaryKeyConstraint,
+    Index,
+    JSON,
+    TypeDecorator,
 )
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine.interfaces import Dialect
+
+
+class _DescendingAmounts(TypeDecorator):
+    """Loan amounts as a json array (SQLite has no arrays), read in descending order
+    (SQLite 3.40 has no ordered aggregates, arrays are sorted while reading).
+
+    Whole amounts returned by SQLite (eg: `RETURNING` of a `REAL` column) are ints in
+    json, they are read as floats.
+    """
+
+    impl = JSON
+    cache_ok = True
+
+    def process_result_value(
+        self, value: Optional[List[float]], dialect: Dialect
+    ) -> Optional[List[float]]:
+        if value is None:
+            return None
+        return sorted((float(amount) for amount in value), reverse=True)
+
+
+# Loan amounts of a broker in a period (column & aggregate type).
+LOAN_AMOUNTS_TYPE = ARRAY(Float).with_variant(_DescendingAmounts(), "sqlite")
+# `BIGINT` primary key of SQLite is not an alias of rowid (not autoincremented).
+_ID_TYPE = BigInteger().with_variant(Integer(), "sqlite")
 
 METADATA = MetaData()
 
 
+def _transaction_columns() -> List[Column]:
+    """Record columns of `Transaction` table (all except `id`)."""
+    return [
+        Column("app_id", BigInteger, nullable=False),
+        Column("xref", BigInteger, nullable=False),
+        Column("settlement_date", Date, nullable=False),
+        Column("broker", String(250), nullable=False),
+        Column("sub_broker", String(250), nullable=True),
+        Column("borrower_name", String(250), nullable=False),
+        Column("description", String(500), nullable=True),
+        Column("total_loan_amount", Float, nullable=False),
+        Column("comm_rate", Float, nullable=False),
+        Column("upfront", Float, nullable=False),
+        Column("upfront_incl_gst", Float, nullable=False),
+    ]
+
+
+def _transaction_indexes(table: Table) -> List[Index]:
+    """Covering indexes of period (`settlement_date` range) & broker queries."""
+    return [
+        Index(
+            "ix_transaction_settlement_date",
+            table.columns["settlement_date"],
+            postgresql_include=["total_loan_amount"],
+        ),
+        Index(
+            "ix_transaction_broker_total_loan_amount",
+            table.columns["broker"],
+            table.columns["total_loan_amount"].desc(),
+        ),
+    ]
+
+
 Transaction = Table(
     "Transaction",
     METADATA,
-    Column("id", BigInteger, primary_key=True, autoincrement=True),
-    Column("app_id", BigInteger, nullable=False),
+    Column("id", _ID_TYPE, primary_key=True, autoincrement=True),
+    *_transaction_columns(),
+    UniqueConstraint("xref", "total_loan_amount"),
+)
+_transaction_indexes(Transaction)
+
+
+# `Transaction` table range partitioned by month of `settlement_date`, used instead
+# of above definition if database is created with monthly partitions (see `Init`).
+# Primary & unique keys of a partitioned table must include the partition column, so
+# unique (xref + total-loan-amount) key is kept in `TransactionKey` table instead.
+PARTITIONED_METADATA = MetaData()
+
+PartitionedTransaction = Table(
+    "Transaction",
+    PARTITIONED_METADATA,
+    Column("id", BigInteger, autoincrement=True),
+    *_transaction_columns(),
+    PrimaryKeyConstraint("id", "settlement_date"),
+    postgresql_partition_by="RANGE (settlement_date)",
+)
+_transaction_indexes(PartitionedTransaction)
+
+# Key of every record in partitioned `Transaction` table (not partitioned), a record
+# is inserted only if its key is inserted in the same transaction (see `Mutation`).
+TransactionKey = Table(
+    "TransactionKey",
+    PARTITIONED_METADATA,
     Column("xref", BigInteger, nullable=False),
-    Column("settlement_date", Date, nullable=False),
+    Column("total_loan_amount", Float, nullable=False),
+    PrimaryKeyConstraint("xref", "total_loan_amount"),
+)
+
+
+# One row per ingested pdf, keyed by sha256 of file content.
+IngestionLedger = Table(
+    "IngestionLedger",
+    METADATA,
+    Column("content_hash", String(64), primary_key=True),
+    Column("page_count", Integer, nullable=False),
+    Column("row_count", Integer, nullable=False),
+    Column("inserted", Integer, nullable=False),
+    Column("skipped", Integer, nullable=False),
+    Column("ingested_at", DateTime, nullable=False),
+)
+
+
+# Aggregates of `Transaction` maintained at insert time (see `Mutation`), reports
+# read these instead of scanning all transactions.
+BrokerDailyRollup = Table(
+    "BrokerDailyRollup",
+    METADATA,
     Column("broker", String(250), nullable=False),
-    Column("sub_broker", String(250), nullable=True),
-    Column("borrower_name", String(250), nullable=False),
-    Column("description", String(500), nullable=True),
+    Column("settlement_date", Date, nullable=False),
     Column("total_loan_amount", Float, nullable=False),
-    Column("comm_rate", Float, nullable=False),
-    Column("upfront", Float, nullable=False),
-    Column("upfront_incl_gst", Float, nullable=False),
-    UniqueConstraint("xref", "total_loan_amount"),
+    Column("loan_count", Integer, nullable=False),
+    Column("max_loan_amount", Float, nullable=False),
+    # All loan amounts of the broker in the day, in descending order.
+    Column("loan_amounts", LOAN_AMOUNTS_TYPE, nullable=False),
+    PrimaryKeyConstraint("broker", "settlement_date"),
+)
+
+
+DailyRollup = Table(
+    "DailyRollup",
+    METADATA,
+    Column("settlement_date", Date, primary_key=True),
+    Column("total_loan_amount", Float, nullable=False),
+    Column("loan_count", Integer, nullable=False),
+    Column("tier1", Integer, nullable=False),
+    Column("tier2", Integer, nullable=False),
+    Column("tier3", Integer, nullable=False),
 )
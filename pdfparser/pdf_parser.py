@@ -13,179 +13,294 @@
     * App ID, Xref, Settlement Date, Broker, Sub Broker, Borrower Name, Description
       Total Loan Amount, Comm Rate, Upfront, Upfront Incl GST
 """
-from typing import TextIO, List, Tuple, Optional
-from datetime import date
+from typing import TextIO, BinaryIO, List, Tuple, Iterator, Union, Optional
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from itertools import repeat
+import io
+import os
 
 from PyPDF2 import PdfReader
-from PyPDF2.errors import PdfReadError
 import tabula
 from pandas.core.frame import DataFrame
 
-from pdfparser.datastructure import TransactionRecord
-
-_COLUMN_NAMES: str = (
-    "AppID"
-    + "Xref"
-    + "SettlementDate"
-    + "Broker"
-    + "SubBroker"
-    + "BorrowerName"
-    + "Description"
-    + "TotalLoanAmount"
-    + "CommRate"
-    + "Upfront"
-    + "UpfrontInclGST"
-)
-_APP_ID_XREF_POS: int = 0
-_SETTLEMENT_DATE_POS: int = 1
-_BROKER_POS: int = 2
-_SUB_BROKER_POS: int = 3
-_BORROWER_NAME_DESCRIPTION_POS: int = -5
-_TOTAL_LOAN_AMOUNT_POS: int = -4
-_COMM_RATE_POS: int = -3
-_UPFRONT_POS: int = -2
-_UPFRONT_INCL_GST_POS: int = -1
-_FULL_ROW_LENGTH: int = 9
+from pdfparser.datastructure import TransactionRecord, RejectedRow, PreflightResult
+from pdfparser.record_converter import RecordConverter
+from pdfparser.record_batch import RecordBatch
+from pdfparser.extractor import WarmExtractor
+from pdfparser.positional_extractor import PositionalExtractor
+from pdfparser.metrics import MetricsRegistry, stage
+from pdfparser.preflight import preflight
+
+_DEFAULT_BATCH_PAGES: int = 10
+# Most columns found by tabula in a page (column count differs between pages, 11
+# columns in the pdf header, empty cells are dropped by `RecordConverter`).
+_MAX_TABLE_COLUMNS: int = 22
+# Read every cell as text, first row is a record (pdf header is not extracted).
+# Column names let later pages have more columns than the first page.
+_PANDAS_OPTIONS: dict = {
+    "header": None,
+    "dtype": str,
+    "names": list(range(_MAX_TABLE_COLUMNS)),
+}
+# Shards per worker, smaller shards balance the load between workers.
+_SHARDS_PER_WORKER: int = 4
+_TABULA_ENGINE: str = "tabula"
+_POSITIONAL_ENGINE: str = "positional"
+_ENGINES: Tuple[str, ...] = (_TABULA_ENGINE, _POSITIONAL_ENGINE)
 
 
 class PDFParser:
     """Parse the given pdf to usable format and raise error for unformatted pdf."""
 
-    def __init__(self, file: TextIO) -> None:
+    def __init__(
+        self,
+        file: TextIO,
+        extractor: Optional[WarmExtractor] = None,
+        engine: str = _TABULA_ENGINE,
+        metrics: Optional[MetricsRegistry] = None,
+        preflight: Optional[PreflightResult] = None,
+    ) -> None:
+        """`engine` is either `tabula` (Java) or `positional` (pure python, see
+        `positional_extractor.py`). Stages are recorded in `metrics` if given (see
+        `metrics.py`). `preflight` is the result of checking the file already (see
+        `preflight.py`), the file is not validated again.
+        """
+        if engine not in _ENGINES:
+            raise ValueError(f"engine should be one of {', '.join(_ENGINES)}.")
         self._file: TextIO = file
+        # Tables are extracted by a warm Java runtime if given (see `extractor.py`).
+        self._extractor: Optional[WarmExtractor] = extractor
+        self._engine: str = engine
+        self._metrics: Optional[MetricsRegistry] = metrics
+        self._preflight: Optional[PreflightResult] = preflight
+        self._positional: Optional[PositionalExtractor] = None
+
+    @property
+    def page_count(self) -> Optional[int]:
+        """Number of pages, available after the pdf is validated."""
+        return self._preflight.page_count if self._preflight else None
 
     def parse(self) -> List[TransactionRecord]:
         """Convert pdf to transaction records."""
-        self._validate_pdf()
-
-        try:
-            df: DataFrame = tabula.read_pdf(
-                self._file, multiple_tables=False, pages="all"
-            )[0]
-        except Exception as _exc:
-            raise ValueError("Could not read the pdf.")
-
-        records: List[TransactionRecord] = []
-        for record_str in df.to_csv().split("\n"):
-            if not record_str:
-                continue
-            records.append(self._form_record(record_str))
-
+        page_count: int = self._validate_pdf()
+        records, rejected, _row_count = self._extract(1, page_count)
+        self._raise_rejected(rejected)
         return records
 
-    def _validate_pdf(self) -> None:
-        """Raise type-error if pdf is not valid.
+    def parse_batch(self) -> RecordBatch:
+        """Convert pdf to transaction records as columns (see `record_batch.py`).
 
-        * If file name not ends with `.pdf`.
-        * If unable to parse pdf with library.
-        * If pdf header does not contain all required columns.
+        Same records as `parse` in a compact form for large statements, no object is
+        created per row by tabula engine. Result can be passed directly to
+        `Mutation.bulk_insert_transactions`.
         """
-        if not self._file.name.endswith(".pdf"):
-            raise TypeError("Only .pdf files are supported.")
+        page_count: int = self._validate_pdf()
+        if self._engine == _POSITIONAL_ENGINE:
+            # Positional engine forms records row by row.
+            records, rejected, _row_count = self._extract(1, page_count)
+            self._raise_rejected(rejected)
+            return RecordBatch.from_records(records)
+        df: DataFrame = self._read_table(1, page_count)
+        with stage(self._metrics, "parse.convert") as timer:
+            batch, rejected = RecordConverter(df).convert_batch()
+            timer.rows, timer.failures = len(batch), len(rejected)
+        self._raise_rejected(rejected)
+        return batch
 
-        try:
-            # Trying to read pdf and extract column names from first line.
-            if ("").join(
-                PdfReader(self._file).pages[0].extract_text().split("GST")[0].split()
-            ) + "GST" != _COLUMN_NAMES:
-                raise TypeError("pdf does not contain all required columns.")
-        except PdfReadError:
-            raise TypeError("Invalid pdf format.")
-
-    def _form_record(self, record_data: str) -> TransactionRecord:
-        """Validate all record fields like `float`, `date` etc. then convert."""
-        data: List[str] = record_data.split(",")[1:]
-        # Remove `None` and `Unnamed` values.
-        data = list(filter(lambda val: val and not val.startswith("Unnamed: "), data))
-        self._join_float_values(data)
-        app_id, xref = data[_APP_ID_XREF_POS].split(" ")
-        borrower_name, description = self._form_borrower_name_and_description(
-            data[_BORROWER_NAME_DESCRIPTION_POS]
-        )
-        sub_broker: Optional[str] = None
-        if len(data) == _FULL_ROW_LENGTH:
-            sub_broker = data[_SUB_BROKER_POS]
-        if not borrower_name and sub_broker:
-            borrower_name, sub_broker = self._form_borrower_name_and_sub_broker(
-                sub_broker
-            )
+    def parse_parallel(
+        self, workers: Optional[int] = None, shard_pages: Optional[int] = None
+    ) -> List[TransactionRecord]:
+        """Convert pdf to transaction records, page shards are extracted in parallel.
 
-        return TransactionRecord(
-            app_id=int(app_id),
-            xref=int(xref),
-            settlement_date=self._form_date(data[_SETTLEMENT_DATE_POS]),
-            broker=data[_BROKER_POS],
-            sub_broker=sub_broker,
-            borrower_name=borrower_name,
-            description=description,
-            total_loan_amount=float(data[_TOTAL_LOAN_AMOUNT_POS]),
-            comm_rate=float(data[_COMM_RATE_POS]),
-            upfront=float(data[_UPFRONT_POS]),
-            upfront_incl_gst=float(data[_UPFRONT_INCL_GST_POS]),
+        Page range is split to shards of `shard_pages` pages (by default enough
+        shards to keep every worker busy), each shard is extracted in a worker
+        process and results are merged in page order. Result is the same as
+        `parse`, column header is only required on first page.
+        """
+        if shard_pages is not None and shard_pages < 1:
+            raise ValueError("shard_pages should be a positive integer.")
+        page_count: int = self._validate_pdf()
+        workers = workers or os.cpu_count() or 1
+        shard_pages = shard_pages or max(
+            _DEFAULT_BATCH_PAGES, -(-page_count // (workers * _SHARDS_PER_WORKER))
         )
+        shards: List[Tuple[int, int]] = [
+            (start, min(start + shard_pages - 1, page_count))
+            for start in range(1, page_count + 1, shard_pages)
+        ]
+        if workers == 1 or len(shards) == 1:
+            return self.parse()
 
-    @staticmethod
-    def _join_float_values(data: List[str]) -> None:
-        """Join float values split by `,`.
-        # eg: ['"35', '890.00"'] -> 35890.00
-        """
-        for pos, val in enumerate(data):
-            if len(val) > 1 and val[0].startswith('"') and val[1].isdigit():
-                iter: int = pos + 1
-                while iter < len(data):
-                    sub_val: str = data.pop(iter)
-                    val += sub_val
-                    # last piece to join for a float value.
-                    if sub_val.endswith('"'):
-                        break
-                    iter += 1
-                val = val.strip('"')
-                data[pos] = val
+        source: Union[str, bytes] = self._shard_source()
+        records: List[TransactionRecord] = []
+        rejected: List[RejectedRow] = []
+        row_offset: int = 0
+        # `spawn`, a forked worker hangs if this process has started a JVM.
+        # Extraction & conversion of all shards is recorded as one extract stage.
+        with stage(self._metrics, "parse.extract") as timer, ProcessPoolExecutor(
+            max_workers=min(workers, len(shards)), mp_context=get_context("spawn")
+        ) as executor:
+            # `map` returns shards in page order.
+            for shard_records, shard_rejected, row_count in executor.map(
+                _extract_shard,
+                repeat(source),
+                repeat(self._engine),
+                repeat(self._preflight),
+                *zip(*shards),
+            ):
+                records.extend(shard_records)
+                # Row numbers of a shard are counted from its first row.
+                rejected.extend(
+                    RejectedRow(row.row_number + row_offset, row.reason)
+                    for row in shard_rejected
+                )
+                row_offset += row_count
+            timer.rows = row_offset
+            timer.failures = len(rejected)
+        self._raise_rejected(rejected)
+        return records
 
-    @staticmethod
-    def _form_borrower_name_and_description(name_and_desc: str) -> Tuple[str, str]:
-        """Borrowner name & description is combined after parsing pdf.
+    def iter_records(
+        self, batch_pages: int = _DEFAULT_BATCH_PAGES
+    ) -> Iterator[TransactionRecord]:
+        """Convert pdf to transaction records, `batch_pages` pages at a time.
 
-        Assumption: Borrower name will be capitalised always in given data.
+        Only one chunk of pages is held in memory and records are yielded as soon as
+        their chunk is parsed, so the result can be passed directly to
+        `Mutation.bulk_insert_transactions`.
+        """
+        if batch_pages < 1:
+            raise ValueError("batch_pages should be a positive integer.")
+        page_count: int = self._validate_pdf()
+
+        row_offset: int = 0
+        for start in range(1, page_count + 1, batch_pages):
+            end: int = min(start + batch_pages - 1, page_count)
+            records, rejected, row_count = self._extract(start, end, row_offset)
+            self._raise_rejected(rejected)
+            row_offset += row_count
+            yield from records
 
-        eg: CHELSEA BIANCA VANDERAA Upfront Commission
+    def _extract(
+        self, first_page: int, last_page: int, row_offset: int = 0
+    ) -> Tuple[List[TransactionRecord], List[RejectedRow], int]:
+        """Records, rejected rows & number of rows of pages `first_page` to
+        `last_page`.
         """
-        name_and_desc_split: List[str] = name_and_desc.split(" ")
-        for pos, sub_str in enumerate(name_and_desc_split):
-            # found the separation position.
-            if sub_str != sub_str.upper():
-                return (
-                    " ".join(name_and_desc_split[:pos]),
-                    " ".join(name_and_desc_split[pos:]),
+        if self._engine == _POSITIONAL_ENGINE:
+            # Column positions are located once, on first page (or reused from
+            # preflight).
+            if self._positional is None:
+                self._positional = PositionalExtractor(
+                    PdfReader(self._file),
+                    self._preflight.column_starts if self._preflight else None,
                 )
-        raise ValueError(
-            f"Unable to find borrower-name & description from '{name_and_desc}'"
+            # Text is extracted & converted row by row, recorded as one stage.
+            with stage(self._metrics, "parse.extract") as timer:
+                result: Tuple[
+                    List[TransactionRecord], List[RejectedRow], int
+                ] = self._positional.extract(first_page, last_page, row_offset)
+                timer.rows, timer.failures = result[2], len(result[1])
+            return result
+        df: DataFrame = self._read_table(first_page, last_page)
+        with stage(self._metrics, "parse.convert") as timer:
+            result = self._convert(df, row_offset)
+            timer.rows, timer.failures = len(result[0]), len(result[1])
+        return result
+
+    def _read_table(self, first_page: int, last_page: int) -> DataFrame:
+        """Extract the table of pages `first_page` to `last_page` with tabula."""
+        pages: str = (
+            "all"
+            if (first_page, last_page) == (1, self.page_count)
+            else f"{first_page}-{last_page}"
         )
+        with stage(self._metrics, "parse.extract") as timer:
+            df: DataFrame = self._read_pages(pages)
+            timer.rows = len(df)
+        return df
 
-    @staticmethod
-    def _form_borrower_name_and_sub_broker(sub_broker_and_name: str) -> Tuple[str, str]:
-        """Form borrower name & sub broker if borrower name is not along with
-        description.
+    def _read_pages(self, pages: str) -> DataFrame:
+        """Extract the table in given pages (tabula format eg: `all`, `1-10`)."""
+        try:
+            read_pdf = self._extractor.read_pdf if self._extractor else tabula.read_pdf
+            return read_pdf(
+                self._tabula_source(),
+                multiple_tables=False,
+                pages=pages,
+                pandas_options=_PANDAS_OPTIONS,
+            )[0]
+        except Exception as _exc:
+            raise ValueError("Could not read the pdf.")
 
-        Assumption: Borrower name will be capitalised always in given data.
+    def _tabula_source(self) -> Union[str, TextIO]:
+        """File path if available, otherwise the file object.
 
-        eg: Aagam Pabari ANJAN GUPTA
-            Rhiannon Clancy-BurnsSARA FLOWER
+        Passing path avoids tabula copying the whole file for each page chunk.
+        """
+        if os.path.isfile(getattr(self._file, "name", "")):
+            return self._file.name
+        self._file.seek(0)
+        return self._file
 
+    def _shard_source(self) -> Union[str, bytes]:
+        """File path if available, otherwise the file content (for worker process)."""
+        if os.path.isfile(getattr(self._file, "name", "")):
+            return self._file.name
+        self._file.seek(0)
+        return self._file.read()
+
+    @staticmethod
+    def _convert(
+        df: DataFrame, row_offset: int = 0
+    ) -> Tuple[List[TransactionRecord], List[RejectedRow], int]:
+        """Convert rows of an extracted table, return records, rejected rows &
+        number of rows.
         """
-        for pos in range(len(sub_broker_and_name) - 1, -1, -1):
-            if not sub_broker_and_name[pos].isalpha():
-                continue
-            # Found the separation index.
-            if sub_broker_and_name[pos] != sub_broker_and_name[pos].upper():
-                return (
-                    sub_broker_and_name[pos + 1 :].strip(),
-                    sub_broker_and_name[: pos + 1].strip(),
-                )
-        return sub_broker_and_name, ""
+        records, rejected = RecordConverter(df, row_offset).convert()
+        return records, rejected, len(df)
 
     @staticmethod
-    def _form_date(date_str: str) -> date:
-        """Form date object from date string in format `dd/mm/yyyy`"""
-        day, month, year = date_str.split("/")
-        return date(day=int(day), month=int(month), year=int(year))
+    def _raise_rejected(rejected: List[RejectedRow]) -> None:
+        """Raise value-error listing all rows which are not in intended format."""
+        if rejected:
+            raise ValueError(
+                "Unable to convert rows: "
+                + ", ".join(f"{row.row_number} ({row.reason})" for row in rejected)
+            )
+
+    def _validate_pdf(self) -> int:
+        """Raise type-error if pdf is not valid, return number of pages otherwise.
+
+        * If file name not ends with `.pdf`.
+        * If pdf can not be read (see `preflight.py`).
+        * If pdf header does not contain all required columns.
+        """
+        if self._preflight is None:
+            if not self._file.name.endswith(".pdf"):
+                raise TypeError("Only .pdf files are supported.")
+            with stage(self._metrics, "parse.validate") as timer:
+                self._preflight = preflight(self._file)
+                timer.bytes_read = self._preflight.size
+        return self._preflight.page_count
+
+
+def _extract_shard(
+    source: Union[str, bytes],
+    engine: str,
+    preflight_result: PreflightResult,
+    first_page: int,
+    last_page: int,
+) -> Tuple[List[TransactionRecord], List[RejectedRow], int]:
+    """Extract a page shard of an already validated pdf (executed in worker process).
+
+    Row numbers of rejected rows are counted from first row of the shard.
+    """
+    file: BinaryIO = (
+        open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
+    )
+    with file:
+        return PDFParser(file, engine=engine, preflight=preflight_result)._extract(
+            first_page, last_page
+        )
@@ -0,0 +1,174 @@
+"""Extract records from text positions, without Java.
+
+The statement layout is fixed, every column starts at the x position of its header
+label on the first page. Text fragments reported by PyPDF2 (with their position) are
+bucketed to the column they start in and grouped to rows by their y position, so
+borrower name, description & sub broker never need to be separated by guessing.
+
+    App ID      Xref        Settlement Date ... Upfront Incl GST
+    80185884    100305936   17/10/2023      ... 710.62
+"""
+from typing import List, Tuple, Dict, Optional, Iterator
+from datetime import datetime
+from bisect import bisect_right
+
+from PyPDF2 import PdfReader
+from PyPDF2._page import PageObject
+
+from pdfparser.datastructure import TransactionRecord, RejectedRow
+from pdfparser.preflight import COLUMN_HEADERS, Fragment, locate_columns
+
+# App ID cell of the header line which holds column labels.
+_HEADER_APP_ID: str = "App ID"
+_APP_ID_COL: int = 0
+_XREF_COL: int = 1
+_SETTLEMENT_DATE_COL: int = 2
+_BROKER_COL: int = 3
+_SUB_BROKER_COL: int = 4
+_BORROWER_NAME_COL: int = 5
+_DESCRIPTION_COL: int = 6
+_TOTAL_LOAN_AMOUNT_COL: int = 7
+_COMM_RATE_COL: int = 8
+_UPFRONT_COL: int = 9
+_UPFRONT_INCL_GST_COL: int = 10
+_DATE_FORMAT: str = "%d/%m/%Y"
+# Text may start slightly left of its header label.
+_X_TOLERANCE: float = 2.0
+# Fragments within this vertical distance belong to the same row.
+_Y_TOLERANCE: float = 2.0
+
+
+class PositionalExtractor:
+    """Extract transaction records from a pdf in the predefined layout."""
+
+    def __init__(
+        self, reader: PdfReader, column_starts: Optional[List[float]] = None
+    ) -> None:
+        """`column_starts` are located on first page if not given (eg: by
+        `preflight`).
+        """
+        self._reader: PdfReader = reader
+        self._column_starts: List[float] = column_starts or self._locate_header(
+            reader.pages[0]
+        )
+
+    def extract(
+        self, first_page: int = 1, last_page: Optional[int] = None, row_offset: int = 0
+    ) -> Tuple[List[TransactionRecord], List[RejectedRow], int]:
+        """Records of pages `first_page` to `last_page` (1 based, inclusive).
+
+        Return records, rejected rows & number of rows.
+        """
+        last_page = last_page or len(self._reader.pages)
+        records: List[TransactionRecord] = []
+        rejected: List[RejectedRow] = []
+        row_number: int = row_offset
+
+        for page_number in range(first_page, last_page + 1):
+            for cells in self._iter_rows(page_number):
+                row_number += 1
+                try:
+                    records.append(self._form_record(cells))
+                except ValueError as exc:
+                    rejected.append(RejectedRow(row_number, str(exc)))
+        return records, rejected, row_number - row_offset
+
+    def _iter_rows(self, page_number: int) -> Iterator[List[str]]:
+        """Cells of each table row of a page.
+
+        Header (on first page, may be repeated on others), footer & other lines
+        without an app-id are skipped.
+        """
+        fragments: List[Fragment] = text_fragments(self._reader.pages[page_number - 1])
+
+        rows: Dict[float, List[Fragment]] = {}
+        for frag in fragments:
+            rows.setdefault(self._row_key(rows, frag[1]), []).append(frag)
+
+        for y in sorted(rows, reverse=True):
+            cells: List[str] = [""] * len(COLUMN_HEADERS)
+            for x, _y, text in sorted(rows[y]):
+                col: int = bisect_right(self._column_starts, x + _X_TOLERANCE) - 1
+                if col >= 0:
+                    cells[col] += text
+            cells = [cell.strip() for cell in cells]
+            if cells[_APP_ID_COL] and cells[_APP_ID_COL] != _HEADER_APP_ID:
+                yield cells
+
+    @staticmethod
+    def _row_key(rows: Dict[float, List[Fragment]], y: float) -> float:
+        """y of an existing row within tolerance, otherwise `y` itself."""
+        for row_y in rows:
+            if abs(row_y - y) <= _Y_TOLERANCE:
+                return row_y
+        return y
+
+    @staticmethod
+    def _form_record(cells: List[str]) -> TransactionRecord:
+        """Validate all record fields like `float`, `date` etc. then convert."""
+        try:
+            settlement_date = datetime.strptime(
+                cells[_SETTLEMENT_DATE_COL], _DATE_FORMAT
+            ).date()
+        except ValueError:
+            raise ValueError("Unformatted settlement date.")
+        if not cells[_BROKER_COL] or not cells[_BORROWER_NAME_COL]:
+            raise ValueError("Broker or borrower name is missing.")
+
+        return TransactionRecord(
+            app_id=_to_int(cells[_APP_ID_COL], "app-id"),
+            xref=_to_int(cells[_XREF_COL], "xref"),
+            settlement_date=settlement_date,
+            broker=cells[_BROKER_COL],
+            sub_broker=cells[_SUB_BROKER_COL] or None,
+            borrower_name=cells[_BORROWER_NAME_COL],
+            description=cells[_DESCRIPTION_COL],
+            total_loan_amount=_to_float(
+                cells[_TOTAL_LOAN_AMOUNT_COL], "total loan amount"
+            ),
+            comm_rate=_to_float(cells[_COMM_RATE_COL], "comm rate"),
+            upfront=_to_float(cells[_UPFRONT_COL], "upfront"),
+            upfront_incl_gst=_to_float(
+                cells[_UPFRONT_INCL_GST_COL], "upfront incl gst"
+            ),
+        )
+
+    @staticmethod
+    def _locate_header(page: PageObject) -> List[float]:
+        """x position where each column starts."""
+        return locate_columns(text_fragments(page))
+
+
+def text_fragments(page: PageObject) -> List[Fragment]:
+    """All non blank text fragments of a page with their position."""
+    fragments: List[Fragment] = []
+
+    def visitor(text: str, cm: list, tm: list, _font: dict, _size: float) -> None:
+        if text.strip():
+            # Text position in user space (text matrix x current transformation).
+            fragments.append(
+                (
+                    tm[4] * cm[0] + tm[5] * cm[2] + cm[4],
+                    tm[4] * cm[1] + tm[5] * cm[3] + cm[5],
+                    text,
+                )
+            )
+
+    page.extract_text(visitor_text=visitor)
+    return fragments
+
+
+def _to_int(value: str, name: str) -> int:
+    """int value of a cell, raise value-error if not an integer."""
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Unformatted {name}.")
+
+
+def _to_float(value: str, name: str) -> float:
+    """float value of a cell (thousands separators removed)."""
+    try:
+        return float(value.replace(",", ""))
+    except ValueError:
+        raise ValueError(f"Unformatted {name}.")
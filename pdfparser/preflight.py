@@ -0,0 +1,713 @@
+"""Check pdfs before parsing them, without tabula or a full pdf reader.
+
+Meant for gatekeeping uploads (thousands of files per second): the file is memory
+mapped and only bytes which are needed are read:-
+
+    * `%PDF-` magic bytes at the start & `%%EOF` marker at the end (eg: truncated
+      uploads).
+    * Page count of the page tree (cross-reference table -> catalog -> pages).
+    * Column header of first page: content stream of the page is decompressed only
+      until the header ends, text is decoded with `ToUnicode` map of its font.
+
+Pdfs with structures not read here (cross-reference streams, encryption, fonts
+without unicode map etc.) are checked with PyPDF2 instead, same result but slower.
+`PDFParser` reuses the result (page count & column positions), a checked file is not
+read again for validation.
+
+eg:-
+
+    result: PreflightResult = preflight(file)
+    records = PDFParser(file, preflight=result).parse()
+
+    results, errors = preflight_files(glob.glob("/uploads/*.pdf"))
+"""
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from contextlib import contextmanager
+import io
+import mmap
+import re
+import zlib
+
+from pdfparser.datastructure import PreflightResult
+
+# Column names of the header, without spaces.
+_COLUMN_NAMES: str = (
+    "AppID"
+    + "Xref"
+    + "SettlementDate"
+    + "Broker"
+    + "SubBroker"
+    + "BorrowerName"
+    + "Description"
+    + "TotalLoanAmount"
+    + "CommRate"
+    + "Upfront"
+    + "UpfrontInclGST"
+)
+# Header ends with the last column name.
+_HEADER_END: str = "GST"
+# First word of each column header, in column order.
+COLUMN_HEADERS: Tuple[str, ...] = (
+    "App",
+    "Xref",
+    "Settlement",
+    "Broker",
+    "Sub",
+    "Borrower",
+    "Description",
+    "Total",
+    "Comm",
+    "Upfront",
+    "Upfront",
+)
+_MAGIC: bytes = b"%PDF-"
+_EOF_MARKER: bytes = b"%%EOF"
+_STARTXREF: bytes = b"startxref"
+# Magic bytes & end marker are searched within this many bytes of start & end.
+_MARKER_WINDOW: int = 1024
+# Entry of a cross-reference table, eg: b"0000000017 00000 n\r\n".
+_XREF_ENTRY_SIZE: int = 20
+# First chunk of compressed content read, doubled until the header is found.
+_CONTENT_CHUNK: int = 4096
+# Deepest page tree searched for first page.
+_MAX_TREE_DEPTH: int = 32
+# Gap in a `TJ` array (thousandths of text space) read as a space, about the width
+# of a space glyph.
+_TJ_SPACE: float = 250
+# Operators which change text position or show text (`BI` & `Do` are not read).
+_TEXT_OPERATORS: frozenset = frozenset(
+    (b"q", b"Q", b"cm", b"BT", b"Tf", b"Tm", b"Td", b"TD", b"TL", b"T*", b"'", b'"')
+    + (b"Tj", b"TJ", b"BI", b"Do")
+)
+# `bfrange` of up to this many codes is stored per code (faster lookup).
+_EXPANDED_RANGE: int = 256
+_IDENTITY: Tuple[float, ...] = (1, 0, 0, 1, 0, 0)
+_INVALID_PDF: str = "Invalid pdf format."
+_MISSING_COLUMNS: str = "pdf does not contain all required columns."
+
+# A token after whitespace & comments, its kind is the name of the matched group.
+_TOKEN = re.compile(
+    rb"(?:[\x00\s]|%[^\r\n]*)*(?:"
+    rb"(?P<number>[+-]?(?:\d+(?P<fraction>\.\d*)?|(?P<point>\.)\d+))"
+    rb"(?![^\x00\s/\[\]()<>{}%])"
+    rb"|(?P<name>/[^\x00\s/\[\]()<>{}%]*)"
+    rb"|(?P<dict><<)|(?P<array>\[)|(?P<literal>\()"
+    rb"|<(?P<hex>[0-9A-Fa-f\x00\s]*)>"
+    rb"|(?P<keyword>>>|\]|[^\x00\s/\[\]()<>{}%]+))"
+)
+_INTEGER = re.compile(rb"[\x00\s]*(\d+)")
+# Generation & `R` following the object number of a reference.
+_REF_TAIL = re.compile(rb"[\x00\s]+(\d+)[\x00\s]+R(?![^\x00\s/\[\]()<>{}%])")
+_OBJECT_HEADER = re.compile(rb"[\x00\s]*(\d+)[\x00\s]+(\d+)[\x00\s]+obj")
+_SUBSECTION = re.compile(rb"[\x00\s]*(\d+)[ \t]+(\d+)[ \t]*\r?\n?")
+_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+_STREAM_START = re.compile(rb"[\x00\s]*stream\r?\n")
+_LITERAL_PART = re.compile(rb"[^()\\]+")
+_OCTAL = re.compile(rb"[0-7]{1,3}")
+_CODESPACE = re.compile(rb"begincodespacerange\s*<([0-9A-Fa-f]+)>")
+_BFCHAR = re.compile(rb"beginbfchar(.*?)endbfchar", re.S)
+_BFRANGE = re.compile(rb"beginbfrange(.*?)endbfrange", re.S)
+_HEX = re.compile(rb"<([0-9A-Fa-f\s]*)>")
+_RANGE = re.compile(
+    rb"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f\s]*>|\[[^\]]*\])"
+)
+_ESCAPES: Dict[int, bytes] = {
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+}
+
+# (x, y, text) of a text fragment.
+Fragment = Tuple[float, float, str]
+
+
+class _Unsupported(Exception):
+    """Pdf structure which is not read here, file is checked with PyPDF2 instead."""
+
+
+class _Ref(NamedTuple):
+    """Indirect object reference (eg: `2 0 R`)."""
+
+    number: int
+    generation: int
+
+
+class _Operator(str):
+    """Keyword of a content stream (eg: `Tj`) or of object syntax (eg: `stream`)."""
+
+
+class _Stream(NamedTuple):
+    """Stream object, its dictionary & position of its data."""
+
+    attributes: dict
+    start: int
+
+
+def preflight(file: BinaryIO) -> PreflightResult:
+    """Raise type-error if the pdf is not valid, return its page count & column
+    positions otherwise. File position is kept.
+
+    * If magic bytes or end marker are missing.
+    * If pdf structure can not be read.
+    * If header of first page does not contain all required columns.
+    """
+    with _mapped(file) as data:
+        if (
+            _MAGIC not in data[:_MARKER_WINDOW]
+            or _EOF_MARKER not in data[-_MARKER_WINDOW:]
+        ):
+            raise TypeError(_INVALID_PDF)
+        try:
+            page_count, column_starts = _Document(data).read_header()
+        except _Unsupported:
+            page_count, column_starts = _read_header_with_reader(data)
+        return PreflightResult(
+            page_count=page_count, size=len(data), column_starts=column_starts
+        )
+
+
+def preflight_files(
+    paths: Iterable[str],
+) -> Tuple[Dict[str, PreflightResult], Dict[str, str]]:
+    """Results of valid files & error message of other files, keyed by path."""
+    results: Dict[str, PreflightResult] = {}
+    errors: Dict[str, str] = {}
+    for path in paths:
+        try:
+            with open(path, "rb") as file:
+                results[path] = preflight(file)
+        except (TypeError, OSError) as exc:
+            errors[path] = f"{type(exc).__name__}: {exc}"
+    return results, errors
+
+
+def locate_columns(fragments: Iterable[Fragment]) -> List[float]:
+    """x position where each column starts, from text fragments of the header."""
+    starts: List[float] = []
+    for x, _y, text in fragments:
+        if len(starts) == len(COLUMN_HEADERS):
+            break
+        if text.split()[0] == COLUMN_HEADERS[len(starts)]:
+            starts.append(x)
+    if len(starts) != len(COLUMN_HEADERS):
+        raise TypeError(_MISSING_COLUMNS)
+    return starts
+
+
+@contextmanager
+def _mapped(file: BinaryIO) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Content of a file, memory mapped if it is a file on disk."""
+    try:
+        fileno: Optional[int] = file.fileno()
+    except (AttributeError, OSError):
+        fileno = None
+    if fileno is None:
+        # eg: `BytesIO` of an upload.
+        position: int = file.tell()
+        file.seek(0)
+        content: bytes = file.read()
+        file.seek(position)
+        yield content
+        return
+    try:
+        data: mmap.mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty file can not be mapped.
+        raise TypeError(_INVALID_PDF)
+    with data:
+        yield data
+
+
+def _check_header(fragments: Iterable[Fragment]) -> Optional[List[float]]:
+    """Column positions if fragments contain the whole header, `None` if the header
+    has not ended yet. Raise type-error if the header is not the expected one.
+    """
+    header: List[Fragment] = []
+    text: str = ""
+    for fragment in fragments:
+        header.append(fragment)
+        text += fragment[2]
+        if _HEADER_END in text:
+            break
+    else:
+        return None
+    if "".join(text.split(_HEADER_END)[0].split()) + _HEADER_END != _COLUMN_NAMES:
+        raise TypeError(_MISSING_COLUMNS)
+    return locate_columns(header)
+
+
+def _read_header_with_reader(data: Union[mmap.mmap, bytes]) -> Tuple[int, List[float]]:
+    """Page count & column positions read by PyPDF2 (whole first page is read)."""
+    # Imported only for pdfs which are not read by `_Document`.
+    from PyPDF2 import PdfReader
+
+    from pdfparser.positional_extractor import text_fragments
+
+    try:
+        reader: PdfReader = PdfReader(
+            data if isinstance(data, mmap.mmap) else io.BytesIO(data)
+        )
+        fragments: List[Fragment] = text_fragments(reader.pages[0])
+        page_count: int = len(reader.pages)
+    except Exception as exc:
+        raise TypeError(_INVALID_PDF) from exc
+    column_starts: Optional[List[float]] = _check_header(fragments)
+    if column_starts is None:
+        raise TypeError(_MISSING_COLUMNS)
+    return page_count, column_starts
+
+
+class _Document:
+    """Objects of a pdf with a cross-reference table, read on demand."""
+
+    def __init__(self, data: Union[mmap.mmap, bytes]) -> None:
+        self._data: Union[mmap.mmap, bytes] = data
+        # (first object number, count, position of first entry) of each
+        # cross-reference subsection, latest update first.
+        self._sections: List[Tuple[int, int, int]] = []
+        self._objects: Dict[int, Any] = {}
+        self._trailer: dict = self._read_xref()
+
+    def read_header(self) -> Tuple[int, List[float]]:
+        """Page count & column positions, raise `_Unsupported` if the pdf can not be
+        read here.
+        """
+        try:
+            catalog: dict = self.resolve(self._trailer["/Root"])
+            pages: dict = self.resolve(catalog["/Pages"])
+            page_count: int = self.resolve(pages["/Count"])
+            page, resources = self._first_page(pages)
+            font_dicts: dict = self.resolve(
+                self.resolve(resources or {}).get("/Font", {})
+            )
+            fonts: Dict[str, Optional[_Font]] = {}
+
+            def font(name: str) -> Optional[_Font]:
+                """Font of a resource name, read when it is first used."""
+                if name not in fonts:
+                    fonts[name] = (
+                        _Font(self, self.resolve(font_dicts[name]))
+                        if name in font_dicts
+                        else None
+                    )
+                return fonts[name]
+
+            column_starts: Optional[List[float]] = None
+            for content in self._contents(page):
+                column_starts = _check_header(_text_fragments(content, font))
+                if column_starts is not None:
+                    break
+        except (
+            KeyError,
+            IndexError,
+            ValueError,
+            TypeError,
+            AttributeError,
+            zlib.error,
+        ):
+            raise _Unsupported()
+        if not isinstance(page_count, int) or page_count < 1:
+            raise _Unsupported()
+        if column_starts is None:
+            raise TypeError(_MISSING_COLUMNS)
+        return page_count, column_starts
+
+    def _read_xref(self) -> dict:
+        """Read cross-reference sections (`startxref` & `/Prev` chain), return the
+        latest trailer.
+        """
+        data: Union[mmap.mmap, bytes] = self._data
+        position: int = data.rfind(_STARTXREF, max(0, len(data) - _MARKER_WINDOW))
+        match = _INTEGER.match(data, position + len(_STARTXREF))
+        if position < 0 or not match:
+            raise TypeError(_INVALID_PDF)
+        offset: Optional[int] = int(match.group(1))
+        trailer: Optional[dict] = None
+        seen: set = set()
+        while offset is not None and offset not in seen:
+            seen.add(offset)
+            if data[offset : offset + 4] != b"xref":
+                # Cross-reference stream (pdf 1.5+).
+                raise _Unsupported()
+            position = offset + 4
+            while match := _SUBSECTION.match(data, position):
+                first, count = int(match.group(1)), int(match.group(2))
+                self._sections.append((first, count, match.end()))
+                position = match.end() + count * _XREF_ENTRY_SIZE
+            keyword, position = _parse(data, position)
+            if keyword != "trailer":
+                raise _Unsupported()
+            section_trailer, _position = _parse(data, position, refs=True)
+            if not isinstance(section_trailer, dict) or "/Encrypt" in section_trailer:
+                raise _Unsupported()
+            trailer = trailer or section_trailer
+            offset = section_trailer.get("/Prev")
+        return trailer
+
+    def resolve(self, value: Any) -> Any:
+        """Object of a reference, other values as they are."""
+        while isinstance(value, _Ref):
+            if value.number not in self._objects:
+                self._objects[value.number] = self._read_object(value.number)
+            value = self._objects[value.number]
+        return value
+
+    def _read_object(self, number: int) -> Any:
+        """Object (`None` if free) from its cross-reference entry."""
+        for first, count, entries in self._sections:
+            if first <= number < first + count:
+                position: int = entries + (number - first) * _XREF_ENTRY_SIZE
+                entry = _ENTRY.match(self._data, position)
+                if not entry:
+                    raise _Unsupported()
+                if entry.group(3) == b"f":
+                    return None
+                header = _OBJECT_HEADER.match(self._data, int(entry.group(1)))
+                if not header or int(header.group(1)) != number:
+                    raise _Unsupported()
+                value, position = _parse(self._data, header.end(), refs=True)
+                stream = _STREAM_START.match(self._data, position)
+                if isinstance(value, dict) and stream:
+                    return _Stream(value, stream.end())
+                return value
+        # eg: object in a compressed object stream.
+        raise _Unsupported()
+
+    def _first_page(self, pages: dict) -> Tuple[dict, Any]:
+        """First page of page tree & its (maybe inherited) resources."""
+        node: dict = pages
+        resources: Any = pages.get("/Resources")
+        for _depth in range(_MAX_TREE_DEPTH):
+            if node.get("/Type") != "/Pages":
+                return node, node.get("/Resources", resources)
+            node = self.resolve(self.resolve(node["/Kids"])[0])
+            resources = node.get("/Resources", resources)
+        raise _Unsupported()
+
+    def _contents(self, page: dict) -> Iterator[bytes]:
+        """Decompressed content of a page, growing until the whole content is read."""
+        contents: Any = self.resolve(page.get("/Contents"))
+        streams: List[_Stream] = [
+            self.resolve(stream)
+            for stream in (contents if isinstance(contents, list) else [contents])
+        ]
+        content: bytes = b""
+        for stream in streams:
+            for chunk in self.stream_chunks(stream):
+                content += chunk
+                yield content
+
+    def stream_chunks(self, stream: _Stream) -> Iterator[bytes]:
+        """Decompressed data of a stream in chunks, first chunks are small."""
+        length: int = self.resolve(stream.attributes["/Length"])
+        encoded: Union[mmap.mmap, bytes] = self._data
+        end: int = stream.start + length
+        filters: Any = self.resolve(stream.attributes.get("/Filter"))
+        filters = filters if isinstance(filters, list) else [filters]
+        if filters == [None]:
+            yield encoded[stream.start : end]
+            return
+        if filters != ["/FlateDecode"] or stream.attributes.get("/DecodeParms"):
+            raise _Unsupported()
+        decompressor = zlib.decompressobj()
+        position: int = stream.start
+        chunk_size: int = _CONTENT_CHUNK
+        while position < end and not decompressor.eof:
+            yield decompressor.decompress(
+                encoded[position : min(position + chunk_size, end)]
+            )
+            position += chunk_size
+            chunk_size *= 2
+
+
+class _Font:
+    """Decode text of a font, with its `ToUnicode` map if it has one."""
+
+    def __init__(self, document: _Document, font: dict) -> None:
+        self._width: int = 1
+        self._chars: Dict[int, str] = {}
+        # (first code, last code, unicode of first code) of ranges too wide to be
+        # stored per code.
+        self._ranges: List[Tuple[int, int, str]] = []
+        to_unicode: Any = document.resolve(font.get("/ToUnicode"))
+        if isinstance(to_unicode, _Stream):
+            self._read_cmap(b"".join(document.stream_chunks(to_unicode)))
+        elif font.get("/Subtype") == "/Type0" or isinstance(
+            document.resolve(font.get("/Encoding")), dict
+        ):
+            # Glyph codes are not character codes.
+            raise _Unsupported()
+        else:
+            # Single byte codes of a standard encoding.
+            self._width = 0
+
+    def decode(self, raw: bytes) -> str:
+        """Text of a string operand."""
+        if not self._width:
+            return raw.decode("cp1252", errors="replace")
+        text: List[str] = []
+        for start in range(0, len(raw), self._width):
+            code: int = int.from_bytes(raw[start : start + self._width], "big")
+            char: Optional[str] = self._chars.get(code)
+            text.append(char if char is not None else self._range_char(code))
+        return "".join(text)
+
+    def _range_char(self, code: int) -> str:
+        """Unicode of a code of a wide range, the code itself if it is not mapped."""
+        for first, last, unicode in self._ranges:
+            if first <= code <= last:
+                return _offset(unicode, code - first)
+        return chr(code)
+
+    def _read_cmap(self, cmap: bytes) -> None:
+        """Codes & their unicode from `bfchar` & `bfrange` blocks of a cmap."""
+        codespace = _CODESPACE.search(cmap)
+        self._width = len(codespace.group(1)) // 2 if codespace else 1
+        for block in _BFCHAR.findall(cmap):
+            hexes: List[bytes] = _HEX.findall(block)
+            for code, unicode in zip(hexes[::2], hexes[1::2]):
+                self._chars[int(code, 16)] = _utf16(unicode)
+        for block in _BFRANGE.findall(cmap):
+            for first, last, unicode in _RANGE.findall(block):
+                start, end = int(first, 16), int(last, 16)
+                if unicode.startswith(b"["):
+                    # Unicode of each code.
+                    for code, value in zip(
+                        range(start, end + 1), _HEX.findall(unicode)
+                    ):
+                        self._chars.setdefault(code, _utf16(value))
+                    continue
+                value: str = _utf16(unicode[1:-1])
+                if not value:
+                    continue
+                if end - start >= _EXPANDED_RANGE:
+                    self._ranges.append((start, end, value))
+                    continue
+                for code in range(start, end + 1):
+                    self._chars.setdefault(code, _offset(value, code - start))
+
+
+def _text_fragments(
+    content: bytes, fonts: Callable[[str], Optional["_Font"]]
+) -> Iterator[Fragment]:
+    """Yield text of each text showing operator with its position (as
+    `positional_extractor.text_fragments`), stop at the end of complete operators.
+    """
+    operands: List[Any] = []
+    # Operands outside of each open array.
+    arrays: List[List[Any]] = []
+    cm: Tuple[float, ...] = _IDENTITY
+    saved: List[Tuple[float, ...]] = []
+    tm: Tuple[float, ...] = _IDENTITY
+    tlm: Tuple[float, ...] = _IDENTITY
+    leading: float = 0
+    font: Optional[_Font] = None
+    position: int = 0
+    while True:
+        # Tokens are read here (not by `_parse`), content is mostly numbers &
+        # operators.
+        match = _TOKEN.match(content, position)
+        if not match:
+            # End of (the decompressed part of) content.
+            return
+        kind: str = match.lastgroup
+        position = match.end()
+        if kind in ("number", "fraction", "point"):
+            operands.append(float(match.group("number")))
+            continue
+        if kind == "name":
+            operands.append(match.group(kind).decode("latin-1"))
+            continue
+        if kind == "array":
+            arrays.append(operands)
+            operands = []
+            continue
+        if kind != "keyword":
+            try:
+                value, position = _parse(content, match.start())
+            except (_Unsupported, IndexError):
+                return
+            operands.append(value)
+            continue
+        operator: bytes = match.group(kind)
+        if operator == b"]" and arrays:
+            array: List[Any] = operands
+            operands = arrays.pop()
+            operands.append(array)
+            continue
+        if operator not in _TEXT_OPERATORS:
+            operands = []
+            continue
+        shown: Optional[str] = None
+        if operator == b"q":
+            saved.append(cm)
+        elif operator == b"Q" and saved:
+            cm = saved.pop()
+        elif operator == b"cm":
+            cm = _multiply(tuple(operands[-6:]), cm)
+        elif operator == b"BT":
+            tm = tlm = _IDENTITY
+        elif operator == b"Tf":
+            font = fonts(operands[-2])
+        elif operator == b"Tm":
+            tm = tlm = tuple(operands[-6:])
+        elif operator in (b"Td", b"TD"):
+            if operator == b"TD":
+                leading = -operands[-1]
+            tm = tlm = _multiply((1, 0, 0, 1, operands[-2], operands[-1]), tlm)
+        elif operator == b"TL":
+            leading = operands[-1]
+        elif operator in (b"T*", b"'", b'"'):
+            tm = tlm = _multiply((1, 0, 0, 1, 0, -leading), tlm)
+            shown = _decode(font, operands[-1]) if operator != b"T*" else None
+        elif operator == b"Tj":
+            shown = _decode(font, operands[-1])
+        elif operator == b"TJ":
+            shown = "".join(
+                _decode(font, item) if isinstance(item, bytes) else " "
+                for item in operands[-1]
+                if isinstance(item, bytes) or abs(item) >= _TJ_SPACE
+            )
+        else:
+            # `BI` & `Do`, inline image data is not tokenised, header may be in a
+            # form.
+            raise _Unsupported()
+        operands = []
+        if shown and shown.strip():
+            yield (
+                tm[4] * cm[0] + tm[5] * cm[2] + cm[4],
+                tm[4] * cm[1] + tm[5] * cm[3] + cm[5],
+                shown,
+            )
+
+
+def _decode(font: Optional[_Font], raw: bytes) -> str:
+    """Text of a string operand, in the current font if any."""
+    return font.decode(raw) if font else raw.decode("cp1252", errors="replace")
+
+
+def _multiply(first: Tuple[float, ...], second: Tuple[float, ...]) -> Tuple[float, ...]:
+    """Product of two transformation matrices (a, b, c, d, e, f)."""
+    a, b, c, d, e, f = first
+    a2, b2, c2, d2, e2, f2 = second
+    return (
+        a * a2 + b * c2,
+        a * b2 + b * d2,
+        c * a2 + d * c2,
+        c * b2 + d * d2,
+        e * a2 + f * c2 + e2,
+        e * b2 + f * d2 + f2,
+    )
+
+
+def _parse(
+    data: Union[mmap.mmap, bytes], position: int, refs: bool = False
+) -> Tuple[Any, int]:
+    """Value at position & position after it. Names are strings with the slash,
+    strings are bytes, keywords are `_Operator`. With `refs`, `1 0 R` is a `_Ref`.
+
+    Raise `_Unsupported` if there is no token (eg: end of data).
+    """
+    match = _TOKEN.match(data, position)
+    if not match:
+        raise _Unsupported()
+    kind: str = match.lastgroup
+    position = match.end()
+    if kind in ("number", "fraction", "point"):
+        if match.group("fraction") is not None or match.group("point") is not None:
+            return float(match.group("number")), position
+        number: int = int(match.group("number"))
+        if refs:
+            reference = _REF_TAIL.match(data, position)
+            if reference:
+                return _Ref(number, int(reference.group(1))), reference.end()
+        return number, position
+    if kind == "keyword":
+        token: bytes = match.group(kind)
+        if token in (b"true", b"false"):
+            return token == b"true", position
+        if token == b"null":
+            return None, position
+        return _Operator(token.decode("latin-1")), position
+    if kind == "name":
+        return match.group(kind).decode("latin-1"), position
+    if kind == "dict":
+        values: dict = {}
+        while True:
+            key, position = _parse(data, position, refs)
+            if key == ">>":
+                return values, position
+            values[key], position = _parse(data, position, refs)
+    if kind == "array":
+        items: list = []
+        while True:
+            item, position = _parse(data, position, refs)
+            if item == "]":
+                return items, position
+            items.append(item)
+    if kind == "literal":
+        return _literal(data, position)
+    digits: bytes = re.sub(rb"[\x00\s]", b"", match.group(kind))
+    return bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode()), position
+
+
+def _literal(data: Union[mmap.mmap, bytes], position: int) -> Tuple[bytes, int]:
+    """Literal string after its opening parenthesis & position after it."""
+    value: bytearray = bytearray()
+    depth: int = 1
+    while True:
+        match = _LITERAL_PART.match(data, position)
+        if match:
+            value += match.group()
+            position = match.end()
+        char: int = data[position]
+        position += 1
+        if char == ord("("):
+            depth += 1
+        elif char == ord(")"):
+            depth -= 1
+            if not depth:
+                return bytes(value), position
+        else:
+            # Backslash escape.
+            escaped: int = data[position]
+            octal = _OCTAL.match(data, position)
+            if octal:
+                value.append(int(octal.group(), 8) & 0xFF)
+                position = octal.end()
+                continue
+            position += 1
+            if escaped in _ESCAPES:
+                value += _ESCAPES[escaped]
+            elif escaped == ord("\r"):
+                position += data[position : position + 1] == b"\n"
+            elif escaped != ord("\n"):
+                value.append(escaped)
+            continue
+        if depth:
+            value.append(char)
+
+
+def _offset(unicode: str, offset: int) -> str:
+    """Unicode of a code in a `bfrange`, last character is incremented."""
+    return unicode[:-1] + chr(ord(unicode[-1]) + offset)
+
+
+def _utf16(digits: bytes) -> str:
+    """Text of a hex string of UTF-16BE code units."""
+    # `fromhex` skips whitespace.
+    return bytes.fromhex(digits.decode()).decode("utf-16-be", errors="replace")
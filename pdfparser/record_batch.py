@@ -0,0 +1,186 @@
+"""Columnar container of transaction records.
+
+A `TransactionRecord` per row holds every value as a separate python object, a
+`RecordBatch` keeps one numpy array per column instead:-
+
+    * app_id, xref: int64.
+    * settlement_date: datetime64[D].
+    * total_loan_amount, comm_rate, upfront, upfront_incl_gst: float64.
+    * broker, sub_broker, description: interned strings (a repeated value is stored
+      once), borrower_name: strings.
+
+Batches are produced by `PDFParser.parse_batch` and loaded column by column by
+`Mutation.bulk_insert_transactions`. Rows are still available as `RecordView`
+objects (same attributes as `TransactionRecord`) for existing callers.
+
+eg:-
+
+    batch: RecordBatch = PDFParser(source).parse_batch()
+    batch.total_loan_amount.sum()
+    batch[0].broker
+    Mutation(engine).bulk_insert_transactions(batch)
+"""
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Union
+from dataclasses import fields
+import sys
+
+import numpy as np
+import pandas as pd
+
+from pdfparser.datastructure import TransactionRecord
+
+# Columns in `TransactionRecord` field order.
+FIELD_NAMES: tuple = tuple(field.name for field in fields(TransactionRecord))
+_INT_FIELDS: tuple = ("app_id", "xref")
+_DATE_FIELDS: tuple = ("settlement_date",)
+_FLOAT_FIELDS: tuple = ("total_loan_amount", "comm_rate", "upfront", "upfront_incl_gst")
+# Few distinct values in a statement, every row refers to the same string object.
+_INTERNED_FIELDS: tuple = ("broker", "sub_broker", "description")
+
+
+class RecordBatch:
+    """Records as numpy columns (one attribute per `TransactionRecord` field).
+
+    Indexing returns a `RecordView` of a row, slicing returns a batch which shares
+    columns with this batch (no copy).
+    """
+
+    __slots__ = FIELD_NAMES
+
+    def __init__(self, **columns: Union[np.ndarray, Sequence[Any]]) -> None:
+        """Columns are keyed by field name, all of same length."""
+        if set(columns) != set(FIELD_NAMES):
+            raise ValueError(f"Columns should be {', '.join(FIELD_NAMES)}.")
+        for name in FIELD_NAMES:
+            setattr(self, name, _to_column(name, columns[name]))
+        if len({len(getattr(self, name)) for name in FIELD_NAMES}) > 1:
+            raise ValueError("All columns should be of same length.")
+
+    @classmethod
+    def from_records(cls, records: Iterable[TransactionRecord]) -> "RecordBatch":
+        """Batch of records (or any objects with `TransactionRecord` attributes)."""
+        records = records if isinstance(records, list) else list(records)
+        return cls(
+            **{
+                name: [getattr(record, name) for record in records]
+                for name in FIELD_NAMES
+            }
+        )
+
+    @classmethod
+    def concat(cls, batches: Iterable["RecordBatch"]) -> "RecordBatch":
+        """Batches joined in order."""
+        batches = list(batches)
+        if not batches:
+            return cls.from_records([])
+        return cls._from_columns(
+            {
+                name: np.concatenate([getattr(batch, name) for batch in batches])
+                for name in FIELD_NAMES
+            }
+        )
+
+    @classmethod
+    def _from_columns(cls, columns: dict) -> "RecordBatch":
+        """Batch of columns which are already typed & interned (not converted)."""
+        batch: RecordBatch = cls.__new__(cls)
+        for name in FIELD_NAMES:
+            setattr(batch, name, columns[name])
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.app_id)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union["RecordView", "RecordBatch"]:
+        if isinstance(key, slice):
+            return self.take(key)
+        pos: int = range(len(self))[key]
+        return RecordView(self, pos)
+
+    def __iter__(self) -> Iterator["RecordView"]:
+        return (RecordView(self, pos) for pos in range(len(self)))
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, RecordBatch):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            np.array_equal(getattr(self, name), getattr(other, name))
+            for name in FIELD_NAMES
+        )
+
+    def __repr__(self) -> str:
+        return f"RecordBatch(rows={len(self)})"
+
+    def take(self, rows: Union[slice, np.ndarray]) -> "RecordBatch":
+        """Batch of selected rows (a slice, row positions or a boolean mask)."""
+        return self._from_columns(
+            {name: getattr(self, name)[rows] for name in FIELD_NAMES}
+        )
+
+    def chunks(self, size: int) -> Iterator["RecordBatch"]:
+        """Consecutive batches of `size` rows (last one may be shorter)."""
+        for start in range(0, len(self), size):
+            yield self.take(slice(start, start + size))
+
+    def column_values(self, name: str) -> List[Any]:
+        """Values of a column as python objects (eg: `date` of settlement date)."""
+        return getattr(self, name).tolist()
+
+    def to_records(self) -> List[TransactionRecord]:
+        """A `TransactionRecord` per row."""
+        return list(
+            map(TransactionRecord, *(self.column_values(name) for name in FIELD_NAMES))
+        )
+
+
+class RecordView:
+    """A row of a `RecordBatch`, read only, with attributes of `TransactionRecord`.
+
+    Values are read from the batch on access, the view holds no copy.
+    """
+
+    __slots__ = ("_batch", "_pos")
+
+    def __init__(self, batch: RecordBatch, pos: int) -> None:
+        self._batch: RecordBatch = batch
+        self._pos: int = pos
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in FIELD_NAMES:
+            raise AttributeError(name)
+        value: Any = getattr(self._batch, name)[self._pos]
+        # numpy scalar (eg: int64, datetime64) to python object, strings are kept.
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, (RecordView, TransactionRecord)):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in FIELD_NAMES)
+
+    def __repr__(self) -> str:
+        return f"RecordView({self.to_record()})"
+
+    def to_record(self) -> TransactionRecord:
+        """Row as a `TransactionRecord`."""
+        return TransactionRecord(*(getattr(self, name) for name in FIELD_NAMES))
+
+
+def _to_column(name: str, values: Union[np.ndarray, Sequence[Any]]) -> np.ndarray:
+    """Values of a field as a numpy column of its type."""
+    if name in _INT_FIELDS:
+        return np.asarray(values, dtype="int64")
+    if name in _DATE_FIELDS:
+        return np.asarray(values, dtype="datetime64[D]")
+    if name in _FLOAT_FIELDS:
+        return np.asarray(values, dtype="float64")
+    if name in _INTERNED_FIELDS:
+        return _intern(values)
+    return np.asarray(values, dtype=object)
+
+
+def _intern(values: Union[np.ndarray, Sequence[Optional[str]]]) -> np.ndarray:
+    """Object column where equal strings are one (interned) object, `None` kept."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    interned: List[Optional[str]] = [sys.intern(value) for value in uniques] + [None]
+    # Missing values (code -1) pick the trailing `None`.
+    return np.array(interned, dtype=object)[codes]
@@ -0,0 +1,266 @@
+"""Convert an extracted transaction table to records, column by column.
+
+Cells of a row are not always in the same column after extraction (eg: sub broker
+merged with borrower name), so every row is first compacted by dropping empty
+cells. Fields are then located from the start & end of the compacted row:-
+
+    App ID Xref, Settlement Date, Broker, [Sub Broker], Borrower Name Description,
+    Total Loan Amount, Comm Rate, Upfront, Upfront Incl GST
+"""
+from typing import List, Tuple, Optional, Callable
+
+import numpy as np
+import pandas as pd
+from pandas.core.frame import DataFrame
+from pandas.core.series import Series
+
+from pdfparser.datastructure import TransactionRecord, RejectedRow
+from pdfparser.record_batch import RecordBatch
+
+_APP_ID_XREF_POS: int = 0
+_SETTLEMENT_DATE_POS: int = 1
+_BROKER_POS: int = 2
+_SUB_BROKER_POS: int = 3
+_BORROWER_NAME_DESCRIPTION_POS: int = -5
+_TOTAL_LOAN_AMOUNT_POS: int = -4
+_COMM_RATE_POS: int = -3
+_UPFRONT_POS: int = -2
+_UPFRONT_INCL_GST_POS: int = -1
+_FULL_ROW_LENGTH: int = 9
+_MIN_ROW_LENGTH: int = 8
+_DATE_FORMAT: str = "%d/%m/%Y"
+# eg: 80185884 100305936
+_APP_ID_XREF_PATTERN: str = r"^([+-]?\d+) ([+-]?\d+)$"
+# Leading capitalised words are borrower name, rest is description.
+_NAME_DESCRIPTION_PATTERN: str = r"(?s)((?:[^ a-z]* )*)([^ ]*[a-z].*)"
+# Borrower name is the capitalised tail after last lowercase letter.
+_SUB_BROKER_NAME_PATTERN: str = r"(?s)(.*[a-z])([^a-z]*)"
+_NON_ASCII_PATTERN: str = r"[^\x00-\x7f]"
+
+
+class RecordConverter:
+    """Convert rows of an extracted table to transaction records.
+
+    Rows which cannot be converted are reported with their row number (1 based,
+    counted from `row_offset`) instead of failing the whole table.
+    """
+
+    def __init__(self, df: DataFrame, row_offset: int = 0) -> None:
+        self._df: DataFrame = df
+        self._row_offset: int = row_offset
+
+    def convert(self) -> Tuple[List[TransactionRecord], List[RejectedRow]]:
+        """Convert all rows, return converted records & rejected rows."""
+        batch, rejected = self.convert_batch()
+        return batch.to_records(), rejected
+
+    def convert_batch(self) -> Tuple[RecordBatch, List[RejectedRow]]:
+        """Convert all rows, return converted records (as columns, see
+        `record_batch.py`) & rejected rows.
+        """
+        if self._df.empty:
+            return RecordBatch.from_records([]), []
+        cells: np.ndarray = self._df.to_numpy(dtype=object)
+        present: np.ndarray = pd.notna(cells) & (cells != "")
+        row_length: np.ndarray = present.sum(axis=1)
+        position: np.ndarray = present.cumsum(axis=1) - 1
+
+        index: np.ndarray = np.arange(len(cells))
+        # Reason of each rejected row (first found), `None` if row is valid.
+        errors: np.ndarray = np.full(len(cells), None, dtype=object)
+        self._reject(
+            errors,
+            (row_length < _MIN_ROW_LENGTH) | (row_length > _FULL_ROW_LENGTH),
+            "Unexpected number of fields.",
+        )
+
+        def field(pos: int) -> Series:
+            """Value at `pos` of compacted rows (negative `pos` from end)."""
+            target: np.ndarray = present & (
+                position == (pos if pos >= 0 else (row_length + pos)[:, None])
+            )
+            found: np.ndarray = target.any(axis=1)
+            values: np.ndarray = cells[index, target.argmax(axis=1)]
+            return Series(np.where(found, values, None), index=index, dtype=object)
+
+        app_id_xref: DataFrame = field(_APP_ID_XREF_POS).str.extract(
+            _APP_ID_XREF_PATTERN
+        )
+        self._reject(errors, app_id_xref[0].isna(), "Unformatted app-id & xref.")
+        app_id: Series = app_id_xref[0].fillna("0")
+        xref: Series = app_id_xref[1].fillna("0")
+
+        settlement_date: Series = _map_unique(
+            field(_SETTLEMENT_DATE_POS),
+            lambda values: pd.to_datetime(
+                values, format=_DATE_FORMAT, errors="coerce"
+            ).dt.date,
+        )
+        self._reject(errors, settlement_date.isna(), "Unformatted settlement date.")
+
+        broker: Series = field(_BROKER_POS)
+        sub_broker: Series = field(_SUB_BROKER_POS).where(
+            row_length == _FULL_ROW_LENGTH, None
+        )
+        borrower_name, description = self._split_borrower_name_and_description(
+            field(_BORROWER_NAME_DESCRIPTION_POS), errors
+        )
+        borrower_name, sub_broker = self._split_borrower_name_and_sub_broker(
+            borrower_name, sub_broker
+        )
+
+        total_loan_amount: Series = self._to_float(
+            field(_TOTAL_LOAN_AMOUNT_POS), errors, "total loan amount"
+        )
+        comm_rate: Series = self._to_float(field(_COMM_RATE_POS), errors, "comm rate")
+        upfront: Series = self._to_float(field(_UPFRONT_POS), errors, "upfront")
+        upfront_incl_gst: Series = self._to_float(
+            field(_UPFRONT_INCL_GST_POS), errors, "upfront incl gst"
+        )
+
+        valid: np.ndarray = pd.isna(errors)
+        batch: RecordBatch = RecordBatch(
+            app_id=app_id.to_numpy()[valid].astype("int64"),
+            xref=xref.to_numpy()[valid].astype("int64"),
+            settlement_date=settlement_date.to_numpy()[valid].astype("datetime64[D]"),
+            broker=broker.to_numpy()[valid],
+            sub_broker=sub_broker.to_numpy()[valid],
+            borrower_name=borrower_name.to_numpy()[valid],
+            description=description.to_numpy()[valid],
+            total_loan_amount=total_loan_amount.to_numpy()[valid],
+            comm_rate=comm_rate.to_numpy()[valid],
+            upfront=upfront.to_numpy()[valid],
+            upfront_incl_gst=upfront_incl_gst.to_numpy()[valid],
+        )
+        rejected: List[RejectedRow] = [
+            RejectedRow(row_number=self._row_offset + pos + 1, reason=errors[pos])
+            for pos in np.flatnonzero(~valid).tolist()
+        ]
+        return batch, rejected
+
+    @staticmethod
+    def _reject(errors: np.ndarray, mask: Series, reason: str) -> None:
+        """Mark rows in `mask` as rejected, first reason of a row is kept."""
+        errors[np.asarray(mask, dtype=bool) & pd.isna(errors)] = reason
+
+    def _to_float(self, values: Series, errors: np.ndarray, name: str) -> Series:
+        """Strip thousands separators, validate & cast float column."""
+        amounts: Series = _map_unique(values, _parse_amounts)
+        self._reject(errors, amounts.isna(), f"Unformatted {name}.")
+        return amounts.fillna(0.0).astype("float64")
+
+    def _split_borrower_name_and_description(
+        self, name_and_desc: Series, errors: np.ndarray
+    ) -> Tuple[Series, Series]:
+        """Borrowner name & description is combined after parsing pdf.
+
+        Assumption: Borrower name will be capitalised always in given data.
+
+        eg: CHELSEA BIANCA VANDERAA Upfront Commission
+        """
+        parts: DataFrame = name_and_desc.str.extract(_NAME_DESCRIPTION_PATTERN)
+        # Trailing separator of name, eg: "CHELSEA BIANCA VANDERAA " -> "CHELSEA..."
+        borrower_name: Series = parts[0].str[:-1]
+        description: Series = parts[1]
+
+        non_ascii: Series = self._non_ascii(name_and_desc)
+        for pos, val in name_and_desc[non_ascii].items():
+            split: Optional[Tuple[str, str]] = split_borrower_name_and_description(val)
+            borrower_name[pos], description[pos] = split if split else (None, None)
+        self._reject(
+            errors,
+            description.isna(),
+            "Unable to find borrower-name & description.",
+        )
+        return borrower_name, description
+
+    def _split_borrower_name_and_sub_broker(
+        self, borrower_name: Series, sub_broker: Series
+    ) -> Tuple[Series, Series]:
+        """Form borrower name & sub broker if borrower name is not along with
+        description.
+
+        Assumption: Borrower name will be capitalised always in given data.
+
+        eg: Aagam Pabari ANJAN GUPTA
+            Rhiannon Clancy-BurnsSARA FLOWER
+        """
+        merged: Series = (borrower_name == "") & sub_broker.fillna("").astype(bool)
+        if not merged.any():
+            return borrower_name, sub_broker
+
+        sub_broker_and_name: Series = sub_broker[merged]
+        parts: DataFrame = sub_broker_and_name.str.extract(_SUB_BROKER_NAME_PATTERN)
+        found: Series = parts[0].notna()
+        borrower_name = borrower_name.copy()
+        sub_broker = sub_broker.copy()
+        borrower_name[merged] = parts[1].str.strip().where(found, sub_broker_and_name)
+        sub_broker[merged] = parts[0].str.strip().where(found, "")
+
+        non_ascii: Series = self._non_ascii(sub_broker_and_name)
+        for pos, val in sub_broker_and_name[non_ascii].items():
+            borrower_name[pos], sub_broker[pos] = split_borrower_name_and_sub_broker(
+                val
+            )
+        return borrower_name, sub_broker
+
+    @staticmethod
+    def _non_ascii(values: Series) -> Series:
+        """Rows which need the unicode aware (row by row) split."""
+        return values.str.contains(_NON_ASCII_PATTERN).fillna(False).astype(bool)
+
+
+def _map_unique(values: Series, convert: Callable[[Series], Series]) -> Series:
+    """Convert only distinct values of a column and broadcast the result.
+
+    Dates & amounts repeat a lot in a statement, so this avoids converting the same
+    text again for every row.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    converted: np.ndarray = np.append(
+        np.asarray(convert(Series(uniques, dtype=object)), dtype=object), None
+    )
+    # Missing values (code -1) pick the trailing `None`.
+    return Series(converted[codes], index=values.index, dtype=object)
+
+
+def _parse_amounts(values: Series) -> Series:
+    """Amounts with thousands separators to float, `None` if not a number."""
+    values = values.str.replace(",", "", regex=False)
+    try:
+        return values.astype("float64")
+    except ValueError:
+        valid: Series = pd.to_numeric(values, errors="coerce").notna()
+        return values.where(valid).astype("float64")
+
+
+def split_borrower_name_and_description(
+    name_and_desc: str,
+) -> Optional[Tuple[str, str]]:
+    """Split borrower name & description of a single value.
+
+    Return `None` if no separation position is found.
+    """
+    name_and_desc_split: List[str] = name_and_desc.split(" ")
+    for pos, sub_str in enumerate(name_and_desc_split):
+        # found the separation position.
+        if sub_str != sub_str.upper():
+            return (
+                " ".join(name_and_desc_split[:pos]),
+                " ".join(name_and_desc_split[pos:]),
+            )
+    return None
+
+
+def split_borrower_name_and_sub_broker(sub_broker_and_name: str) -> Tuple[str, str]:
+    """Split borrower name & sub broker of a single value."""
+    for pos in range(len(sub_broker_and_name) - 1, -1, -1):
+        if not sub_broker_and_name[pos].isalpha():
+            continue
+        # Found the separation index.
+        if sub_broker_and_name[pos] != sub_broker_and_name[pos].upper():
+            return (
+                sub_broker_and_name[pos + 1 :].strip(),
+                sub_broker_and_name[: pos + 1].strip(),
+            )
+    return sub_broker_and_name, ""
@@ -1,21 +1,31 @@
-"""Report generator."""
-from typing import List, Set
+"""Report generator.
+
+    * `ReportGenerator` fetches loan amounts of every broker & day and aggregates them
+      in python.
+    * `SQLReportGenerator` lets database aggregate, only the aggregated rows (totals,
+      counts & sorted amounts) are fetched and shaped to the same report format.
+"""
+from typing import List, Set, Optional
 from collections import defaultdict
 from datetime import date, timedelta
 from calendar import month_name
 
 from pdfparser.store import Query
+from pdfparser.metrics import MetricsRegistry, timed
 
 
 class ReportGenerator:
     """Generate predefined report in json format."""
 
-    def __init__(self, query: Query) -> None:
+    def __init__(self, query: Query, metrics: Optional[MetricsRegistry] = None) -> None:
         self._query: Query = query
+        # Reports are recorded as stages (see `metrics.py`).
+        self._metrics: Optional[MetricsRegistry] = metrics
         self._broker_level_data: List[
             dict
         ] = query.get_broker_level_loan_amount_with_date()
 
+    @timed("report.generate_broker_report")
     def generate_broker_report(self) -> dict:
         """Generate all broker's report.
 
@@ -47,6 +57,7 @@ class ReportGenerator:
                 options["daily"][str(date_)] = val
         return report
 
+    @timed("report.generate_total_loan_report")
     def generate_total_loan_report(self) -> dict:
         """Total loan amount per day.
 
@@ -61,6 +72,7 @@ class ReportGenerator:
             report[str(record["settlement_date"])] += sum(record["array_agg_1"])
         return report
 
+    @timed("report.generate_tier_level_report")
     def generate_tier_level_report(self) -> dict:
         """Loan amount in each tier per day.
 
@@ -135,3 +147,116 @@ class ReportGenerator:
         for _broker_name, options in report.items():
             for monthly_loan_amounts in options["monthly"].values():
                 monthly_loan_amounts.sort(reverse=True)
+
+
+class SQLReportGenerator:
+    """Generate predefined report in json format, aggregated by database.
+
+    Reports are in the same format as `ReportGenerator`'s, except the weekly
+    periods of broker report, which are calendar weeks (monday to sunday).
+    """
+
+    def __init__(self, query: Query, metrics: Optional[MetricsRegistry] = None) -> None:
+        self._query: Query = query
+        # Reports are recorded as stages (see `metrics.py`).
+        self._metrics: Optional[MetricsRegistry] = metrics
+
+    @timed("report.generate_broker_report")
+    def generate_broker_report(self) -> dict:
+        """Generate all broker's report.
+
+        Format:-
+
+            {
+                "Cheston La'Porte": {
+                    "daily": {
+                        "2023-10-17": [35890.0, 3589.0]
+                    },
+                    "weekly": {
+                        "2023-10-16 - 2023-10-22": [35890.0, 3589.0]
+                    },
+                    "monthly": {
+                        "October": [35890.0, 3589.0]
+                    }
+                }
+            }
+        """
+        return self.form_broker_report(
+            self._query.get_broker_loan_amounts_by_period("day"),
+            self._query.get_broker_loan_amounts_by_period("week"),
+            self._query.get_broker_loan_amounts_by_period("month"),
+        )
+
+    @timed("report.generate_total_loan_report")
+    def generate_total_loan_report(self) -> dict:
+        """Total loan amount per day.
+
+        Format:-
+
+            {
+                "2023-10-17": 358900.0
+            }
+        """
+        return self.form_total_loan_report(self._query.get_total_loan_amount_by_date())
+
+    @timed("report.generate_tier_level_report")
+    def generate_tier_level_report(self) -> dict:
+        """Loan amount in each tier per day.
+
+        Format:-
+
+            {
+                "2023-10-17": {
+                    "tier1": 5,
+                    "tier2": 10,
+                    "tier3": 1
+                }
+            }
+        """
+        return self.form_tier_level_report(
+            self._query.get_tier_level_loan_count_by_date()
+        )
+
+    # Internal api: reports are formed from query results, by public methods above
+    # and by `AsyncReportGenerator` (see `async_store.py`).
+
+    @staticmethod
+    def form_broker_report(
+        daily: List[dict], weekly: List[dict], monthly: List[dict]
+    ) -> dict:
+        """Broker report from loan amounts of each day, week & month."""
+        report: dict = defaultdict(lambda: defaultdict(dict))
+        for record in daily:
+            report[record["broker"]]["daily"][str(record["period"])] = record[
+                "loan_amounts"
+            ]
+        for record in weekly:
+            week_start: date = record["period"]
+            report[record["broker"]]["weekly"][
+                f"{str(week_start)} - {str(week_start + timedelta(days=6))}"
+            ] = record["loan_amounts"]
+        for record in monthly:
+            report[record["broker"]]["monthly"][month_name[record["period"]]] = record[
+                "loan_amounts"
+            ]
+        return report
+
+    @staticmethod
+    def form_total_loan_report(records: List[dict]) -> dict:
+        """Total loan amount report from total of each day."""
+        return {
+            str(record["settlement_date"]): record["total_loan_amount"]
+            for record in records
+        }
+
+    @staticmethod
+    def form_tier_level_report(records: List[dict]) -> dict:
+        """Tier level report from tier counts of each day."""
+        return {
+            str(record["settlement_date"]): {
+                "tier1": record["tier1"],
+                "tier2": record["tier2"],
+                "tier3": record["tier3"],
+            }
+            for record in records
+        }
@@ -0,0 +1,186 @@
+"""Write reports incrementally to a file or socket.
+
+`ReportGenerator` & `SQLReportGenerator` return a whole report as nested dicts,
+`StreamingReportWriter` writes the same reports while rows are read from database (a
+server side cursor, see `Query.iter_*` methods). Broker report is written one broker
+at a time, so memory stays flat regardless of table size (only one broker's loan
+amounts are held).
+
+Formats:-
+
+    * json: same document as `SQLReportGenerator` (calendar weeks, monday to sunday).
+    * jsonl: a line per broker (or per day of total loan & tier level reports), eg:
+      {"broker": "Cheston La'Porte", "daily": {...}, "weekly": {...}, "monthly": {...}}
+
+eg:-
+
+    writer: StreamingReportWriter = StreamingReportWriter(Query(engine), "jsonl")
+    with open("broker_report.jsonl", "w") as out:
+        writer.write_broker_report(out)
+    # Socket, `sock.makefile("w", encoding="utf-8")` is a text stream.
+"""
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from datetime import date, timedelta
+from calendar import month_name
+from itertools import groupby
+from operator import itemgetter
+import json
+
+from pdfparser.store import Query, DEFAULT_YIELD_PER
+from pdfparser.metrics import MetricsRegistry, stage
+
+_JSON_FORMAT: str = "json"
+_JSONL_FORMAT: str = "jsonl"
+_FORMATS: Tuple[str, ...] = (_JSON_FORMAT, _JSONL_FORMAT)
+
+
+class StreamingReportWriter:
+    """Write predefined reports as json or json lines to a text stream.
+
+    Each write method returns the number of entries written (brokers or days).
+    """
+
+    def __init__(
+        self,
+        query: Query,
+        format: str = _JSON_FORMAT,
+        yield_per: int = DEFAULT_YIELD_PER,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        if format not in _FORMATS:
+            raise ValueError(f"format should be one of {', '.join(_FORMATS)}.")
+        self._query: Query = query
+        self._format: str = format
+        # Rows fetched at a time from database.
+        self._yield_per: int = yield_per
+        # Reports are recorded as stages (see `metrics.py`).
+        self._metrics: Optional[MetricsRegistry] = metrics
+
+    def write_broker_report(self, out: TextIO) -> int:
+        """Write all broker's report (see `SQLReportGenerator.generate_broker_report`).
+
+        Rows are ordered by broker, loan amounts of a broker are grouped to weeks &
+        months as soon as all its days are read.
+        """
+        with stage(self._metrics, "report.write_broker_report") as timer:
+            rows: Iterator[dict] = self._query.iter_broker_daily_loan_amounts(
+                self._yield_per
+            )
+            timer.rows = self._write_entries(
+                out,
+                (
+                    (broker, _broker_report(broker_rows))
+                    for broker, broker_rows in groupby(rows, key=itemgetter("broker"))
+                ),
+                "broker",
+            )
+        return timer.rows
+
+    def write_total_loan_report(self, out: TextIO) -> int:
+        """Write total loan amount per day (see
+        `SQLReportGenerator.generate_total_loan_report`).
+
+        jsonl format:- {"settlement_date": "2023-10-17", "total_loan_amount": 358900.0}
+        """
+        with stage(self._metrics, "report.write_total_loan_report") as timer:
+            timer.rows = self._write_entries(
+                out,
+                (
+                    (str(row["settlement_date"]), row["total_loan_amount"])
+                    for row in self._query.iter_total_loan_amount_by_date(
+                        self._yield_per
+                    )
+                ),
+                "settlement_date",
+                "total_loan_amount",
+            )
+        return timer.rows
+
+    def write_tier_level_report(self, out: TextIO) -> int:
+        """Write number of loans in each tier per day (see
+        `SQLReportGenerator.generate_tier_level_report`).
+
+        jsonl format:- {"settlement_date": "2023-10-17", "tier1": 5, "tier2": 10,
+                        "tier3": 1}
+        """
+        with stage(self._metrics, "report.write_tier_level_report") as timer:
+            timer.rows = self._write_entries(
+                out,
+                (
+                    (
+                        str(row["settlement_date"]),
+                        {
+                            "tier1": row["tier1"],
+                            "tier2": row["tier2"],
+                            "tier3": row["tier3"],
+                        },
+                    )
+                    for row in self._query.iter_tier_level_loan_count_by_date(
+                        self._yield_per
+                    )
+                ),
+                "settlement_date",
+            )
+        return timer.rows
+
+    def _write_entries(
+        self,
+        out: TextIO,
+        entries: Iterator[Tuple[str, object]],
+        key_name: str,
+        value_name: Optional[str] = None,
+    ) -> int:
+        """Write (key, value) entries as members of a json object, or as a line each.
+
+        A json line holds the key as `key_name` & the value's members, or the value
+        as `value_name` if it is not an object.
+        """
+        count: int = 0
+        if self._format == _JSON_FORMAT:
+            out.write("{")
+        for key, value in entries:
+            if self._format == _JSON_FORMAT:
+                out.write(
+                    f"{', ' if count else ''}{json.dumps(key)}: {json.dumps(value)}"
+                )
+            else:
+                line: dict = (
+                    {key_name: key, value_name: value}
+                    if value_name
+                    else {key_name: key, **value}
+                )
+                out.write(json.dumps(line) + "\n")
+            count += 1
+        if self._format == _JSON_FORMAT:
+            out.write("}")
+        return count
+
+
+def _broker_report(rows: Iterator[dict]) -> dict:
+    """Daily, weekly & monthly loan amounts (descending) from daily rows of a broker
+    (ordered by day).
+    """
+    daily: Dict[str, List[float]] = {}
+    weekly: Dict[date, List[float]] = {}
+    monthly: Dict[int, List[float]] = {}
+    for row in rows:
+        day: date = row["period"]
+        daily[str(day)] = row["loan_amounts"]
+        weekly.setdefault(day - timedelta(days=day.weekday()), []).extend(
+            row["loan_amounts"]
+        )
+        # Same month of different years is one period.
+        monthly.setdefault(day.month, []).extend(row["loan_amounts"])
+    return {
+        "daily": daily,
+        "weekly": {
+            f"{str(week_start)} - {str(week_start + timedelta(days=6))}": sorted(
+                amounts, reverse=True
+            )
+            for week_start, amounts in weekly.items()
+        },
+        "monthly": {
+            month_name[month]: sorted(amounts, reverse=True)
+            for month, amounts in sorted(monthly.items())
+        },
+    }
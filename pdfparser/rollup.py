@@ -0,0 +1,44 @@
+"""Rebuild rollup tables from all stored transactions.
+
+Rollups are maintained at insert time, this command backfills them for records
+inserted before rollup tables existed (or repairs them). Missing rollup tables are
+created first.
+
+    Usage:-
+
+    python -m pdfparser.rollup --env-file .env
+
+Database settings are read from environment variables or `.env` file (see
+`settings.py`).
+"""
+from typing import List, Optional
+import argparse
+
+from pdfparser.store import Init, Mutation, dispose_engines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Rebuild rollup tables from Transaction table."
+    )
+    parser.add_argument(
+        "--env-file", default=".env", help="Database settings (default: .env)."
+    )
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    try:
+        db_constructor: Init = Init.from_env(args.env_file)
+    except ValueError as exc:
+        parser.error(str(exc))
+    db_constructor.create_tables()
+    try:
+        Mutation(db_constructor.get_engine()).rebuild_rollups()
+    finally:
+        # Shared engine (see `Init.get_engine`).
+        dispose_engines()
+    print("Rollup tables are rebuilt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Database settings from environment variables or a `.env` file.
+
+Environment variables take precedence over the file, a missing file is skipped.
+
+    Format:-
+
+    PDFPARSER_DB_USER=nick
+    PDFPARSER_DB_PASSWORD=
+    PDFPARSER_DB_HOST=localhost
+    PDFPARSER_DB_PORT=5432
+    PDFPARSER_DB_NAME=transaction_db
+    # Embedded database instead of a server (see `Init.sqlite`).
+    PDFPARSER_SQLITE_PATH=/var/lib/pdfparser/transaction.db
+    # Connection pool (optional, see `PoolSettings`).
+    PDFPARSER_POOL_SIZE=5
+    PDFPARSER_POOL_MAX_OVERFLOW=10
+    PDFPARSER_POOL_PRE_PING=true
+    PDFPARSER_POOL_RECYCLE=3600
+    PDFPARSER_PREPARE_THRESHOLD=5
+"""
+from typing import Dict, Mapping, Optional
+import os
+
+from pdfparser.datastructure import DatabaseSettings, PoolSettings
+
+DEFAULT_ENV_FILE: str = ".env"
+_PREFIX: str = "PDFPARSER_"
+_TRUE_VALUES: tuple = ("1", "true", "yes", "on")
+
+
+def read_env_file(path: str) -> Dict[str, str]:
+    """`KEY=VALUE` lines of a file, blank lines & `#` comments are skipped.
+
+    eg: export PDFPARSER_DB_NAME="transaction_db" -> {"PDFPARSER_DB_NAME":
+        "transaction_db"}
+    """
+    values: Dict[str, str] = {}
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            key = key.strip().removeprefix("export ").strip()
+            value = value.strip()
+            if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            values[key] = value
+    return values
+
+
+def get_database_settings(
+    env_file: str = DEFAULT_ENV_FILE, environ: Optional[Mapping[str, str]] = None
+) -> DatabaseSettings:
+    """Settings from `environ` (`os.environ` by default) & `env_file`."""
+    values: Dict[str, str] = read_env_file(env_file) if os.path.isfile(env_file) else {}
+    values.update(os.environ if environ is None else environ)
+    setting: Dict[str, str] = {
+        key.removeprefix(_PREFIX): value
+        for key, value in values.items()
+        if key.startswith(_PREFIX)
+    }
+    pool: PoolSettings = PoolSettings(
+        size=_integer(setting, "POOL_SIZE", PoolSettings.size),
+        max_overflow=_integer(setting, "POOL_MAX_OVERFLOW", PoolSettings.max_overflow),
+        pre_ping=setting.get("POOL_PRE_PING", "").lower() in _TRUE_VALUES,
+        recycle=_integer(setting, "POOL_RECYCLE", PoolSettings.recycle),
+        prepare_threshold=_integer(setting, "PREPARE_THRESHOLD", None),
+    )
+    if setting.get("SQLITE_PATH"):
+        return DatabaseSettings(sqlite_path=setting["SQLITE_PATH"], pool=pool)
+    if not setting.get("DB_USER") or not setting.get("DB_NAME"):
+        raise ValueError(
+            f"{_PREFIX}DB_USER & {_PREFIX}DB_NAME (or {_PREFIX}SQLITE_PATH) should "
+            f"be set in environment or {env_file}."
+        )
+    return DatabaseSettings(
+        username=setting["DB_USER"],
+        password=setting.get("DB_PASSWORD", ""),
+        host=setting.get("DB_HOST") or DatabaseSettings.host,
+        port=_integer(setting, "DB_PORT", DatabaseSettings.port),
+        db_name=setting["DB_NAME"],
+        pool=pool,
+    )
+
+
+def _integer(
+    setting: Dict[str, str], name: str, default: Optional[int]
+) -> Optional[int]:
+    """Integer value of a setting, `default` if it is not set."""
+    if not setting.get(name):
+        return default
+    try:
+        return int(setting[name])
+    except ValueError:
+        raise ValueError(f"{_PREFIX}{name} should be an integer.") from None
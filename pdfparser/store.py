@@ -1,15 +1,142 @@
 """All store handlers (All apis to handle database.)"""
-from typing import Optional, List
-from datetime import date
+from typing import (
+    Any,
+    Callable,
+    Optional,
+    List,
+    Iterable,
+    Iterator,
+    Tuple,
+    Dict,
+    Set,
+    Union,
+    TYPE_CHECKING,
+)
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import lru_cache, wraps
+from itertools import islice
+import csv
+import io
+import json
+import os
+import threading
 
-from sqlalchemy.engine.base import Engine
-from sqlalchemy import create_engine, text, Table, insert, select, func, and_
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine.base import Engine, Connection
+from sqlalchemy.engine.interfaces import Dialect
+from sqlalchemy.engine import Row
+from sqlalchemy import (
+    create_engine,
+    event,
+    text,
+    Table,
+    Date,
+    Integer,
+    insert,
+    delete,
+    select,
+    literal_column,
+    func,
+    and_,
+    cast,
+    extract,
+    tuple_,
+    true,
+    bindparam,
+    ARRAY,
+    String,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.util import await_only
 
-from pdfparser.models import METADATA
-from pdfparser.datastructure import TransactionRecord
+from pdfparser.models import METADATA, PARTITIONED_METADATA, LOAN_AMOUNTS_TYPE
+from pdfparser.datastructure import (
+    TransactionRecord,
+    InsertSummary,
+    IngestionOutcome,
+    DatabaseSettings,
+    PoolSettings,
+)
+from pdfparser.metrics import MetricsRegistry, stage
+from pdfparser.settings import get_database_settings, DEFAULT_ENV_FILE
+
+if TYPE_CHECKING:
+    # `cache.py` imports this module.
+    from pdfparser.cache import QueryCache
+
+    # Imported while inserting, queries (eg: command line, see `main.py`) do not load
+    # numpy & pandas.
+    from pdfparser.record_batch import RecordBatch
 
 _DEFAULT_POSTFRES_DB_NAME: str = "postgres"
+# Records per batch of `Mutation.bulk_insert_transactions`.
+DEFAULT_BATCH_SIZE: int = 1000
+# Rows fetched at a time from a server side cursor by `Query.iter_*` methods.
+DEFAULT_YIELD_PER: int = 1000
+_STAGING_TABLE_NAME: str = "transaction_staging"
+# Columns filled from a `TransactionRecord` (`id` is generated by database).
+_TRANSACTION_COLUMNS: Tuple[str, ...] = (
+    "app_id",
+    "xref",
+    "settlement_date",
+    "broker",
+    "sub_broker",
+    "borrower_name",
+    "description",
+    "total_loan_amount",
+    "comm_rate",
+    "upfront",
+    "upfront_incl_gst",
+)
+# Unique key of a record (`TransactionKey` columns).
+_KEY_COLUMNS: Tuple[str, ...] = ("xref", "total_loan_amount")
+# `NULL` marker used while copying records, empty string stays as empty string.
+_COPY_NULL: str = "\\N"
+# Loan amount is in a tier if it is greater than the tier's minimum (and not in an
+# upper tier).
+_TIER1_MIN_AMOUNT: float = 1_00_000
+_TIER2_MIN_AMOUNT: float = 50_000
+_TIER3_MIN_AMOUNT: float = 10_000
+_PERIODS: Tuple[str, ...] = ("day", "week", "month")
+_UNPARTITIONED_TABLE_NAME: str = "Transaction_unpartitioned"
+# eg: Transaction_y2023m10
+_PARTITION_NAME_FORMAT: str = "Transaction_y%Ym%m"
+# Partition is created by a concurrent insert (duplicate table or type).
+_DUPLICATE_PARTITION_PGCODES: Tuple[str, ...] = ("42P07", "23505")
+# Engine is in autocommit mode, inserts & rollup updates need a transaction (isolation
+# level of a connection running `Mutation.*_on` methods).
+TRANSACTION_ISOLATION_LEVEL: str = "READ COMMITTED"
+# SQLite has no `READ COMMITTED`, it has a single writer at a time anyway.
+_SQLITE_ISOLATION_LEVEL: str = "SERIALIZABLE"
+# Readers are not blocked by a writer (write ahead log), fsync only at checkpoints.
+_SQLITE_PRAGMAS: Tuple[str, ...] = (
+    "pragma journal_mode=wal",
+    "pragma synchronous=normal",
+)
+_SQLITE_FILE_SUFFIXES: Tuple[str, ...] = ("", "-wal", "-shm")
+# Shared engines by (url, pool settings), see `Init.get_engine`.
+_ENGINES: Dict[Tuple[str, PoolSettings], Engine] = {}
+_ENGINES_LOCK: threading.Lock = threading.Lock()
+# Statements of `Query` by (builder, use rollups, dialect, arguments), built once per
+# process & executed with parameters, so their compiled form is reused from the
+# compiled cache of an engine (see `_prebuilt`).
+_STATEMENTS: Dict[Tuple, Any] = {}
+# Stored & inserted loan amounts of a broker's day, in descending order.
+_MERGE_LOAN_AMOUNTS: str = (
+    'array(select amount from unnest("BrokerDailyRollup".loan_amounts '
+    "|| excluded.loan_amounts) as amount order by amount desc)"
+)
+# SQLite stores amounts as a json array, sorted while reading (see `models.py`).
+_SQLITE_MERGE_LOAN_AMOUNTS: str = (
+    "(select json_group_array(value) from (select value from "
+    'json_each("BrokerDailyRollup".loan_amounts) union all select value from '
+    "json_each(excluded.loan_amounts)))"
+)
 
 
 class Init:
@@ -18,130 +145,1168 @@ class Init:
     * Create database.
     * Create tables.
 
-    NOTE: DB details are read from `.env` file.
+    A PostgreSQL server, or an embedded database in a file (see `Init.sqlite`).
+
+    NOTE: DB details are read from `.env` file by `Init.from_env` (see `settings.py`).
     """
 
     def __init__(
-        self, username: str, password: str, host: str, port: int, db_name: str
+        self,
+        username: str,
+        password: str,
+        host: str,
+        port: int,
+        db_name: str,
+        pool: Optional[PoolSettings] = None,
     ) -> None:
         self._username: str = username
         self._password: str = password
         self._host: str = host
         self._port: int = port
         self._db_name: str = db_name
+        self._pool: PoolSettings = pool if pool else PoolSettings()
+        self._sqlite_path: Optional[str] = None
+
+    @classmethod
+    def sqlite(cls, path: str, pool: Optional[PoolSettings] = None) -> "Init":
+        """Constructor of an embedded SQLite database in a file, for a single node
+        without a database server (no network round trips).
+
+        `Mutation`, `Query` & report generators work unchanged on it. Monthly
+        partitions & async apis need PostgreSQL, `use_copy` of
+        `Mutation.bulk_insert_transactions` inserts batches without `COPY`.
+
+        eg:-
+
+            db_constructor: Init = Init.sqlite("/var/lib/pdfparser/transaction.db")
+        """
+        db_constructor: Init = cls("", "", "", 0, os.path.basename(path), pool)
+        db_constructor._sqlite_path = path
+        return db_constructor
+
+    @classmethod
+    def from_settings(cls, settings: DatabaseSettings) -> "Init":
+        """Constructor of a server, or of an embedded database if its path is set."""
+        if settings.sqlite_path:
+            return cls.sqlite(settings.sqlite_path, settings.pool)
+        return cls(
+            settings.username,
+            settings.password,
+            settings.host,
+            settings.port,
+            settings.db_name,
+            settings.pool,
+        )
 
-    def create_db(self) -> None:
-        """Create database and tables using metadata."""
-        default_engine: Engine = self.create_engine(_DEFAULT_POSTFRES_DB_NAME)
+    @classmethod
+    def from_env(cls, env_file: str = DEFAULT_ENV_FILE) -> "Init":
+        """Constructor from environment variables & `.env` file (see `settings.py`)."""
+        return cls.from_settings(get_database_settings(env_file))
 
-        with default_engine.connect() as conn:
-            conn.execute(text(f"create database {self._db_name}"))
-            curr_engine: Engine = self.create_engine()
-            METADATA.create_all(curr_engine)
-            curr_engine.dispose()
-        default_engine.dispose()
+    def create_db(self, partition_by_month: bool = False) -> None:
+        """Create database and tables using metadata.
+
+        If `partition_by_month` is set, `Transaction` table is range partitioned by
+        month of settlement date (partitions are created while inserting records).
+        """
+        if self._sqlite_path:
+            # Database file is created by the first connection.
+            self.create_tables(partition_by_month)
+            return
+        self._run_on_default_db(f"create database {self._db_name}")
+        self._create_tables(self.get_engine(), partition_by_month)
+
+    def create_tables(self, partition_by_month: bool = False) -> None:
+        """Create tables which are not in database yet (eg: after an upgrade)."""
+        self._create_tables(self.get_engine(), partition_by_month)
+
+    def migrate(self, partition_by_month: bool = False) -> None:
+        """Upgrade schema of an existing database.
+
+        * Create missing tables & indexes of `Transaction` table.
+        * If `partition_by_month` is set and `Transaction` table is not partitioned
+          yet, move all records to a partitioned table.
+        * Create `TransactionKey` table of a partitioned `Transaction` table, if it
+          is missing (eg: duplicates inserted before it was created are kept).
+
+        Changes are done in one transaction, `Transaction` table is not available
+        for other connections meanwhile.
+        """
+        engine: Engine = self.get_engine()
+        self._create_tables(engine)
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level=_isolation_level(conn.dialect))
+            for index in METADATA.tables["Transaction"].indexes:
+                index.create(conn, checkfirst=True)
+            if _is_partitioned(conn):
+                self._create_transaction_key_table(conn)
+            elif partition_by_month:
+                _check_partitioning(conn.dialect)
+                self._partition_transaction_table(conn)
+            conn.commit()
+
+    @staticmethod
+    def _create_tables(engine: Engine, partition_by_month: bool = False) -> None:
+        """Create missing tables, partitioned `Transaction` table if required."""
+        if partition_by_month:
+            _check_partitioning(engine.dialect)
+            # Existing `Transaction` table is skipped by `METADATA` afterwards.
+            PARTITIONED_METADATA.create_all(engine)
+        METADATA.create_all(engine)
+
+    @staticmethod
+    def _partition_transaction_table(conn: Connection) -> None:
+        """Replace `Transaction` table by a partitioned one with the same records."""
+        # Names of old table's sequence & indexes are used by the new table.
+        conn.execute(
+            text(f'alter table "Transaction" rename to "{_UNPARTITIONED_TABLE_NAME}"')
+        )
+        conn.execute(
+            text(
+                'alter index if exists "Transaction_pkey" '
+                f'rename to "{_UNPARTITIONED_TABLE_NAME}_pkey"'
+            )
+        )
+        conn.execute(
+            text(
+                'alter sequence if exists "Transaction_id_seq" '
+                f'rename to "{_UNPARTITIONED_TABLE_NAME}_id_seq"'
+            )
+        )
+        for index in METADATA.tables["Transaction"].indexes:
+            conn.execute(text(f"drop index if exists {index.name}"))
+
+        PARTITIONED_METADATA.tables["Transaction"].create(conn)
+        months: List[date] = [
+            row[0]
+            for row in conn.execute(
+                text(
+                    "select distinct date_trunc('month', settlement_date)::date "
+                    f'from "{_UNPARTITIONED_TABLE_NAME}"'
+                )
+            )
+        ]
+        for month in months:
+            _create_month_partition(conn, month)
+        # Keys may already be created by `create_tables(partition_by_month=True)`.
+        PARTITIONED_METADATA.tables["TransactionKey"].create(conn, checkfirst=True)
+        conn.execute(
+            text(
+                'insert into "TransactionKey" (xref, total_loan_amount) '
+                f'select xref, total_loan_amount from "{_UNPARTITIONED_TABLE_NAME}" '
+                "on conflict do nothing"
+            )
+        )
+
+        columns: str = ", ".join(("id",) + _TRANSACTION_COLUMNS)
+        conn.execute(
+            text(
+                f'insert into "Transaction" ({columns}) '
+                f'select {columns} from "{_UNPARTITIONED_TABLE_NAME}"'
+            )
+        )
+        # New ids continue after copied ids.
+        conn.execute(
+            text(
+                "select setval(pg_get_serial_sequence('\"Transaction\"', 'id'), "
+                'coalesce(max(id), 0) + 1, false) from "Transaction"'
+            )
+        )
+        conn.execute(text(f'drop table "{_UNPARTITIONED_TABLE_NAME}"'))
+
+    @staticmethod
+    def _create_transaction_key_table(conn: Connection) -> None:
+        """Create `TransactionKey` table with keys of all records, if not created
+        already.
+        """
+        if conn.execute(text("select to_regclass('\"TransactionKey\"')")).scalar():
+            return
+        PARTITIONED_METADATA.tables["TransactionKey"].create(conn)
+        conn.execute(
+            text(
+                'insert into "TransactionKey" (xref, total_loan_amount) '
+                'select xref, total_loan_amount from "Transaction" '
+                "on conflict do nothing"
+            )
+        )
 
     def drop_db(self) -> None:
         """Delete the entire database.
 
         WARNING: ALL EXISTING DB-DATA WILL BE LOST IF CALLED.
         """
-        default_engine: Engine = self.create_engine(_DEFAULT_POSTFRES_DB_NAME)
-
-        with default_engine.connect() as conn:
-            conn.execute(text(f"drop database {self._db_name}"))
-        default_engine.dispose()
+        # Pooled connections of the shared engine are closed before.
+        with _ENGINES_LOCK:
+            engine: Optional[Engine] = _ENGINES.pop((self._url(), self._pool), None)
+        if engine is not None:
+            engine.dispose()
+        if self._sqlite_path:
+            for suffix in _SQLITE_FILE_SUFFIXES:
+                if os.path.exists(self._sqlite_path + suffix):
+                    os.remove(self._sqlite_path + suffix)
+            return
+        self._run_on_default_db(f"drop database {self._db_name}")
 
     def create_engine(self, db_name: Optional[str] = None) -> Engine:
         """Create a database engine for creating database connection.
 
         Engine should be disposed after use, otherwise connection leak will happen.
         """
+        return self._create_engine(self._url(db_name))
+
+    def get_engine(self) -> Engine:
+        """Engine shared by all callers in the process with the same database &
+        `PoolSettings`, created by the first call.
+
+        Connections are checked out from one pool instead of a new engine (and new
+        connections) per caller. Shared engine should not be disposed by a caller,
+        see `dispose_engines`.
+
+        eg:-
+
+            Query(Init.from_env().get_engine()).get_loan_amount(start, end)
+        """
+        key: Tuple[str, PoolSettings] = (self._url(), self._pool)
+        with _ENGINES_LOCK:
+            if key not in _ENGINES:
+                _ENGINES[key] = self._create_engine(key[0])
+            return _ENGINES[key]
+
+    def _url(self, db_name: Optional[str] = None) -> str:
+        """Database url, psycopg driver if statements are prepared on the server."""
+        if self._sqlite_path:
+            return f"sqlite:///{self._sqlite_path}"
+        driver: str = "+psycopg" if self._pool.prepare_threshold is not None else ""
         db_name_: str = db_name if db_name else self._db_name
-        return create_engine(
-            f"postgresql://{self._username}:{self._password}@{self._host}:{self._port}/{db_name_}"
-        ).execution_options(isolation_level="AUTOCOMMIT")
+        return (
+            f"postgresql{driver}://{self._username}:{self._password}@{self._host}:"
+            f"{self._port}/{db_name_}"
+        )
+
+    def _create_engine(self, url: str, **kwargs) -> Engine:
+        """Engine in autocommit mode with `PoolSettings`.
+
+        Isolation level is the default of every connection of the pool, it is not set
+        & reset on each checkout.
+        """
+        connect_args: dict = {}
+        if self._sqlite_path:
+            # A connection is used by one thread at a time (pool), not always by the
+            # thread which opened it (eg: writer thread of `BatchIngestor`). SQLite
+            # keeps prepared statements of a connection anyway.
+            connect_args["check_same_thread"] = False
+        elif self._pool.prepare_threshold is not None:
+            connect_args["prepare_threshold"] = self._pool.prepare_threshold
+        if kwargs.get("poolclass") is not NullPool:
+            kwargs.update(
+                pool_size=self._pool.size,
+                max_overflow=self._pool.max_overflow,
+                pool_pre_ping=self._pool.pre_ping,
+                pool_recycle=self._pool.recycle,
+            )
+        engine: Engine = create_engine(
+            url, isolation_level="AUTOCOMMIT", connect_args=connect_args, **kwargs
+        )
+        if self._sqlite_path:
+            event.listen(engine, "connect", _set_sqlite_pragmas)
+        return engine
+
+    def _run_on_default_db(self, sql: str) -> None:
+        """Run a statement (eg: `create database`) on `postgres` database, with a
+        single unpooled connection.
+        """
+        engine: Engine = self._create_engine(
+            self._url(_DEFAULT_POSTFRES_DB_NAME), poolclass=NullPool
+        )
+        with engine.connect() as conn:
+            conn.execute(text(sql))
+        engine.dispose()
+
+
+def dispose_engines() -> None:
+    """Close connections of all shared engines (see `Init.get_engine`), eg: at exit
+    of a service.
+    """
+    with _ENGINES_LOCK:
+        engines: List[Engine] = list(_ENGINES.values())
+        _ENGINES.clear()
+    for engine in engines:
+        engine.dispose()
 
 
 class Mutation:
-    """Data manipulation apis."""
+    """Data manipulation apis.
+
+    If `maintain_rollups` is set, rollup tables (`BrokerDailyRollup` &
+    `DailyRollup`) are updated in the same transaction as inserted records. Rollup
+    tables of a database created before them are added by `Init.create_tables`.
+    """
 
-    def __init__(self, engine: Engine) -> None:
+    def __init__(
+        self,
+        engine: Engine,
+        maintain_rollups: bool = False,
+        cache: Optional["QueryCache"] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
         self._engine: Engine = engine
+        self._maintain_rollups: bool = maintain_rollups
+        # Cached results of inserted dates & brokers are invalidated (see `cache.py`).
+        self._cache: Optional["QueryCache"] = cache
+        # Inserts are recorded as stages (see `metrics.py`).
+        self._metrics: Optional[MetricsRegistry] = metrics
+        self._partitioned: Optional[bool] = None
+        # Months which have a partition (only if `Transaction` table is partitioned).
+        self._partition_months: Set[date] = set()
 
-    def insert_transactions(self, transactions: List[TransactionRecord]) -> None:
+    def insert_transactions(self, transactions: Iterable[TransactionRecord]) -> None:
         """Insert all records to database.
 
         In case of `UniqueConstraint` error, skip the error.
         For avoiding duplicate records in DB, unique-constraint is used.
         """
-        transaction_table: Table = METADATA.tables["Transaction"]
         with self._engine.connect() as conn:
+            if self._maintain_rollups or self._is_partitioned(conn):
+                # A record & its rollup update (or key) is committed together.
+                conn.commit()
+                conn.execution_options(isolation_level=_isolation_level(conn.dialect))
+            self.insert_transactions_on(conn, transactions)
+
+    def bulk_insert_transactions(
+        self,
+        transactions: Union[Iterable[TransactionRecord], "RecordBatch"],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        use_copy: bool = False,
+    ) -> InsertSummary:
+        """Insert records in batches and return inserted & skipped counts.
+
+        Each batch is sent as a single `INSERT ... ON CONFLICT DO NOTHING` with an
+        array per column (see `record_batch.py`), so duplicate (xref +
+        total-loan-amount) records are skipped by database without raising an error
+        per record. A `RecordBatch` is loaded without creating an object per record.
+
+        If `use_copy` is set, each batch is streamed with `COPY` to a temporary
+        staging table and moved to `Transaction` table with one `INSERT ... SELECT`.
+        Preferred for very large statements (PostgreSQL only, ignored by SQLite).
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size should be a positive integer.")
+
+        with self._engine.connect() as conn:
+            # A batch & its rollup update is committed together.
+            conn.execution_options(isolation_level=_isolation_level(conn.dialect))
+            return self.bulk_insert_transactions_on(
+                conn, transactions, batch_size, use_copy
+            )
+
+    def rebuild_rollups(self) -> None:
+        """Recompute rollup tables from `Transaction` table (backfill or repair).
+
+        `Transaction` table is locked against inserts until rollups are rebuilt.
+        """
+        with self._engine.connect() as conn:
+            conn.execution_options(isolation_level=_isolation_level(conn.dialect))
+            self.rebuild_rollups_on(conn)
+
+    def record_ingestion(self, outcome: IngestionOutcome) -> None:
+        """Save outcome of an ingested file to ledger (replace if already saved)."""
+        with self._engine.connect() as conn:
+            conn.execute(self.record_ingestion_stmt(outcome))
+
+    # Internal api: below methods work on a given connection (isolation level
+    # `TRANSACTION_ISOLATION_LEVEL`) and commit it, they run the public methods above
+    # and `AsyncMutation` (see `async_store.py`).
+
+    def insert_transactions_on(
+        self, conn: Connection, transactions: Iterable[TransactionRecord]
+    ) -> None:
+        """Insert & commit records one by one, skip duplicates."""
+        from pdfparser.record_batch import RecordBatch
+
+        # Inserted rows are only needed for rollups & cache invalidation.
+        returning: bool = self._maintain_rollups or self._cache is not None
+        stmt = _record_insert_stmt(_is_sqlite(conn.dialect), returning)
+        with stage(self._metrics, "mutation.insert_transactions") as timer:
             for record in transactions:
-                stmt = insert(transaction_table).values(
-                    app_id=record.app_id,
-                    xref=record.xref,
-                    settlement_date=record.settlement_date,
-                    broker=record.broker,
-                    sub_broker=record.sub_broker,
-                    borrower_name=record.borrower_name,
-                    description=record.description,
-                    total_loan_amount=record.total_loan_amount,
-                    comm_rate=record.comm_rate,
-                    upfront=record.upfront,
-                    upfront_incl_gst=record.upfront_incl_gst,
+                # Key of a record is claimed only in a partitioned `Transaction` table.
+                if self._is_partitioned(conn):
+                    self._create_partitions(conn, [record.settlement_date])
+                    if not len(
+                        self._claim_keys(conn, RecordBatch.from_records([record]))
+                    ):
+                        conn.commit()
+                        timer.duplicates += 1
+                        continue
+                values: dict = {
+                    column: getattr(record, column) for column in _TRANSACTION_COLUMNS
+                }
+                inserted: List[Row] = []
+                if returning:
+                    inserted = conn.execute(stmt, values).all()
+                    is_inserted: bool = bool(inserted)
+                else:
+                    is_inserted = conn.execute(stmt, values).rowcount > 0
+                self._update_rollups(conn, inserted)
+                conn.commit()
+                if not is_inserted:
+                    timer.duplicates += 1
+                    continue
+                self._invalidate_cache(inserted)
+                timer.rows += 1
+
+    def bulk_insert_transactions_on(
+        self,
+        conn: Connection,
+        transactions: Union[Iterable[TransactionRecord], "RecordBatch"],
+        batch_size: int,
+        use_copy: bool,
+    ) -> InsertSummary:
+        """Insert & commit records batch by batch, return inserted & skipped counts."""
+        from pdfparser.record_batch import RecordBatch
+
+        batches: Iterator["RecordBatch"] = (
+            transactions.chunks(batch_size)
+            if isinstance(transactions, RecordBatch)
+            else map(RecordBatch.from_records, _batched(transactions, batch_size))
+        )
+        # SQLite has no `COPY`, rows are in process anyway.
+        use_copy = use_copy and not _is_sqlite(conn.dialect)
+        with stage(self._metrics, "mutation.bulk_insert_transactions") as timer:
+            summary: InsertSummary = InsertSummary()
+            if use_copy:
+                self._create_staging_table(conn)
+                conn.commit()
+            try:
+                for batch in batches:
+                    self._create_partitions(
+                        conn, batch.column_values("settlement_date")
+                    )
+                    records: "RecordBatch" = self._claim_keys(conn, batch)
+                    inserted: List[Row] = []
+                    if len(records):
+                        inserted = (
+                            self._copy_batch(conn, records)
+                            if use_copy
+                            else self._insert_batch(conn, records)
+                        )
+                    self._update_rollups(conn, inserted)
+                    conn.commit()
+                    self._invalidate_cache(inserted)
+                    summary.inserted += len(inserted)
+                    summary.skipped += len(batch) - len(inserted)
+            finally:
+                if use_copy:
+                    # Failed batch is rolled back before dropping staging table.
+                    conn.rollback()
+                    conn.execute(text(f"drop table if exists {_STAGING_TABLE_NAME}"))
+                    conn.commit()
+            timer.rows, timer.duplicates = summary.inserted, summary.skipped
+        return summary
+
+    def rebuild_rollups_on(self, conn: Connection) -> None:
+        """Recompute & commit rollup tables."""
+        with stage(self._metrics, "mutation.rebuild_rollups"):
+            transaction_table: Table = METADATA.tables["Transaction"]
+            broker_rollup_table: Table = METADATA.tables["BrokerDailyRollup"]
+            daily_rollup_table: Table = METADATA.tables["DailyRollup"]
+            broker = transaction_table.columns["broker"]
+            settlement_date = transaction_table.columns["settlement_date"]
+            amount = transaction_table.columns["total_loan_amount"]
+
+            if not _is_sqlite(conn.dialect):
+                # SQLite locks whole database while writing.
+                conn.execute(text('lock table "Transaction" in share mode'))
+            conn.execute(delete(broker_rollup_table))
+            conn.execute(delete(daily_rollup_table))
+            conn.execute(
+                insert(broker_rollup_table).from_select(
+                    [
+                        "broker",
+                        "settlement_date",
+                        "total_loan_amount",
+                        "loan_count",
+                        "max_loan_amount",
+                        "loan_amounts",
+                    ],
+                    select(
+                        broker,
+                        settlement_date,
+                        func.sum(amount),
+                        func.count(),
+                        func.max(amount),
+                        _sorted_loan_amounts(amount),
+                    ).group_by(broker, settlement_date),
                 )
-                try:
-                    conn.execute(stmt)
+            )
+            conn.execute(
+                insert(daily_rollup_table).from_select(
+                    [
+                        "settlement_date",
+                        "total_loan_amount",
+                        "loan_count",
+                        "tier1",
+                        "tier2",
+                        "tier3",
+                    ],
+                    select(
+                        settlement_date,
+                        func.sum(amount),
+                        func.count(),
+                        *_tier_counts(amount),
+                    ).group_by(settlement_date),
+                )
+            )
+            conn.commit()
 
-                except IntegrityError as exc:
-                    # Skipping `UniqueConstraint` error for maintaining unique records
-                    # with (xref + total-loan-amount)
-                    if exc.orig.pgcode == "23505":
-                        continue
+    def record_ingestion_stmt(self, outcome: IngestionOutcome):
+        """Upsert statement of a ledger entry."""
+        ledger_table: Table = METADATA.tables["IngestionLedger"]
+        values: dict = {
+            "page_count": outcome.page_count,
+            "row_count": outcome.row_count,
+            "inserted": outcome.inserted,
+            "skipped": outcome.skipped,
+            "ingested_at": outcome.ingested_at,
+        }
+        return (
+            _dialect_insert(self._engine.dialect)(ledger_table)
+            .values(content_hash=outcome.content_hash, **values)
+            .on_conflict_do_update(index_elements=["content_hash"], set_=values)
+        )
+
+    def _create_partitions(
+        self, conn: Connection, settlement_dates: List[date]
+    ) -> None:
+        """Create missing monthly partitions if `Transaction` table is partitioned."""
+        if not self._is_partitioned(conn):
+            return
+        months: Set[date] = {
+            settlement_date.replace(day=1) for settlement_date in settlement_dates
+        }
+        for month in sorted(months - self._partition_months):
+            try:
+                _create_month_partition(conn, month)
+                conn.commit()
+            except DBAPIError as exc:
+                conn.rollback()
+                # `sqlstate` of psycopg (see `PoolSettings.prepare_threshold`).
+                pgcode: Optional[str] = getattr(
+                    exc.orig, "pgcode", getattr(exc.orig, "sqlstate", None)
+                )
+                if pgcode not in _DUPLICATE_PARTITION_PGCODES:
                     raise exc
+            self._partition_months.add(month)
+
+    def _claim_keys(self, conn: Connection, records: "RecordBatch") -> "RecordBatch":
+        """Records which are not duplicates, their keys are inserted to
+        `TransactionKey` table if `Transaction` table is partitioned.
+
+        Unique key of a partitioned table has settlement date, so (xref +
+        total-loan-amount) key is claimed before inserting records. Claimed keys are
+        committed (or rolled back) together with the records.
+        """
+        if not self._is_partitioned(conn):
+            return records
+        key_table: Table = PARTITIONED_METADATA.tables["TransactionKey"]
+        columns: str = ", ".join(_KEY_COLUMNS)
+        claimed: Set[Tuple] = {
+            tuple(row)
+            for row in conn.execute(
+                text(
+                    f'insert into "TransactionKey" ({columns}) '
+                    f"{_unnest_select(conn.dialect, key_table, _KEY_COLUMNS)} "
+                    f"on conflict do nothing returning {columns}"
+                ),
+                _column_arrays(records, _KEY_COLUMNS),
+            )
+        }
+        unique: List[bool] = [False] * len(records)
+        for pos, key in enumerate(
+            zip(*(records.column_values(column) for column in _KEY_COLUMNS))
+        ):
+            # Only first record of a key repeated in `records` is inserted.
+            if key in claimed:
+                claimed.remove(key)
+                unique[pos] = True
+        return records.take(unique)
+
+    def _is_partitioned(self, conn: Connection) -> bool:
+        """`Transaction` table is partitioned (checked once per `Mutation`)."""
+        if self._partitioned is None:
+            self._partitioned = _is_partitioned(conn)
+        return self._partitioned
+
+    def _invalidate_cache(self, inserted: List[Row]) -> None:
+        """Remove cached results which depend on inserted rows."""
+        if self._cache is None or not inserted:
+            return
+        self._cache.invalidate(
+            {settlement_date for _broker, settlement_date, _amount in inserted},
+            {broker for broker, _settlement_date, _amount in inserted},
+        )
+
+    def _update_rollups(self, conn: Connection, inserted: List[Row]) -> None:
+        """Add inserted (broker, settlement-date, total-loan-amount) rows to rollups."""
+        if not self._maintain_rollups or not inserted:
+            return
+        broker_amounts: Dict[Tuple[str, date], List[float]] = defaultdict(list)
+        daily_amounts: Dict[date, List[float]] = defaultdict(list)
+        for broker, settlement_date, amount in inserted:
+            broker_amounts[(broker, settlement_date)].append(amount)
+            daily_amounts[settlement_date].append(amount)
+
+        broker_stmt, daily_stmt = _rollup_upsert_stmts(_is_sqlite(conn.dialect))
+        # Sorted keys, concurrent inserts lock rollup rows in the same order.
+        conn.execute(
+            broker_stmt,
+            [
+                {
+                    "broker": broker,
+                    "settlement_date": settlement_date,
+                    "total_loan_amount": sum(amounts),
+                    "loan_count": len(amounts),
+                    "max_loan_amount": max(amounts),
+                    "loan_amounts": sorted(amounts, reverse=True),
+                }
+                for (broker, settlement_date), amounts in sorted(broker_amounts.items())
+            ],
+        )
+
+        rows: List[dict] = []
+        for settlement_date, amounts in sorted(daily_amounts.items()):
+            tiers: List[Optional[str]] = [_tier(amount) for amount in amounts]
+            rows.append(
+                {
+                    "settlement_date": settlement_date,
+                    "total_loan_amount": sum(amounts),
+                    "loan_count": len(amounts),
+                    "tier1": tiers.count("tier1"),
+                    "tier2": tiers.count("tier2"),
+                    "tier3": tiers.count("tier3"),
+                }
+            )
+        conn.execute(daily_stmt, rows)
+
+    @staticmethod
+    def _insert_batch(conn: Connection, batch: "RecordBatch") -> List[Row]:
+        """Insert a batch as a single statement, return inserted rows (for rollups).
+
+        Each column is sent as one array parameter and rows are formed by `unnest`
+        in database, so parameters (11) do not grow with batch size. Rows are
+        returned only for inserted records.
+
+        SQLite has no arrays, rows are sent as multi row `VALUES` (in process, no
+        round trips).
+        """
+        transaction_table: Table = METADATA.tables["Transaction"]
+        if _is_sqlite(conn.dialect):
+            arrays: Dict[str, list] = _column_arrays(batch, _TRANSACTION_COLUMNS)
+            return conn.execute(
+                sqlite_insert(transaction_table)
+                .on_conflict_do_nothing()
+                .returning(*_rollup_columns()),
+                [dict(zip(arrays, row)) for row in zip(*arrays.values())],
+            ).all()
+        columns: str = ", ".join(_TRANSACTION_COLUMNS)
+        # No conflict target, a partitioned table has no unique key (see
+        # `_claim_keys`).
+        return conn.execute(
+            text(
+                f'insert into "Transaction" ({columns}) '
+                f"{_unnest_select(conn.dialect, transaction_table, _TRANSACTION_COLUMNS)} "
+                "on conflict do nothing "
+                "returning broker, settlement_date, total_loan_amount"
+            ),
+            _column_arrays(batch, _TRANSACTION_COLUMNS),
+        ).all()
+
+    @staticmethod
+    def _create_staging_table(conn: Connection) -> None:
+        """Create a session level staging table with all record columns."""
+        columns: str = ", ".join(_TRANSACTION_COLUMNS)
+        conn.execute(
+            text(
+                f"create temporary table if not exists {_STAGING_TABLE_NAME} as "
+                f'select {columns} from "Transaction" with no data'
+            )
+        )
+
+    @staticmethod
+    def _copy_batch(conn: Connection, batch: "RecordBatch") -> List[Row]:
+        """Copy a batch to staging table and move it to `Transaction` table, return
+        inserted rows.
+        """
+        columns: str = ", ".join(_TRANSACTION_COLUMNS)
+        conn.execute(text(f"truncate {_STAGING_TABLE_NAME}"))
+        if conn.dialect.driver == "asyncpg":
+            # Called from `AsyncMutation` (greenlet), asyncpg copies binary records.
+            await_only(
+                conn.connection.driver_connection.copy_records_to_table(
+                    _STAGING_TABLE_NAME,
+                    records=zip(*_column_arrays(batch, _TRANSACTION_COLUMNS).values()),
+                    columns=list(_TRANSACTION_COLUMNS),
+                )
+            )
+        else:
+            buffer: io.StringIO = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(
+                zip(
+                    *(
+                        [_COPY_NULL if val is None else val for val in values]
+                        for values in _column_arrays(
+                            batch, _TRANSACTION_COLUMNS
+                        ).values()
+                    )
+                )
+            )
+            buffer.seek(0)
+            copy_sql: str = (
+                f"copy {_STAGING_TABLE_NAME} ({columns}) from stdin "
+                f"with (format csv, null '{_COPY_NULL}')"
+            )
+            cursor = conn.connection.cursor()
+            try:
+                if conn.dialect.driver == "psycopg":
+                    # psycopg 3 (see `PoolSettings.prepare_threshold`).
+                    with cursor.copy(copy_sql) as copy:
+                        copy.write(buffer.getvalue())
+                else:
+                    cursor.copy_expert(copy_sql, buffer)
+            finally:
+                cursor.close()
+        return conn.execute(
+            text(
+                f'insert into "Transaction" ({columns}) '
+                f"select {columns} from {_STAGING_TABLE_NAME} "
+                "on conflict do nothing "
+                "returning broker, settlement_date, total_loan_amount"
+            )
+        ).all()
+
+
+def _prebuilt(build: Callable) -> Callable:
+    """Statement builder of `Query`, statement is built once per (use rollups, dialect
+    & arguments) and shared (see `_STATEMENTS`). Values are bound parameters.
+    """
+
+    @wraps(build)
+    def statement(query: "Query", *args) -> Any:
+        key: Tuple = (
+            build.__name__,
+            query._use_rollups,
+            query._engine.dialect.name,
+            *args,
+        )
+        if key not in _STATEMENTS:
+            _STATEMENTS[key] = build(query, *args)
+        return _STATEMENTS[key]
+
+    return statement
 
 
 class Query:
-    """Data querying apis."""
+    """Data querying apis.
+
+    If `use_rollups` is set, aggregates are read from rollup tables (maintained by
+    `Mutation`) instead of scanning `Transaction` table.
 
-    def __init__(self, engine: Engine) -> None:
+    Statements are built once per process and executed with parameters, so they
+    are not built & compiled again on each call.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        use_rollups: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
         self._engine: Engine = engine
+        self._use_rollups: bool = use_rollups
+        # Queries are recorded as stages (see `metrics.py`).
+        self._metrics: Optional[MetricsRegistry] = metrics
+
+    @property
+    def source(self) -> Tuple[str, bool]:
+        """Database url (without password) & `use_rollups`, results of queries with
+        the same source are the same (eg: key of cached results).
+        """
+        return self._engine.url.render_as_string(hide_password=True), self._use_rollups
 
     def get_loan_amount(self, start_date: date, end_date: date) -> Optional[float]:
         """Loan amount in a period."""
-        transaction_table: Table = METADATA.tables["Transaction"]
-        stmt = select(func.sum(transaction_table.columns["total_loan_amount"])).where(
-            and_(
-                transaction_table.columns["settlement_date"] >= start_date,
-                transaction_table.columns["settlement_date"] <= end_date,
-            )
+        return self._fetch_value(
+            "get_loan_amount",
+            self.loan_amount_stmt(),
+            {"start_date": start_date, "end_date": end_date},
         )
 
-        with self._engine.connect() as conn:
-            result = conn.execute(stmt).fetchone()
-        return None if not result else result[0]
-
     def get_highest_loan_amt_by_broker(self, broker: str) -> Optional[float]:
         """Highest loan amount given by a broker."""
-        transaction_table: Table = METADATA.tables["Transaction"]
-        stmt = select(func.max(transaction_table.columns["total_loan_amount"])).where(
-            transaction_table.columns["broker"] == broker
+        return self._fetch_value(
+            "get_highest_loan_amt_by_broker",
+            self.highest_loan_amt_by_broker_stmt(),
+            {"broker": broker},
         )
 
-        with self._engine.connect() as conn:
-            result = conn.execute(stmt).fetchone()
-        return None if not result else result[0]
+    def get_loan_amounts(
+        self, periods: List[Tuple[date, date]]
+    ) -> Dict[Tuple[date, date], Optional[float]]:
+        """Loan amount in each (start-date, end-date) period, all periods in a single
+        statement (table is scanned once).
+
+        eg: {(date(2023, 10, 1), date(2023, 10, 31)): 358900.0,
+             (date(2023, 11, 1), date(2023, 11, 30)): None}
+        """
+        if not periods:
+            return {}
+        return self.loan_amounts_result(
+            periods,
+            self._fetch_dicts(
+                "get_loan_amounts",
+                self.loan_amounts_stmt(),
+                self.loan_amounts_params(periods),
+            ),
+        )
+
+    def get_highest_loan_amt_by_brokers(
+        self, brokers: Optional[List[str]] = None
+    ) -> Dict[str, Optional[float]]:
+        """Highest loan amount given by each broker (all brokers if not given), in a
+        single statement.
+
+        eg: {"Cheston La'Porte": 35890.0, "Unknown broker": None}
+        """
+        if brokers is not None and not brokers:
+            return {}
+        return self.highest_loan_amts_result(
+            brokers,
+            self._fetch_dicts(
+                "get_highest_loan_amt_by_brokers",
+                self.highest_loan_amt_by_brokers_stmt(brokers is not None),
+                None if brokers is None else {"brokers": brokers},
+            ),
+        )
+
+    def get_ingestion(self, content_hash: str) -> Optional[IngestionOutcome]:
+        """Ledger entry of a file ingested before, `None` if not ingested yet."""
+        result = self._fetch_value(
+            "get_ingestion",
+            self.ingestion_stmt(),
+            {"content_hash": content_hash},
+            row=True,
+        )
+        return None if not result else IngestionOutcome(**result._asdict())
 
     def get_broker_level_loan_amount_with_date(self) -> List[dict]:
         """Return array of loan amount for a broker in a day."""
+        return self._fetch_dicts(
+            "get_broker_level_loan_amount_with_date",
+            self.broker_level_loan_amount_with_date_stmt(),
+        )
+
+    def get_total_loan_amount_by_date(self) -> List[dict]:
+        """Return total loan amount of each day.
+
+        eg: [{"settlement_date": date(2023, 10, 17), "total_loan_amount": 358900.0}]
+        """
+        return self._fetch_dicts(
+            "get_total_loan_amount_by_date", self.total_loan_amount_by_date_stmt()
+        )
+
+    def get_tier_level_loan_count_by_date(self) -> List[dict]:
+        """Return number of loans in each tier of each day.
+
+        eg: [{"settlement_date": date(2023, 10, 17), "tier1": 5, "tier2": 10,
+              "tier3": 1}]
+        """
+        return self._fetch_dicts(
+            "get_tier_level_loan_count_by_date",
+            self.tier_level_loan_count_by_date_stmt(),
+        )
+
+    def get_broker_loan_amounts_by_period(self, period: str) -> List[dict]:
+        """Return loan amounts (descending) of a broker in each period.
+
+        `period` is one of `day`, `week` (first day of the week, monday) or `month`
+        (month number, same month of different years is one period).
+
+        eg: [{"broker": "Cheston La'Porte", "period": date(2023, 10, 16),
+              "loan_amounts": [35890.0, 3589.0]}]
+        """
+        return self._fetch_dicts(
+            "get_broker_loan_amounts_by_period",
+            self.broker_loan_amounts_by_period_stmt(period),
+        )
+
+    def get_transaction_count(self) -> int:
+        """Number of records in `Transaction` table."""
+        return self._fetch_value("get_transaction_count", self.transaction_count_stmt())
+
+    def get_stored_keys(
+        self, xrefs: List[int], total_loan_amounts: List[float]
+    ) -> Set[Tuple[int, float]]:
+        """(xref, total-loan-amount) keys of given keys which are stored, checked in
+        a single statement.
+        """
+        return {
+            (row["xref"], row["total_loan_amount"])
+            for row in self._fetch_dicts(
+                "get_stored_keys",
+                self.stored_keys_stmt(),
+                self.stored_keys_params(xrefs, total_loan_amounts),
+            )
+        }
+
+    def iter_transaction_keys(
+        self, yield_per: int = DEFAULT_YIELD_PER
+    ) -> Iterator[dict]:
+        """Yield (xref, total-loan-amount) key of every record, `yield_per` at a time.
+
+        eg: {"xref": 100305936, "total_loan_amount": 35890.0}
+        """
+        return self._stream_dicts(
+            "iter_transaction_keys", self.transaction_keys_stmt(), yield_per
+        )
+
+    def iter_broker_daily_loan_amounts(
+        self, yield_per: int = DEFAULT_YIELD_PER
+    ) -> Iterator[dict]:
+        """Yield loan amounts (descending) of a broker in each day, ordered by broker
+        & day. Rows are fetched `yield_per` at a time (server side cursor), so all
+        rows of a large table are never held in memory.
+
+        eg: {"broker": "Cheston La'Porte", "period": date(2023, 10, 17),
+             "loan_amounts": [35890.0, 3589.0]}
+        """
+        return self._stream_dicts(
+            "iter_broker_daily_loan_amounts",
+            self.broker_daily_loan_amounts_stmt(),
+            yield_per,
+        )
+
+    def iter_total_loan_amount_by_date(
+        self, yield_per: int = DEFAULT_YIELD_PER
+    ) -> Iterator[dict]:
+        """Yield rows of `get_total_loan_amount_by_date`, `yield_per` at a time."""
+        return self._stream_dicts(
+            "iter_total_loan_amount_by_date",
+            self.total_loan_amount_by_date_stmt(),
+            yield_per,
+        )
+
+    def iter_tier_level_loan_count_by_date(
+        self, yield_per: int = DEFAULT_YIELD_PER
+    ) -> Iterator[dict]:
+        """Yield rows of `get_tier_level_loan_count_by_date`, `yield_per` at a time."""
+        return self._stream_dicts(
+            "iter_tier_level_loan_count_by_date",
+            self.tier_level_loan_count_by_date_stmt(),
+            yield_per,
+        )
+
+    def _fetch_value(
+        self, method: str, stmt, params: Optional[dict] = None, row: bool = False
+    ) -> Any:
+        """First column of first row (whole row if `row` is set), `None` if there is
+        no row.
+        """
+        with stage(self._metrics, f"query.{method}") as timer:
+            with self._engine.connect() as conn:
+                result = conn.execute(stmt, params).fetchone()
+            timer.rows = int(result is not None)
+        return None if not result else (result if row else result[0])
+
+    def _fetch_dicts(
+        self, method: str, stmt, params: Optional[dict] = None
+    ) -> List[dict]:
+        """All rows as dicts."""
+        with stage(self._metrics, f"query.{method}") as timer:
+            with self._engine.connect() as conn:
+                rows: List[dict] = [row._asdict() for row in conn.execute(stmt, params)]
+            timer.rows = len(rows)
+        return rows
+
+    def _stream_dicts(self, method: str, stmt, yield_per: int) -> Iterator[dict]:
+        """Rows as dicts from a server side cursor, see `_iter_dicts`."""
+        if yield_per < 1:
+            raise ValueError("yield_per should be a positive integer.")
+        return self._iter_dicts(method, stmt, yield_per)
+
+    def _iter_dicts(self, method: str, stmt, yield_per: int) -> Iterator[dict]:
+        """Yield rows as dicts from a server side cursor, connection is held until
+        all rows are read (or the generator is closed).
+        """
+        with stage(self._metrics, f"query.{method}") as timer:
+            with self._engine.connect() as conn:
+                # Server side cursor needs a transaction (engine is in autocommit).
+                result = conn.execution_options(
+                    isolation_level=_isolation_level(conn.dialect),
+                    stream_results=True,
+                    yield_per=yield_per,
+                ).execute(stmt)
+                for row in result:
+                    timer.rows += 1
+                    yield row._asdict()
+
+    # Internal api: statement (and parameters) of each public method above, executed
+    # by them and by `AsyncQuery` (see `async_store.py`).
+
+    @_prebuilt
+    def loan_amount_stmt(self):
+        """Statement of `get_loan_amount`, parameters `start_date` & `end_date`."""
+        # Both tables have `settlement_date` & `total_loan_amount` columns.
+        table: Table = METADATA.tables[
+            "DailyRollup" if self._use_rollups else "Transaction"
+        ]
+        return select(func.sum(table.columns["total_loan_amount"])).where(
+            and_(
+                table.columns["settlement_date"] >= bindparam("start_date"),
+                table.columns["settlement_date"] <= bindparam("end_date"),
+            )
+        )
+
+    @_prebuilt
+    def highest_loan_amt_by_broker_stmt(self):
+        """Statement of `get_highest_loan_amt_by_broker`, parameter `broker`."""
+        if self._use_rollups:
+            table: Table = METADATA.tables["BrokerDailyRollup"]
+            amount = table.columns["max_loan_amount"]
+        else:
+            table = METADATA.tables["Transaction"]
+            amount = table.columns["total_loan_amount"]
+        return select(func.max(amount)).where(
+            table.columns["broker"] == bindparam("broker")
+        )
+
+    @_prebuilt
+    def loan_amounts_stmt(self):
+        """Statement of `get_loan_amounts`, loan amount of each day (one scan) summed
+        over days of each period. Periods are sent as array (json on sqlite)
+        parameters, statement is the same for any number of periods (see
+        `loan_amounts_params`).
+        """
+        if self._use_rollups:
+            daily = METADATA.tables["DailyRollup"]
+        else:
+            transaction_table: Table = METADATA.tables["Transaction"]
+            daily = (
+                select(
+                    transaction_table.columns["settlement_date"],
+                    func.sum(transaction_table.columns["total_loan_amount"]).label(
+                        "total_loan_amount"
+                    ),
+                )
+                .group_by(transaction_table.columns["settlement_date"])
+                .cte("daily")
+            )
+        period_table = _periods_table(self._engine.dialect)
+        settlement_date = daily.columns["settlement_date"]
+        return (
+            select(
+                period_table.columns["position"],
+                func.sum(daily.columns["total_loan_amount"]).label("total_loan_amount"),
+            )
+            .select_from(
+                period_table.outerjoin(
+                    daily,
+                    and_(
+                        settlement_date >= period_table.columns["start_date"],
+                        settlement_date <= period_table.columns["end_date"],
+                    ),
+                )
+            )
+            .group_by(period_table.columns["position"])
+        )
+
+    def loan_amounts_params(self, periods: List[Tuple[date, date]]) -> dict:
+        """Parameters of `loan_amounts_stmt`."""
+        if _is_sqlite(self._engine.dialect):
+            return {
+                "periods": json.dumps(
+                    [[start.isoformat(), end.isoformat()] for start, end in periods]
+                )
+            }
+        return {
+            "start_dates": [start for start, _end in periods],
+            "end_dates": [end for _start, end in periods],
+        }
+
+    @_prebuilt
+    def highest_loan_amt_by_brokers_stmt(self, filtered: bool):
+        """Statement of `get_highest_loan_amt_by_brokers`, of brokers in parameter
+        `brokers` if `filtered` is set.
+        """
+        if self._use_rollups:
+            table: Table = METADATA.tables["BrokerDailyRollup"]
+            amount = table.columns["max_loan_amount"]
+        else:
+            table = METADATA.tables["Transaction"]
+            amount = table.columns["total_loan_amount"]
+        broker = table.columns["broker"]
+        stmt = select(broker, func.max(amount).label("total_loan_amount")).group_by(
+            broker
+        )
+        return (
+            stmt.where(broker.in_(bindparam("brokers", expanding=True)))
+            if filtered
+            else stmt
+        )
+
+    @staticmethod
+    def loan_amounts_result(
+        periods: List[Tuple[date, date]], rows: List[dict]
+    ) -> Dict[Tuple[date, date], Optional[float]]:
+        """Result of `get_loan_amounts` from rows of its statement."""
+        amounts: Dict[int, Optional[float]] = {
+            row["position"]: row["total_loan_amount"] for row in rows
+        }
+        return {
+            period: amounts.get(position)
+            for position, period in enumerate(periods, start=1)
+        }
+
+    @staticmethod
+    def highest_loan_amts_result(
+        brokers: Optional[List[str]], rows: List[dict]
+    ) -> Dict[str, Optional[float]]:
+        """Result of `get_highest_loan_amt_by_brokers` from rows of its statement,
+        brokers without loans are `None`.
+        """
+        amounts: Dict[str, Optional[float]] = {
+            row["broker"]: row["total_loan_amount"] for row in rows
+        }
+        if brokers is None:
+            return amounts
+        return {broker: amounts.get(broker) for broker in brokers}
+
+    @_prebuilt
+    def ingestion_stmt(self):
+        """Statement of `get_ingestion`, parameter `content_hash`."""
+        ledger_table: Table = METADATA.tables["IngestionLedger"]
+        return select(ledger_table).where(
+            ledger_table.columns["content_hash"] == bindparam("content_hash")
+        )
+
+    @_prebuilt
+    def broker_level_loan_amount_with_date_stmt(self):
+        """Statement of `get_broker_level_loan_amount_with_date`."""
+        if self._use_rollups:
+            rollup_table: Table = METADATA.tables["BrokerDailyRollup"]
+            return select(
+                rollup_table.columns["broker"],
+                rollup_table.columns["settlement_date"],
+                rollup_table.columns["loan_amounts"].label("array_agg_1"),
+            ).order_by(rollup_table.columns["settlement_date"].asc())
+
         transaction_table: Table = METADATA.tables["Transaction"]
-        rows: List[dict] = []
-        stmt = (
+        return (
             select(
                 transaction_table.columns["broker"],
                 transaction_table.columns["settlement_date"],
-                func.array_agg(transaction_table.columns["total_loan_amount"]),
+                _loan_amounts(transaction_table.columns["total_loan_amount"]).label(
+                    "array_agg_1"
+                ),
             )
             .group_by(
                 transaction_table.columns["broker"],
@@ -152,7 +1317,412 @@ class Query:
             )
         )
 
-        with self._engine.connect() as conn:
-            for row in conn.execute(stmt):
-                rows.append(row._asdict())
-        return rows
+    @_prebuilt
+    def total_loan_amount_by_date_stmt(self):
+        """Statement of `get_total_loan_amount_by_date`."""
+        if self._use_rollups:
+            rollup_table: Table = METADATA.tables["DailyRollup"]
+            return select(
+                rollup_table.columns["settlement_date"],
+                rollup_table.columns["total_loan_amount"],
+            ).order_by(rollup_table.columns["settlement_date"].asc())
+
+        transaction_table: Table = METADATA.tables["Transaction"]
+        settlement_date = transaction_table.columns["settlement_date"]
+        return (
+            select(
+                settlement_date,
+                func.sum(transaction_table.columns["total_loan_amount"]).label(
+                    "total_loan_amount"
+                ),
+            )
+            .group_by(settlement_date)
+            .order_by(settlement_date.asc())
+        )
+
+    @_prebuilt
+    def tier_level_loan_count_by_date_stmt(self):
+        """Statement of `get_tier_level_loan_count_by_date`."""
+        if self._use_rollups:
+            rollup_table: Table = METADATA.tables["DailyRollup"]
+            return select(
+                rollup_table.columns["settlement_date"],
+                rollup_table.columns["tier1"],
+                rollup_table.columns["tier2"],
+                rollup_table.columns["tier3"],
+            ).order_by(rollup_table.columns["settlement_date"].asc())
+
+        transaction_table: Table = METADATA.tables["Transaction"]
+        settlement_date = transaction_table.columns["settlement_date"]
+        return (
+            select(
+                settlement_date,
+                *_tier_counts(transaction_table.columns["total_loan_amount"]),
+            )
+            .group_by(settlement_date)
+            .order_by(settlement_date.asc())
+        )
+
+    @_prebuilt
+    def transaction_count_stmt(self):
+        """Statement of `get_transaction_count`."""
+        return select(func.count()).select_from(METADATA.tables["Transaction"])
+
+    @_prebuilt
+    def stored_keys_stmt(self):
+        """Statement of `get_stored_keys`, see `stored_keys_params`."""
+        transaction_table: Table = METADATA.tables["Transaction"]
+        if _is_sqlite(self._engine.dialect):
+            xref = transaction_table.columns["xref"]
+            amount = transaction_table.columns["total_loan_amount"]
+            return (
+                select(xref, amount)
+                .distinct()
+                .where(tuple_(xref, amount).in_(bindparam("keys", expanding=True)))
+            )
+        return text(
+            'select distinct "Transaction".xref, "Transaction".total_loan_amount '
+            'from "Transaction" join '
+            f"({_unnest_select(self._engine.dialect, transaction_table, _KEY_COLUMNS)})"
+            " as keys using (xref, total_loan_amount)"
+        )
+
+    def stored_keys_params(
+        self, xrefs: List[int], total_loan_amounts: List[float]
+    ) -> dict:
+        """Parameters of `stored_keys_stmt`, an array per key column (list of keys on
+        sqlite).
+        """
+        if _is_sqlite(self._engine.dialect):
+            return {"keys": list(zip(xrefs, total_loan_amounts))}
+        return {"xref": xrefs, "total_loan_amount": total_loan_amounts}
+
+    @_prebuilt
+    def transaction_keys_stmt(self):
+        """Statement of `iter_transaction_keys`."""
+        transaction_table: Table = METADATA.tables["Transaction"]
+        return select(
+            transaction_table.columns["xref"],
+            transaction_table.columns["total_loan_amount"],
+        )
+
+    @_prebuilt
+    def broker_daily_loan_amounts_stmt(self):
+        """Statement of `iter_broker_daily_loan_amounts`."""
+        stmt = self.broker_loan_amounts_by_period_stmt("day")
+        return stmt.order_by(None).order_by(
+            stmt.selected_columns["broker"].asc(), stmt.selected_columns["period"].asc()
+        )
+
+    @_prebuilt
+    def broker_loan_amounts_by_period_stmt(self, period: str):
+        """Statement of `get_broker_loan_amounts_by_period`."""
+        if period not in _PERIODS:
+            raise ValueError(f"period should be one of {', '.join(_PERIODS)}.")
+        if self._use_rollups:
+            rollup_table: Table = METADATA.tables["BrokerDailyRollup"]
+            if period == "day":
+                # Amounts of a day are stored in descending order.
+                return select(
+                    rollup_table.columns["broker"],
+                    rollup_table.columns["settlement_date"].label("period"),
+                    rollup_table.columns["loan_amounts"],
+                ).order_by(rollup_table.columns["settlement_date"].asc())
+            # A row per loan amount, like `Transaction` table.
+            if _is_sqlite(self._engine.dialect):
+                amounts = func.json_each(
+                    rollup_table.columns["loan_amounts"]
+                ).table_valued("value")
+                source = (
+                    select(
+                        rollup_table.columns["broker"],
+                        rollup_table.columns["settlement_date"],
+                        amounts.columns["value"].label("total_loan_amount"),
+                    )
+                    .select_from(rollup_table.join(amounts, true()))
+                    .subquery()
+                )
+            else:
+                source = select(
+                    rollup_table.columns["broker"],
+                    rollup_table.columns["settlement_date"],
+                    func.unnest(rollup_table.columns["loan_amounts"]).label(
+                        "total_loan_amount"
+                    ),
+                ).subquery()
+        else:
+            source = METADATA.tables["Transaction"]
+        settlement_date = source.columns["settlement_date"]
+        amount = source.columns["total_loan_amount"]
+        if period == "day":
+            period_column = settlement_date
+        elif period == "week":
+            period_column = _week_start(settlement_date)
+        else:
+            period_column = cast(extract("month", settlement_date), Integer)
+        return (
+            select(
+                source.columns["broker"],
+                period_column.label("period"),
+                _sorted_loan_amounts(amount).label("loan_amounts"),
+            )
+            .group_by(source.columns["broker"], period_column)
+            .order_by(period_column.asc())
+        )
+
+
+def _column_arrays(batch: "RecordBatch", columns: Tuple[str, ...]) -> Dict[str, list]:
+    """Values of each column of a batch (array parameters of `_unnest_select`)."""
+    return {column: batch.column_values(column) for column in columns}
+
+
+def _unnest_select(dialect: Dialect, table: Table, columns: Tuple[str, ...]) -> str:
+    """`select` of rows formed from an array parameter per column.
+
+    eg: select * from unnest(cast(:xref as BIGINT[]), cast(:total_loan_amount as
+        FLOAT[])) as rows(xref, total_loan_amount)
+    """
+    arrays: str = ", ".join(
+        f"cast(:{column} as {table.columns[column].type.compile(dialect)}[])"
+        for column in columns
+    )
+    return f"select * from unnest({arrays}) as rows({', '.join(columns)})"
+
+
+def _periods_table(dialect: Dialect):
+    """Rows of (1 based position, start-date, end-date) of periods, from an array
+    parameter per column (a json parameter on sqlite, see `Query.loan_amounts_params`).
+    """
+    if _is_sqlite(dialect):
+        rows = func.json_each(bindparam("periods", type_=String)).table_valued(
+            "key", "value"
+        )
+        return select(
+            (rows.columns["key"] + 1).label("position"),
+            func.json_extract(rows.columns["value"], "$[0]").label("start_date"),
+            func.json_extract(rows.columns["value"], "$[1]").label("end_date"),
+        ).subquery("periods")
+    return (
+        func.unnest(
+            cast(bindparam("start_dates", type_=ARRAY(Date)), ARRAY(Date)),
+            cast(bindparam("end_dates", type_=ARRAY(Date)), ARRAY(Date)),
+        )
+        .table_valued("start_date", "end_date", with_ordinality="position")
+        .render_derived(name="periods")
+    )
+
+
+def _batched(
+    transactions: Iterable[TransactionRecord], batch_size: int
+) -> Iterator[List[TransactionRecord]]:
+    """Split records to lists of `batch_size` without materialising all of them."""
+    iterator: Iterator[TransactionRecord] = iter(transactions)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def _rollup_columns() -> Tuple:
+    """`Transaction` columns which rollups are computed from."""
+    transaction_table: Table = METADATA.tables["Transaction"]
+    return (
+        transaction_table.columns["broker"],
+        transaction_table.columns["settlement_date"],
+        transaction_table.columns["total_loan_amount"],
+    )
+
+
+@lru_cache(maxsize=None)
+def _record_insert_stmt(sqlite: bool, returning: bool):
+    """Insert of a single record (values are parameters), a duplicate (xref +
+    total-loan-amount) is not inserted, no error. Built once per dialect.
+    """
+    stmt = (
+        (sqlite_insert if sqlite else pg_insert)(METADATA.tables["Transaction"])
+        .values({column: bindparam(column) for column in _TRANSACTION_COLUMNS})
+        .on_conflict_do_nothing()
+    )
+    return stmt.returning(*_rollup_columns()) if returning else stmt
+
+
+@lru_cache(maxsize=None)
+def _rollup_upsert_stmts(sqlite: bool) -> Tuple:
+    """Upserts adding amounts to `BrokerDailyRollup` & `DailyRollup` rows, built once
+    per dialect.
+    """
+    insert_ = sqlite_insert if sqlite else pg_insert
+    broker_rollup_table: Table = METADATA.tables["BrokerDailyRollup"]
+    broker_stmt = insert_(broker_rollup_table)
+    broker_stmt = broker_stmt.on_conflict_do_update(
+        index_elements=["broker", "settlement_date"],
+        set_={
+            "total_loan_amount": broker_rollup_table.columns["total_loan_amount"]
+            + broker_stmt.excluded.total_loan_amount,
+            "loan_count": broker_rollup_table.columns["loan_count"]
+            + broker_stmt.excluded.loan_count,
+            # `max` of SQLite with 2 arguments is a scalar function.
+            "max_loan_amount": (func.max if sqlite else func.greatest)(
+                broker_rollup_table.columns["max_loan_amount"],
+                broker_stmt.excluded.max_loan_amount,
+            ),
+            "loan_amounts": literal_column(
+                _SQLITE_MERGE_LOAN_AMOUNTS if sqlite else _MERGE_LOAN_AMOUNTS
+            ),
+        },
+    )
+
+    daily_rollup_table: Table = METADATA.tables["DailyRollup"]
+    daily_stmt = insert_(daily_rollup_table)
+    daily_stmt = daily_stmt.on_conflict_do_update(
+        index_elements=["settlement_date"],
+        set_={
+            column: daily_rollup_table.columns[column] + daily_stmt.excluded[column]
+            for column in (
+                "total_loan_amount",
+                "loan_count",
+                "tier1",
+                "tier2",
+                "tier3",
+            )
+        },
+    )
+    return broker_stmt, daily_stmt
+
+
+def _tier(amount: float) -> Optional[str]:
+    """Tier of a loan amount, `None` if it is below all tiers."""
+    if amount > _TIER1_MIN_AMOUNT:
+        return "tier1"
+    if amount > _TIER2_MIN_AMOUNT:
+        return "tier2"
+    if amount > _TIER3_MIN_AMOUNT:
+        return "tier3"
+    return None
+
+
+def _tier_counts(amount) -> Tuple:
+    """Number of loans in each tier (aggregate columns `tier1`, `tier2` & `tier3`)."""
+    return (
+        func.count().filter(amount > _TIER1_MIN_AMOUNT).label("tier1"),
+        func.count()
+        .filter(and_(amount > _TIER2_MIN_AMOUNT, amount <= _TIER1_MIN_AMOUNT))
+        .label("tier2"),
+        func.count()
+        .filter(and_(amount > _TIER3_MIN_AMOUNT, amount <= _TIER2_MIN_AMOUNT))
+        .label("tier3"),
+    )
+
+
+def _is_partitioned(conn: Connection) -> bool:
+    """`Transaction` table is a partitioned table."""
+    if _is_sqlite(conn.dialect):
+        return False
+    # Compared in database, `relkind` ("char") is returned as bytes by asyncpg.
+    return bool(
+        conn.execute(
+            text(
+                "select relkind = 'p' from pg_class "
+                "where oid = to_regclass('\"Transaction\"')"
+            )
+        ).scalar()
+    )
+
+
+def _create_month_partition(conn: Connection, month: date) -> None:
+    """Create partition of `Transaction` table for a month, if not created already."""
+    month = month.replace(day=1)
+    next_month: date = (month + timedelta(days=31)).replace(day=1)
+    conn.execute(
+        text(
+            f'create table if not exists "{month.strftime(_PARTITION_NAME_FORMAT)}" '
+            f"partition of \"Transaction\" for values from ('{month}') "
+            f"to ('{next_month}')"
+        )
+    )
+
+
+def _is_sqlite(dialect: Dialect) -> bool:
+    """Database is an embedded SQLite database (see `Init.sqlite`)."""
+    return dialect.name == "sqlite"
+
+
+def _dialect_insert(dialect: Dialect):
+    """`insert` with `on_conflict_do_*` methods of the dialect."""
+    return sqlite_insert if _is_sqlite(dialect) else pg_insert
+
+
+def _isolation_level(dialect: Dialect) -> str:
+    """Isolation level of a transaction (engine is in autocommit mode)."""
+    return (
+        _SQLITE_ISOLATION_LEVEL if _is_sqlite(dialect) else TRANSACTION_ISOLATION_LEVEL
+    )
+
+
+def _check_partitioning(dialect: Dialect) -> None:
+    """Monthly partitions are a PostgreSQL feature."""
+    if _is_sqlite(dialect):
+        raise ValueError("partition_by_month needs a PostgreSQL database.")
+
+
+def _set_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    """Set `_SQLITE_PRAGMAS` on a new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+# Dialect specific sql of aggregates & dates, statements are built without an engine
+# (eg: by `AsyncQuery`) and compiled to the dialect they are executed on.
+
+
+class _loan_amounts(FunctionElement):
+    """Loan amounts of a group as an array."""
+
+    type = LOAN_AMOUNTS_TYPE
+    inherit_cache = True
+
+
+class _sorted_loan_amounts(_loan_amounts):
+    """Loan amounts of a group as an array, in descending order."""
+
+    inherit_cache = True
+
+
+class _week_start(FunctionElement):
+    """First day (monday) of the week of a date."""
+
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(_loan_amounts)
+def _compile_loan_amounts(element: _loan_amounts, compiler, **kw) -> str:
+    return f"array_agg({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(_sorted_loan_amounts)
+def _compile_sorted_loan_amounts(element: _sorted_loan_amounts, compiler, **kw) -> str:
+    amount: str = compiler.process(element.clauses, **kw)
+    return f"array_agg({amount} order by {amount} desc)"
+
+
+@compiles(_loan_amounts, "sqlite")
+@compiles(_sorted_loan_amounts, "sqlite")
+def _compile_sqlite_loan_amounts(element: _loan_amounts, compiler, **kw) -> str:
+    # Sorted while reading (see `models.py`).
+    return f"json_group_array({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(_week_start)
+def _compile_week_start(element: _week_start, compiler, **kw) -> str:
+    return (
+        f"cast(date_trunc('week', {compiler.process(element.clauses, **kw)}) as date)"
+    )
+
+
+@compiles(_week_start, "sqlite")
+def _compile_sqlite_week_start(element: _week_start, compiler, **kw) -> str:
+    # Next sunday (same day if it is a sunday), 6 days before it.
+    return f"date({compiler.process(element.clauses, **kw)}, 'weekday 0', '-6 days')"
@@ -0,0 +1,17 @@
+"""Fixtures shared by test modules."""
+from typing import List
+import os
+
+import pytest
+
+from pdfparser.datastructure import TransactionRecord
+from pdfparser.pdf_parser import PDFParser
+
+PDF_PATH: str = os.path.join(os.path.dirname(__file__), "transaction.pdf")
+
+
+@pytest.fixture(scope="session")
+def records() -> List[TransactionRecord]:
+    """Records of the sample statement (positional engine, no Java needed)."""
+    with open(PDF_PATH, "rb") as file:
+        return PDFParser(file, engine="positional").parse()
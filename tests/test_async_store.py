@@ -0,0 +1,86 @@
+"""Async apis on a partitioned PostgreSQL database.
+
+Skipped unless `PDFPARSER_TEST_POSTGRES_URL` is set to a server (eg:
+`postgresql://postgres@localhost/postgres`), a throwaway database is created on it.
+"""
+from typing import Iterator, List
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import Engine, create_engine, text
+from sqlalchemy.engine import make_url, URL
+
+from pdfparser.datastructure import TransactionRecord, InsertSummary
+from pdfparser.store import Init
+
+asyncpg = pytest.importorskip("asyncpg")
+from pdfparser.async_store import AsyncMutation  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine  # noqa: E402
+
+SERVER_URL: str = os.environ.get("PDFPARSER_TEST_POSTGRES_URL", "")
+DB_NAME: str = "pdfparser_test_async"
+
+pytestmark = pytest.mark.skipif(
+    not SERVER_URL, reason="PDFPARSER_TEST_POSTGRES_URL is not set."
+)
+
+
+@pytest.fixture
+def db_url() -> Iterator[URL]:
+    server: Engine = create_engine(SERVER_URL, isolation_level="AUTOCOMMIT")
+    with server.connect() as conn:
+        conn.execute(text(f"drop database if exists {DB_NAME} with (force)"))
+        conn.execute(text(f"create database {DB_NAME}"))
+    url: URL = make_url(SERVER_URL).set(database=DB_NAME)
+    engine: Engine = create_engine(url)
+    Init._create_tables(engine, partition_by_month=True)
+    engine.dispose()
+    yield url
+    with server.connect() as conn:
+        conn.execute(text(f"drop database {DB_NAME} with (force)"))
+    server.dispose()
+
+
+@pytest.mark.parametrize(
+    "method, options",
+    [
+        ("insert_transactions", {}),
+        ("bulk_insert_transactions", {"batch_size": 16}),
+        ("bulk_insert_transactions", {"batch_size": 16, "use_copy": True}),
+    ],
+)
+def test_insert_on_partitioned_table(
+    db_url, records: List[TransactionRecord], method, options
+):
+    engine: AsyncEngine = create_async_engine(
+        db_url.set(drivername="postgresql+asyncpg"), isolation_level="AUTOCOMMIT"
+    )
+
+    async def insert() -> None:
+        mutation: AsyncMutation = AsyncMutation(engine, maintain_rollups=True)
+        summary = await getattr(mutation, method)(records, **options)
+        # Duplicates are skipped across partitions.
+        duplicates = await getattr(mutation, method)(records[:10], **options)
+        await engine.dispose()
+        if isinstance(summary, InsertSummary):
+            assert summary == InsertSummary(inserted=len(records), skipped=0)
+            assert duplicates == InsertSummary(inserted=0, skipped=10)
+
+    asyncio.run(insert())
+
+    sync_engine: Engine = create_engine(db_url)
+    with sync_engine.connect() as conn:
+        counts: List[int] = [
+            conn.execute(text(f'select count(*) from "{table}"')).scalar()
+            for table in ["Transaction", "TransactionKey"]
+        ]
+        assert counts == [len(records), len(records)]
+        assert conn.execute(
+            text(
+                "select count(*) from pg_inherits "
+                "where inhparent = to_regclass('\"Transaction\"')"
+            )
+        ).scalar()
+        assert conn.execute(text('select count(*) from "DailyRollup"')).scalar()
+    sync_engine.dispose()
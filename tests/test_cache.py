@@ -0,0 +1,128 @@
+"""`QueryCache` eviction, expiry & invalidation (no database needed)."""
+from typing import Any, Callable, List
+from datetime import date
+
+import pytest
+
+from pdfparser import cache as cache_module
+from pdfparser.cache import QueryCache
+from pdfparser.datastructure import CacheStats
+
+OCT_1: date = date(2023, 10, 1)
+OCT_10: date = date(2023, 10, 10)
+OCT_20: date = date(2023, 10, 20)
+
+
+def _compute(calls: List[Any], value: Any) -> Callable[[], Any]:
+    """`compute` which records its calls."""
+
+    def compute() -> Any:
+        calls.append(value)
+        return value
+
+    return compute
+
+
+@pytest.fixture
+def clock(monkeypatch) -> List[float]:
+    """Controllable monotonic clock of the cache module."""
+    now: List[float] = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_hit_and_miss():
+    cache: QueryCache = QueryCache()
+    calls: List[Any] = []
+
+    assert cache.get_or_compute(("a",), _compute(calls, 1)) == 1
+    assert cache.get_or_compute(("a",), _compute(calls, 2)) == 1
+    assert calls == [1]
+    assert cache.stats == CacheStats(hits=1, misses=1)
+
+
+def test_least_recently_used_is_evicted():
+    cache: QueryCache = QueryCache(max_size=2)
+    calls: List[Any] = []
+    cache.get_or_compute(("a",), _compute(calls, "a"))
+    cache.get_or_compute(("b",), _compute(calls, "b"))
+    # `a` is used again, `b` is the least recently used.
+    cache.get_or_compute(("a",), _compute(calls, "a"))
+    cache.get_or_compute(("c",), _compute(calls, "c"))
+
+    cache.get_or_compute(("a",), _compute(calls, "a"))
+    cache.get_or_compute(("b",), _compute(calls, "b"))
+    assert calls == ["a", "b", "c", "b"]
+    assert cache.stats.evictions == 2
+
+
+def test_max_size_should_be_positive():
+    with pytest.raises(ValueError):
+        QueryCache(max_size=0)
+
+
+def test_expired_value_is_computed_again(clock):
+    cache: QueryCache = QueryCache(ttl=60)
+    calls: List[Any] = []
+    cache.get_or_compute(("a",), _compute(calls, 1))
+
+    clock[0] += 59
+    assert cache.get_or_compute(("a",), _compute(calls, 2)) == 1
+    clock[0] += 1
+    assert cache.get_or_compute(("a",), _compute(calls, 3)) == 3
+    assert calls == [1, 3]
+
+
+def test_invalidation_is_targeted():
+    cache: QueryCache = QueryCache()
+    calls: List[Any] = []
+
+    def fill() -> None:
+        cache.get_or_compute(("period",), _compute(calls, "period"), (OCT_1, OCT_10))
+        cache.get_or_compute(("broker",), _compute(calls, "broker"), brokers=["x"])
+        cache.get_or_compute(("report",), _compute(calls, "report"))
+
+    fill()
+    # Outside the period, other broker: only values of all records are removed.
+    cache.invalidate([OCT_20], ["y"])
+    fill()
+    assert calls == ["period", "broker", "report", "report"]
+
+    calls.clear()
+    cache.invalidate([OCT_10], ["y"])
+    fill()
+    assert calls == ["period", "report"]
+
+    calls.clear()
+    cache.invalidate([OCT_20], ["x"])
+    fill()
+    assert calls == ["broker", "report"]
+    assert cache.stats.invalidations == 5
+
+
+def test_nothing_is_invalidated_without_inserted_records():
+    cache: QueryCache = QueryCache()
+    cache.get_or_compute(("report",), lambda: 1)
+    cache.invalidate([], [])
+    assert cache.stats.invalidations == 0
+
+
+def test_value_computed_across_invalidation_is_not_cached():
+    cache: QueryCache = QueryCache()
+
+    def compute() -> str:
+        # Records are inserted while the value is read.
+        cache.invalidate([OCT_1], [])
+        return "stale"
+
+    assert cache.get_or_compute(("a",), compute) == "stale"
+    assert cache.get_or_compute(("a",), lambda: "fresh") == "fresh"
+
+
+def test_clear():
+    cache: QueryCache = QueryCache()
+    calls: List[Any] = []
+    cache.get_or_compute(("a",), _compute(calls, 1))
+    cache.clear()
+    cache.get_or_compute(("a",), _compute(calls, 2))
+    assert calls == [1, 2]
@@ -0,0 +1,99 @@
+"""`Deduplicator` & key indexes, stored keys are given by a stub query (no database)."""
+from typing import List, Set, Tuple
+from dataclasses import replace
+
+import numpy as np
+
+from pdfparser.datastructure import TransactionRecord, DedupSummary, DuplicateRow
+from pdfparser.dedup import Deduplicator, ExactKeyIndex, BloomKeyIndex
+from pdfparser.record_batch import RecordBatch
+from tests.test_record_batch import RECORD
+
+RECORDS: List[TransactionRecord] = [
+    RECORD,
+    replace(RECORD, xref=2),
+    # Same key as first record, other fields differ.
+    replace(RECORD, broker="Aagam Pabari"),
+    replace(RECORD, xref=3, total_loan_amount=1.5),
+    replace(RECORD, xref=2),
+]
+
+
+class StubQuery:
+    """Stored keys of `Query.get_stored_keys`."""
+
+    def __init__(self, keys: Set[Tuple[int, float]]) -> None:
+        self.keys: Set[Tuple[int, float]] = keys
+        self.calls: int = 0
+
+    def get_stored_keys(
+        self, xrefs: List[int], total_loan_amounts: List[float]
+    ) -> Set[Tuple[int, float]]:
+        self.calls += 1
+        return self.keys & set(zip(xrefs, total_loan_amounts))
+
+
+def _keys(records: List[TransactionRecord]) -> Tuple[np.ndarray, np.ndarray]:
+    batch: RecordBatch = RecordBatch.from_records(records)
+    return batch.xref, batch.total_loan_amount
+
+
+def test_repeated_records_are_collapsed():
+    records, summary = Deduplicator(StubQuery(set()), ExactKeyIndex()).dedup(RECORDS)
+
+    assert records.to_records() == [RECORDS[0], RECORDS[1], RECORDS[3]]
+    assert summary == DedupSummary(
+        rows=5,
+        in_batch=2,
+        duplicates=[
+            DuplicateRow(row_number=3, reason="Duplicate of row 1."),
+            DuplicateRow(row_number=5, reason="Duplicate of row 2."),
+        ],
+    )
+
+
+def test_stored_records_are_removed():
+    index: ExactKeyIndex = ExactKeyIndex()
+    index.add(*_keys(RECORDS[3:4]))
+    deduplicator: Deduplicator = Deduplicator(StubQuery(set()), index)
+
+    records, summary = deduplicator.dedup(RECORDS[1:4])
+
+    assert records.to_records() == RECORDS[1:3]
+    assert summary.stored == 1
+    assert summary.duplicates == [DuplicateRow(row_number=3, reason="Already stored.")]
+
+    # Keys of inserted records are added to index.
+    deduplicator.add(records)
+    assert len(deduplicator.dedup(RECORDS)[0]) == 0
+
+
+def test_bloom_false_positives_are_checked_in_database():
+    index: BloomKeyIndex = BloomKeyIndex(capacity=10)
+    # Every key is reported, only the stored one should be removed.
+    index._bits[:] = 0xFF
+    query: StubQuery = StubQuery({(RECORD.xref, RECORD.total_loan_amount)})
+
+    records, summary = Deduplicator(query, index).dedup(RECORDS[:2])
+
+    assert records.to_records() == RECORDS[1:2]
+    assert (summary.stored, summary.false_positives, query.calls) == (1, 1, 1)
+
+
+def test_bloom_index_has_no_false_negatives():
+    xrefs: np.ndarray = np.arange(10_000, dtype=np.int64)
+    amounts: np.ndarray = xrefs * 0.5
+    index: BloomKeyIndex = BloomKeyIndex(capacity=10_000, false_positive_rate=0.01)
+    index.add(xrefs, amounts)
+
+    assert index.might_contain(xrefs, amounts).all()
+    # Far from 1% apart from chance.
+    assert index.might_contain(xrefs + 10_000, amounts).mean() < 0.03
+    assert index.nbytes < 10_000 * 2
+
+
+def test_empty_records():
+    records, summary = Deduplicator(StubQuery(set()), ExactKeyIndex()).dedup([])
+
+    assert len(records) == 0
+    assert summary == DedupSummary()
@@ -0,0 +1,121 @@
+"""Command line interface & settings, on an embedded SQLite database."""
+from typing import List
+import os
+import subprocess
+import sys
+
+import pytest
+
+from pdfparser.datastructure import DatabaseSettings, PoolSettings, TransactionRecord
+from pdfparser.settings import get_database_settings
+from pdfparser.store import Init, Mutation
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules which query & report commands should not load.
+HEAVY_MODULES: List[str] = ["pandas", "numpy", "tabula", "jpype", "PyPDF2"]
+
+
+@pytest.fixture
+def env_file(tmp_path, records: List[TransactionRecord]) -> str:
+    db_constructor: Init = Init.sqlite(str(tmp_path / "transaction.db"))
+    db_constructor.create_db()
+    engine = db_constructor.create_engine()
+    Mutation(engine).bulk_insert_transactions(records)
+    engine.dispose()
+    path: str = str(tmp_path / ".env")
+    with open(path, "w") as file:
+        file.write(
+            f"# Embedded database\nPDFPARSER_SQLITE_PATH={tmp_path}/transaction.db\n"
+        )
+    return path
+
+
+def _run(env_file: str, *argv: str, light: bool = True) -> str:
+    """Stdout of a command, unless `light` is unset it should not load
+    `HEAVY_MODULES`.
+    """
+    code: str = "import sys\nfrom pdfparser.main import main\nmain(sys.argv[1:])\n"
+    if light:
+        code += (
+            f"loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]\n"
+            "assert not loaded, loaded\n"
+        )
+    environ: dict = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.startswith("PDFPARSER_")
+    }
+    return subprocess.run(
+        [sys.executable, "-c", code, "--env-file", env_file, *argv],
+        cwd=ROOT,
+        env=environ,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def test_query_commands(env_file):
+    assert float(
+        _run(env_file, "query", "loan-amount", "2023-10-17", "2023-10-25")
+    ) == (pytest.approx(1176340.4))
+    assert _run(env_file, "query", "max-by-broker", "Cheston La'Porte") == "59060.2\n"
+
+
+def test_report_commands(env_file, tmp_path):
+    lines: List[str] = _run(
+        env_file, "report", "tier", "--format", "jsonl"
+    ).splitlines()
+    assert lines[0] == (
+        '{"settlement_date": "2023-10-02", "tier1": 0, "tier2": 2, "tier3": 3}'
+    )
+    output: str = str(tmp_path / "broker.json")
+    assert _run(env_file, "report", "broker", "--output", output) == ""
+    with open(output) as file:
+        assert file.read().startswith('{"Alexander Foldi": {"daily": ')
+
+
+def test_ingest_maintains_rollups(tmp_path):
+    path: str = str(tmp_path / ".env")
+    with open(path, "w") as file:
+        file.write(f"PDFPARSER_SQLITE_PATH={tmp_path}/transaction.db\n")
+    pdf_path: str = os.path.join(ROOT, "tests", "transaction.pdf")
+    assert "inserted" in _run(path, "ingest", pdf_path, light=False)
+
+    assert float(
+        _run(path, "query", "loan-amount", "2023-10-17", "2023-10-25", "--rollups")
+    ) == (pytest.approx(1176340.4))
+    lines: List[str] = _run(
+        path, "report", "tier", "--format", "jsonl", "--rollups"
+    ).splitlines()
+    assert lines[0] == (
+        '{"settlement_date": "2023-10-02", "tier1": 0, "tier2": 2, "tier3": 3}'
+    )
+
+
+def test_settings(tmp_path):
+    path: str = str(tmp_path / ".env")
+    with open(path, "w") as file:
+        file.write(
+            "export PDFPARSER_DB_USER=nick\n"
+            'PDFPARSER_DB_NAME="transaction_db"\n'
+            "PDFPARSER_DB_PORT=5433\n"
+        )
+
+    # Environment variables take precedence over the file.
+    assert get_database_settings(path, {"PDFPARSER_DB_HOST": "db"}) == (
+        DatabaseSettings("nick", "", "db", 5433, "transaction_db")
+    )
+    with pytest.raises(ValueError):
+        get_database_settings(str(tmp_path / "missing.env"), {})
+
+    pool: dict = {
+        "PDFPARSER_POOL_SIZE": "20",
+        "PDFPARSER_POOL_PRE_PING": "true",
+        "PDFPARSER_PREPARE_THRESHOLD": "5",
+    }
+    assert get_database_settings(path, pool).pool == PoolSettings(
+        size=20, pre_ping=True, prepare_threshold=5
+    )
+    with pytest.raises(ValueError):
+        get_database_settings(path, {"PDFPARSER_POOL_RECYCLE": "1h"})
@@ -0,0 +1,77 @@
+"""`MetricsRegistry` totals & export, stages recorded by `PDFParser`."""
+from typing import List, Tuple
+import os
+
+import pytest
+
+from pdfparser.datastructure import StageMetrics
+from pdfparser.metrics import MetricsRegistry, stage
+from pdfparser.pdf_parser import PDFParser
+
+PDF_PATH: str = os.path.join(os.path.dirname(__file__), "transaction.pdf")
+
+
+def test_calls_are_added_to_totals():
+    metrics: MetricsRegistry = MetricsRegistry()
+    for rows in (3, 4):
+        with stage(metrics, "parse.convert") as timer:
+            timer.rows = rows
+            timer.failures = 1
+
+    total: StageMetrics = metrics.snapshot()["parse.convert"]
+    assert (total.calls, total.rows, total.failures) == (2, 7, 2)
+    assert total.seconds > 0
+
+
+def test_failed_call_is_counted():
+    metrics: MetricsRegistry = MetricsRegistry()
+    with pytest.raises(ValueError):
+        with stage(metrics, "parse.extract"):
+            raise ValueError()
+
+    assert metrics.snapshot()["parse.extract"].failures == 1
+
+
+def test_callbacks_get_metrics_of_each_call():
+    calls: List[Tuple[str, int]] = []
+    metrics: MetricsRegistry = MetricsRegistry(
+        callbacks=[lambda name, call: calls.append((name, call.duplicates))]
+    )
+    with stage(metrics, "mutation.insert_transactions") as timer:
+        timer.duplicates = 2
+
+    assert calls == [("mutation.insert_transactions", 2)]
+
+
+def test_disabled_metrics_record_nothing():
+    with stage(None, "parse.convert") as timer:
+        timer.rows = 3
+    with stage(None, "parse.convert") as other_timer:
+        pass
+
+    # Shared timer, nothing is kept.
+    assert other_timer is timer
+
+
+def test_prometheus_export():
+    metrics: MetricsRegistry = MetricsRegistry()
+    with stage(metrics, 'query."quoted"') as timer:
+        timer.rows = 5
+
+    text: str = metrics.to_prometheus()
+    assert "# TYPE pdfparser_stage_rows_total counter\n" in text
+    assert 'pdfparser_stage_rows_total{stage="query.\\"quoted\\""} 5\n' in text
+    assert 'pdfparser_stage_calls_total{stage="query.\\"quoted\\""} 1\n' in text
+
+    metrics.reset()
+    assert "{stage=" not in metrics.to_prometheus()
+
+
+def test_parser_stages():
+    metrics: MetricsRegistry = MetricsRegistry()
+    with open(PDF_PATH, "rb") as file:
+        records = PDFParser(file, engine="positional", metrics=metrics).parse()
+
+    totals = metrics.snapshot()
+    assert totals["parse.validate"].bytes_read == os.path.getsize(PDF_PATH)
+    assert totals["parse.extract"].rows == len(records) == 84
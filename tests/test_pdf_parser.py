@@ -0,0 +1,114 @@
+"""Every way of parsing the sample statement gives the same records as `parse`."""
+from typing import List
+from dataclasses import replace
+import io
+import os
+import shutil
+
+import pytest
+
+from pdfparser import extractor as extractor_module
+from pdfparser.datastructure import TransactionRecord
+from pdfparser.extractor import WarmExtractor
+from pdfparser.pdf_parser import PDFParser
+from pdfparser.preflight import preflight
+
+PDF_PATH: str = os.path.join(os.path.dirname(__file__), "transaction.pdf")
+
+requires_java = pytest.mark.skipif(
+    shutil.which("java") is None and "JAVA_HOME" not in os.environ,
+    reason="tabula requires Java.",
+)
+
+
+def _parse(engine: str = "tabula") -> List[TransactionRecord]:
+    with open(PDF_PATH, "rb") as file:
+        return PDFParser(file, engine=engine).parse()
+
+
+@pytest.fixture(scope="module")
+def records() -> List[TransactionRecord]:
+    if shutil.which("java") is None and "JAVA_HOME" not in os.environ:
+        pytest.skip("tabula requires Java.")
+    return _parse()
+
+
+@requires_java
+def test_parse(records):
+    assert len(records) == 84
+    assert records[0].app_id == 80185884
+    assert records[0].xref == 100305936
+
+
+@requires_java
+@pytest.mark.parametrize("batch_pages", [1, 2, 10])
+def test_iter_records_equals_parse(records, batch_pages):
+    with open(PDF_PATH, "rb") as file:
+        assert list(PDFParser(file).iter_records(batch_pages=batch_pages)) == records
+
+
+@requires_java
+def test_parse_batch_equals_parse(records):
+    with open(PDF_PATH, "rb") as file:
+        assert PDFParser(file).parse_batch().to_records() == records
+
+
+@requires_java
+def test_parse_parallel_equals_parse(records):
+    with open(PDF_PATH, "rb") as file:
+        assert PDFParser(file).parse_parallel(workers=2, shard_pages=1) == records
+
+
+@requires_java
+def test_positional_engine_equals_tabula(records):
+    expected: List[TransactionRecord] = [
+        # Tabula keeps an empty sub broker cell as "", positional engine as `None`.
+        replace(record, sub_broker=record.sub_broker or None)
+        for record in records
+    ]
+    # Tabula joins last word of the name with description, positional engine
+    # separates them by column position.
+    assert (expected[16].borrower_name, expected[16].description) == (
+        "ANGELA PATRICIA URDANETA",
+        "CHAVEZUpfront Commission",
+    )
+    expected[16] = replace(
+        expected[16],
+        borrower_name="ANGELA PATRICIA URDANETA CHAVEZ",
+        description="Upfront Commission",
+    )
+
+    assert _parse("positional") == expected
+
+
+def test_positional_engine_parse_parallel():
+    with open(PDF_PATH, "rb") as file:
+        parser: PDFParser = PDFParser(file, engine="positional")
+        assert parser.parse_parallel(workers=2, shard_pages=1) == _parse("positional")
+
+
+def test_parse_parallel_of_nameless_file():
+    with open(PDF_PATH, "rb") as file:
+        content: io.BytesIO = io.BytesIO(file.read())
+    # Checked upload (no file name).
+    parser: PDFParser = PDFParser(
+        content, engine="positional", preflight=preflight(content)
+    )
+    assert parser.parse_parallel(workers=2, shard_pages=1) == _parse("positional")
+
+
+@requires_java
+def test_warm_extractor_fails_over_to_worker(records, monkeypatch):
+    extractor: WarmExtractor = WarmExtractor()
+    extractor.start()
+    assert extractor.is_healthy()
+
+    # Java runtime of the process stops answering, extraction moves to a worker.
+    monkeypatch.setattr(extractor_module, "_is_java_alive", lambda: False)
+    assert not extractor.is_healthy()
+    try:
+        with open(PDF_PATH, "rb") as file:
+            assert PDFParser(file, extractor=extractor).parse() == records
+        assert extractor.is_healthy()
+    finally:
+        extractor.close()
@@ -0,0 +1,93 @@
+"""`preflight` reads the same page count & column positions as PyPDF2, rejects
+invalid files, and its result is reused by `PDFParser`.
+"""
+from typing import List
+import io
+import os
+
+import pytest
+from PyPDF2 import PdfReader, PdfWriter
+
+from pdfparser.datastructure import PreflightResult
+from pdfparser.metrics import MetricsRegistry
+from pdfparser.pdf_parser import PDFParser
+from pdfparser.positional_extractor import PositionalExtractor
+from pdfparser.preflight import preflight, preflight_files
+
+PDF_PATH: str = os.path.join(os.path.dirname(__file__), "transaction.pdf")
+
+
+@pytest.fixture(scope="module")
+def content() -> bytes:
+    with open(PDF_PATH, "rb") as file:
+        return file.read()
+
+
+def test_preflight_equals_pdf_reader(content):
+    reader: PdfReader = PdfReader(PDF_PATH)
+    with open(PDF_PATH, "rb") as file:
+        file.seek(10)
+        result: PreflightResult = preflight(file)
+        assert file.tell() == 10
+
+    assert result == PreflightResult(
+        page_count=len(reader.pages),
+        size=len(content),
+        column_starts=PositionalExtractor._locate_header(reader.pages[0]),
+    )
+    # Not a file on disk (eg: an upload).
+    assert preflight(io.BytesIO(content)) == result
+
+
+def test_unsupported_structure_is_read_by_pdf_reader(content):
+    # Offset of cross-reference table is wrong, PyPDF2 rebuilds it.
+    position: int = content.rindex(b"startxref")
+    broken: bytes = content[:position] + b"startxref\n1\n%%EOF\n"
+
+    result: PreflightResult = preflight(io.BytesIO(broken))
+    expected: PreflightResult = preflight(io.BytesIO(content))
+    assert result.page_count == expected.page_count
+    assert result.column_starts == expected.column_starts
+
+
+@pytest.mark.parametrize("size", [0, 50_000])
+def test_invalid_files_are_rejected(content, size):
+    # Empty or truncated upload.
+    with pytest.raises(TypeError, match="Invalid pdf format."):
+        preflight(io.BytesIO(content[:size]))
+
+
+def test_files_without_columns_are_rejected():
+    writer: PdfWriter = PdfWriter()
+    writer.add_blank_page(612, 792)
+    file: io.BytesIO = io.BytesIO()
+    writer.write(file)
+
+    with pytest.raises(TypeError, match="pdf does not contain all required columns."):
+        preflight(file)
+
+
+def test_preflight_files(tmp_path):
+    empty: str = str(tmp_path / "empty.pdf")
+    open(empty, "wb").close()
+    missing: str = str(tmp_path / "missing.pdf")
+
+    results, errors = preflight_files([PDF_PATH, empty, missing])
+    assert list(results) == [PDF_PATH]
+    assert errors[empty] == "TypeError: Invalid pdf format."
+    assert errors[missing].startswith("FileNotFoundError")
+
+
+def test_parse_reuses_preflight():
+    with open(PDF_PATH, "rb") as file:
+        expected: List = PDFParser(file, engine="positional").parse()
+        result: PreflightResult = preflight(file)
+        metrics: MetricsRegistry = MetricsRegistry()
+        parser: PDFParser = PDFParser(
+            file, engine="positional", metrics=metrics, preflight=result
+        )
+
+        assert parser.parse() == expected
+        assert parser.page_count == result.page_count
+    # File is not validated again.
+    assert "parse.validate" not in metrics.snapshot()
@@ -0,0 +1,114 @@
+"""`RecordBatch` columns & row views match the records they are formed from."""
+from typing import List
+from dataclasses import replace
+from datetime import date
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pdfparser.datastructure import TransactionRecord
+from pdfparser.pdf_parser import PDFParser
+from pdfparser.record_batch import RecordBatch
+from pdfparser.record_converter import RecordConverter
+from tests.test_record_converter import EDGE_ROWS
+
+PDF_PATH: str = os.path.join(os.path.dirname(__file__), "transaction.pdf")
+
+RECORD: TransactionRecord = TransactionRecord(
+    app_id=80185884,
+    xref=100305936,
+    settlement_date=date(2023, 10, 17),
+    broker="Cheston La'Porte",
+    sub_broker=None,
+    borrower_name="CHELSEA BIANCA VANDERAA",
+    description="Upfront Commission",
+    total_loan_amount=35890.0,
+    comm_rate=1.8,
+    upfront=646.02,
+    upfront_incl_gst=710.62,
+)
+RECORDS: List[TransactionRecord] = [
+    RECORD,
+    replace(RECORD, xref=100305937, sub_broker="Aagam Pabari", total_loan_amount=1.5),
+    replace(RECORD, xref=100305938, broker="".join(["Cheston ", "La'Porte"])),
+]
+
+
+def test_round_trip():
+    batch: RecordBatch = RecordBatch.from_records(RECORDS)
+
+    assert len(batch) == 3
+    assert batch.to_records() == RECORDS
+    assert list(batch) == RECORDS
+    assert batch[-1].xref == 100305938
+    assert batch[1].to_record() == RECORDS[1]
+
+
+def test_columns_are_typed():
+    batch: RecordBatch = RecordBatch.from_records(RECORDS)
+
+    assert batch.app_id.dtype == np.int64
+    assert batch.settlement_date.dtype == np.dtype("datetime64[D]")
+    assert batch.total_loan_amount.tolist() == [35890.0, 1.5, 35890.0]
+    assert batch.sub_broker.tolist() == [None, "Aagam Pabari", None]
+
+
+def test_repeated_strings_are_one_object():
+    batch: RecordBatch = RecordBatch.from_records(RECORDS)
+
+    # Third broker is built at runtime, a different object before interning.
+    assert RECORDS[2].broker is not RECORDS[0].broker
+    assert batch.broker[2] is batch.broker[0]
+
+
+def test_view_is_read_only():
+    view = RecordBatch.from_records(RECORDS)[0]
+
+    with pytest.raises(AttributeError):
+        view.broker = "other"
+    with pytest.raises(AttributeError):
+        view.missing
+
+
+def test_slices_and_chunks():
+    batch: RecordBatch = RecordBatch.from_records(RECORDS)
+
+    assert batch[1:].to_records() == RECORDS[1:]
+    assert [len(chunk) for chunk in batch.chunks(2)] == [2, 1]
+    assert RecordBatch.concat(batch.chunks(2)) == batch
+    assert batch.take(np.array([False, True, False])).to_records() == RECORDS[1:2]
+    assert len(RecordBatch.concat([])) == 0
+
+
+def test_columns_should_be_complete():
+    columns: dict = {"app_id": [1]}
+    with pytest.raises(ValueError):
+        RecordBatch(**columns)
+
+
+def test_pickle_keeps_records():
+    batch: RecordBatch = RecordBatch.from_records(RECORDS)
+    assert pickle.loads(pickle.dumps(batch)) == batch
+
+
+def test_converted_batch_equals_records():
+    table: pd.DataFrame = pd.DataFrame(EDGE_ROWS, dtype=object).reindex(
+        columns=range(22)
+    )
+    batch, rejected = RecordConverter(table).convert_batch()
+    records, _rejected = RecordConverter(table).convert()
+
+    assert rejected == []
+    assert batch.to_records() == records
+
+
+def test_parse_batch_equals_parse():
+    with open(PDF_PATH, "rb") as file:
+        records: List[TransactionRecord] = PDFParser(file, engine="positional").parse()
+    with open(PDF_PATH, "rb") as file:
+        batch: RecordBatch = PDFParser(file, engine="positional").parse_batch()
+
+    assert batch.to_records() == records
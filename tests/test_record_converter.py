@@ -0,0 +1,195 @@
+"""`RecordConverter` is checked against row by row conversion of the original
+`PDFParser._form_record`.
+"""
+from typing import List, Optional, Tuple
+from datetime import date
+import os
+import shutil
+
+import pandas as pd
+import pytest
+import tabula
+
+from pdfparser.datastructure import TransactionRecord, RejectedRow
+from pdfparser.pdf_parser import _PANDAS_OPTIONS
+from pdfparser.record_converter import RecordConverter
+
+PDF_PATH: str = os.path.join(os.path.dirname(__file__), "transaction.pdf")
+
+requires_java = pytest.mark.skipif(
+    shutil.which("java") is None and "JAVA_HOME" not in os.environ,
+    reason="tabula requires Java.",
+)
+
+
+def _form_record(cells: List[Optional[str]]) -> TransactionRecord:
+    """Row by row conversion of `PDFParser._form_record` (before `RecordConverter`),
+    empty cells are dropped & thousands separators are removed as it did.
+    """
+    data: List[str] = [cell for cell in cells if isinstance(cell, str) and cell]
+    app_id, xref = data[0].split(" ")
+    borrower_name, description = _form_borrower_name_and_description(data[-5])
+    sub_broker: Optional[str] = data[3] if len(data) == 9 else None
+    if not borrower_name and sub_broker:
+        borrower_name, sub_broker = _form_borrower_name_and_sub_broker(sub_broker)
+    day, month, year = data[1].split("/")
+    return TransactionRecord(
+        app_id=int(app_id),
+        xref=int(xref),
+        settlement_date=date(day=int(day), month=int(month), year=int(year)),
+        broker=data[2],
+        sub_broker=sub_broker,
+        borrower_name=borrower_name,
+        description=description,
+        total_loan_amount=float(data[-4].replace(",", "")),
+        comm_rate=float(data[-3].replace(",", "")),
+        upfront=float(data[-2].replace(",", "")),
+        upfront_incl_gst=float(data[-1].replace(",", "")),
+    )
+
+
+def _form_borrower_name_and_description(name_and_desc: str) -> Tuple[str, str]:
+    name_and_desc_split: List[str] = name_and_desc.split(" ")
+    for pos, sub_str in enumerate(name_and_desc_split):
+        if sub_str != sub_str.upper():
+            return (
+                " ".join(name_and_desc_split[:pos]),
+                " ".join(name_and_desc_split[pos:]),
+            )
+    raise ValueError(
+        f"Unable to find borrower-name & description from '{name_and_desc}'"
+    )
+
+
+def _form_borrower_name_and_sub_broker(sub_broker_and_name: str) -> Tuple[str, str]:
+    for pos in range(len(sub_broker_and_name) - 1, -1, -1):
+        if not sub_broker_and_name[pos].isalpha():
+            continue
+        if sub_broker_and_name[pos] != sub_broker_and_name[pos].upper():
+            return (
+                sub_broker_and_name[pos + 1 :].strip(),
+                sub_broker_and_name[: pos + 1].strip(),
+            )
+    return sub_broker_and_name, ""
+
+
+# Rows as extracted by tabula (`None` for empty cells).
+EDGE_ROWS: List[List[Optional[str]]] = [
+    # Sub broker merged with borrower name, name is missing before description.
+    [
+        "80185884 100305936",
+        "17/10/2023",
+        "Cheston La'Porte",
+        "Aagam Pabari ANJAN GUPTA",
+        None,
+        "Upfront Commission",
+        "35,890.00",
+        "1.80",
+        "646.02",
+        "710.62",
+    ],
+    # Sub broker merged without a space.
+    [
+        "80185885 100305937",
+        "18/10/2023",
+        "Cheston La'Porte",
+        "Rhiannon Clancy-BurnsSARA FLOWER",
+        "Upfront Commission",
+        "500,000.00",
+        "0.65",
+        "3,250.00",
+        "3,575.00",
+    ],
+    # Non-ASCII borrower name with description.
+    [
+        "80185886 100305938",
+        "19/10/2023",
+        "Broker Zoë",
+        None,
+        "ZOË MÜLLER-ÅSTRÖM Upfront Commission",
+        "45,000.00",
+        "0.65",
+        "292.50",
+        "321.75",
+    ],
+    # Non-ASCII sub broker merged with non-ASCII borrower name.
+    [
+        "80185887 100305939",
+        "20/10/2023",
+        "Broker",
+        "Renée DuboisJOSÉ ÁLVAREZ",
+        "Trail Commission",
+        "12,500.00",
+        "0.15",
+        "18.75",
+        "20.63",
+    ],
+    # Several groups of thousands separators.
+    [
+        "80185888 100305940",
+        "21/10/2023",
+        "Broker",
+        "Sub Broker",
+        "JOHN SMITH Upfront Commission",
+        "1,234,567.89",
+        "0.65",
+        "8,024.69",
+        "8,827.16",
+    ],
+]
+
+
+def _table(rows: List[List[Optional[str]]]) -> pd.DataFrame:
+    """Rows as a table of tabula (text cells, missing cells are `NaN`)."""
+    return pd.DataFrame(rows, dtype=object).reindex(columns=range(22))
+
+
+def test_edge_rows_match_row_by_row_conversion():
+    records, rejected = RecordConverter(_table(EDGE_ROWS)).convert()
+
+    assert rejected == []
+    assert records == [_form_record(row) for row in EDGE_ROWS]
+
+
+def test_edge_rows_are_split():
+    records, _rejected = RecordConverter(_table(EDGE_ROWS)).convert()
+
+    assert [(record.sub_broker, record.borrower_name) for record in records] == [
+        ("Aagam Pabari", "ANJAN GUPTA"),
+        ("Rhiannon Clancy-Burns", "SARA FLOWER"),
+        (None, "ZOË MÜLLER-ÅSTRÖM"),
+        ("Renée Dubois", "JOSÉ ÁLVAREZ"),
+        ("Sub Broker", "JOHN SMITH"),
+    ]
+    assert records[4].total_loan_amount == 1234567.89
+
+
+def test_invalid_rows_are_rejected_with_row_number():
+    rows: List[List[Optional[str]]] = [
+        EDGE_ROWS[4],
+        ["80185889", "21/10/2023", "Broker", "JOHN Upfront", "1", "1", "1", "1"],
+        EDGE_ROWS[4][:1] + ["2023-10-21"] + EDGE_ROWS[4][2:],
+        EDGE_ROWS[4][:5] + ["1.2.3"] + EDGE_ROWS[4][6:],
+        ["1 2", "21/10/2023"],
+    ]
+    records, rejected = RecordConverter(_table(rows), row_offset=10).convert()
+
+    assert records == [_form_record(EDGE_ROWS[4])]
+    assert rejected == [
+        RejectedRow(12, "Unformatted app-id & xref."),
+        RejectedRow(13, "Unformatted settlement date."),
+        RejectedRow(14, "Unformatted total loan amount."),
+        RejectedRow(15, "Unexpected number of fields."),
+    ]
+
+
+@requires_java
+def test_sample_statement_matches_row_by_row_conversion():
+    table: pd.DataFrame = tabula.read_pdf(
+        PDF_PATH, multiple_tables=False, pages="all", pandas_options=_PANDAS_OPTIONS
+    )[0]
+    records, rejected = RecordConverter(table).convert()
+
+    assert rejected == []
+    assert len(records) == len(table)
+    assert records == [_form_record(row) for row in table.values.tolist()]
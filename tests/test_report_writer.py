@@ -0,0 +1,118 @@
+"""`StreamingReportWriter` output, rows are given by a stub query (no database)."""
+from typing import Iterator, List
+from datetime import date
+import io
+import json
+
+import pytest
+
+from pdfparser.report_generator import SQLReportGenerator
+from pdfparser.report_writer import StreamingReportWriter
+
+# Rows of `Query.iter_broker_daily_loan_amounts` (ordered by broker & day).
+BROKER_DAYS: List[dict] = [
+    {"broker": "A", "period": date(2023, 10, 16), "loan_amounts": [30.0, 10.0]},
+    {"broker": "A", "period": date(2023, 10, 22), "loan_amounts": [20.0]},
+    {"broker": "A", "period": date(2023, 11, 1), "loan_amounts": [5.0]},
+    {"broker": "A", "period": date(2024, 10, 1), "loan_amounts": [25.0]},
+    {"broker": "B", "period": date(2023, 10, 17), "loan_amounts": [1.0]},
+]
+TOTALS: List[dict] = [
+    {"settlement_date": date(2023, 10, 16), "total_loan_amount": 40.0},
+    {"settlement_date": date(2023, 10, 17), "total_loan_amount": 1.0},
+]
+TIERS: List[dict] = [
+    {"settlement_date": date(2023, 10, 16), "tier1": 1, "tier2": 0, "tier3": 2},
+]
+
+
+class StubQuery:
+    """Rows of streaming `Query` methods."""
+
+    def iter_broker_daily_loan_amounts(self, _yield_per: int) -> Iterator[dict]:
+        return iter(BROKER_DAYS)
+
+    def iter_total_loan_amount_by_date(self, _yield_per: int) -> Iterator[dict]:
+        return iter(TOTALS)
+
+    def iter_tier_level_loan_count_by_date(self, _yield_per: int) -> Iterator[dict]:
+        return iter(TIERS)
+
+
+def _write(format: str, report: str) -> str:
+    out: io.StringIO = io.StringIO()
+    getattr(StreamingReportWriter(StubQuery(), format), f"write_{report}")(out)
+    return out.getvalue()
+
+
+def test_broker_report():
+    assert json.loads(_write("json", "broker_report")) == {
+        "A": {
+            "daily": {
+                "2023-10-16": [30.0, 10.0],
+                "2023-10-22": [20.0],
+                "2023-11-01": [5.0],
+                "2024-10-01": [25.0],
+            },
+            "weekly": {
+                # Calendar weeks (monday to sunday).
+                "2023-10-16 - 2023-10-22": [30.0, 20.0, 10.0],
+                "2023-10-30 - 2023-11-05": [5.0],
+                "2024-09-30 - 2024-10-06": [25.0],
+            },
+            # Same month of different years is one period.
+            "monthly": {"October": [30.0, 25.0, 20.0, 10.0], "November": [5.0]},
+        },
+        "B": {
+            "daily": {"2023-10-17": [1.0]},
+            "weekly": {"2023-10-16 - 2023-10-22": [1.0]},
+            "monthly": {"October": [1.0]},
+        },
+    }
+
+
+def test_broker_report_json_lines():
+    lines: List[dict] = [
+        json.loads(line) for line in _write("jsonl", "broker_report").splitlines()
+    ]
+
+    assert [line["broker"] for line in lines] == ["A", "B"]
+    assert lines[1] == {
+        "broker": "B",
+        "daily": {"2023-10-17": [1.0]},
+        "weekly": {"2023-10-16 - 2023-10-22": [1.0]},
+        "monthly": {"October": [1.0]},
+    }
+
+
+def test_total_loan_and_tier_level_reports():
+    assert json.loads(_write("json", "total_loan_report")) == (
+        SQLReportGenerator.form_total_loan_report(TOTALS)
+    )
+    assert json.loads(_write("json", "tier_level_report")) == (
+        SQLReportGenerator.form_tier_level_report(TIERS)
+    )
+    assert _write("jsonl", "total_loan_report").splitlines() == [
+        '{"settlement_date": "2023-10-16", "total_loan_amount": 40.0}',
+        '{"settlement_date": "2023-10-17", "total_loan_amount": 1.0}',
+    ]
+    assert json.loads(_write("jsonl", "tier_level_report")) == {
+        "settlement_date": "2023-10-16",
+        "tier1": 1,
+        "tier2": 0,
+        "tier3": 2,
+    }
+
+
+def test_empty_report():
+    writer: StreamingReportWriter = StreamingReportWriter(StubQuery())
+    writer._query.iter_total_loan_amount_by_date = lambda _yield_per: iter([])
+    out: io.StringIO = io.StringIO()
+
+    assert writer.write_total_loan_report(out) == 0
+    assert out.getvalue() == "{}"
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        StreamingReportWriter(StubQuery(), "xml")
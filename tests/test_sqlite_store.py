@@ -0,0 +1,166 @@
+"""Store apis & reports on an embedded SQLite database (`Init.sqlite`), records of
+the sample statement (no database server).
+"""
+from typing import Iterator, List
+from datetime import date
+import os
+
+import pytest
+from sqlalchemy import Engine
+
+from pdfparser.datastructure import InsertSummary, PoolSettings
+from pdfparser.report_generator import ReportGenerator, SQLReportGenerator
+from pdfparser.store import Init, Mutation, Query, dispose_engines
+
+
+@pytest.fixture
+def engine(tmp_path) -> Iterator[Engine]:
+    db_constructor: Init = Init.sqlite(str(tmp_path / "transaction.db"))
+    db_constructor.create_db()
+    engine: Engine = db_constructor.create_engine()
+    yield engine
+    engine.dispose()
+    db_constructor.drop_db()
+    assert not os.listdir(tmp_path)
+
+
+def test_duplicates_are_skipped(engine, records):
+    mutation: Mutation = Mutation(engine, maintain_rollups=True)
+    mutation.insert_transactions(records[:10] + records[:5])
+    summary: InsertSummary = mutation.bulk_insert_transactions(records, batch_size=7)
+
+    assert summary == InsertSummary(inserted=len(records) - 10, skipped=10)
+    assert Query(engine).get_transaction_count() == len(records)
+
+
+def test_queries_equal_on_transactions_and_rollups(engine, records):
+    Mutation(engine, maintain_rollups=True).bulk_insert_transactions(records)
+    query: Query = Query(engine)
+    rollup_query: Query = Query(engine, use_rollups=True)
+    period: tuple = (date(2023, 10, 17), date(2023, 10, 25))
+
+    assert query.get_loan_amount(*period) == pytest.approx(
+        sum(
+            record.total_loan_amount
+            for record in records
+            if period[0] <= record.settlement_date <= period[1]
+        )
+    )
+    assert rollup_query.get_loan_amount(*period) == pytest.approx(
+        query.get_loan_amount(*period)
+    )
+    broker: str = records[0].broker
+    assert query.get_highest_loan_amt_by_broker(broker) == max(
+        record.total_loan_amount for record in records if record.broker == broker
+    )
+    for period_name in ("day", "week", "month"):
+        assert _by_broker(query.get_broker_loan_amounts_by_period(period_name)) == (
+            _by_broker(rollup_query.get_broker_loan_amounts_by_period(period_name))
+        )
+
+
+def test_reports_equal_postgres_format(engine, records):
+    mutation: Mutation = Mutation(engine, maintain_rollups=True)
+    # Amounts of rollups are merged by second insert.
+    mutation.bulk_insert_transactions(records[::2])
+    mutation.bulk_insert_transactions(records)
+    query: Query = Query(engine)
+    merged: dict = SQLReportGenerator(
+        Query(engine, use_rollups=True)
+    ).generate_broker_report()
+    mutation.rebuild_rollups()
+    assert (
+        SQLReportGenerator(Query(engine, use_rollups=True)).generate_broker_report()
+        == merged
+    )
+
+    week: dict = SQLReportGenerator(query).generate_broker_report()["Cheston La'Porte"][
+        "weekly"
+    ]
+    # Calendar weeks (monday to sunday), amounts in descending order.
+    assert all(key[:10] <= key[-10:] for key in week)
+    assert all(amounts == sorted(amounts, reverse=True) for amounts in week.values())
+    for generator in (
+        SQLReportGenerator(query),
+        SQLReportGenerator(Query(engine, use_rollups=True)),
+        ReportGenerator(query),
+    ):
+        assert generator.generate_total_loan_report() == (
+            SQLReportGenerator(query).generate_total_loan_report()
+        )
+        assert generator.generate_tier_level_report() == (
+            SQLReportGenerator(query).generate_tier_level_report()
+        )
+
+
+def test_stored_keys(engine, records):
+    Mutation(engine).bulk_insert_transactions(records[:3])
+    keys: set = Query(engine).get_stored_keys(
+        [record.xref for record in records[:5]],
+        [record.total_loan_amount for record in records[:5]],
+    )
+    assert keys == {(record.xref, record.total_loan_amount) for record in records[:3]}
+
+
+@pytest.mark.parametrize("use_rollups", [False, True])
+def test_batch_queries_equal_single_queries(engine, records, use_rollups):
+    Mutation(engine, maintain_rollups=True).bulk_insert_transactions(records)
+    query: Query = Query(engine, use_rollups=use_rollups)
+    periods: List[tuple] = [
+        (date(2023, 10, 17), date(2023, 10, 25)),
+        (date(2000, 1, 1), date(2000, 12, 31)),
+        (date(2023, 10, 17), date(2023, 10, 25)),
+        (date(2023, 10, 1), date(2023, 10, 31)),
+    ]
+    brokers: List[str] = [records[0].broker, "Unknown broker"]
+
+    amounts: dict = query.get_loan_amounts(periods)
+    assert list(amounts) == list(dict.fromkeys(periods))
+    assert amounts[periods[1]] is None
+    for period in periods:
+        assert amounts[period] == pytest.approx(query.get_loan_amount(*period))
+    assert query.get_highest_loan_amt_by_brokers(brokers) == {
+        broker: query.get_highest_loan_amt_by_broker(broker) for broker in brokers
+    }
+    assert query.get_highest_loan_amt_by_brokers() == {
+        record.broker: query.get_highest_loan_amt_by_broker(record.broker)
+        for record in records
+    }
+    assert query.get_loan_amounts([]) == {}
+    assert query.get_highest_loan_amt_by_brokers([]) == {}
+
+
+def test_shared_engines_and_statements(tmp_path, records):
+    path: str = str(tmp_path / "transaction.db")
+    Init.sqlite(path).create_db()
+    engine: Engine = Init.sqlite(path).get_engine()
+    # Same database & pool settings share an engine.
+    assert Init.sqlite(path).get_engine() is engine
+    assert Init.sqlite(path, PoolSettings(size=2)).get_engine() is not engine
+    Mutation(engine, maintain_rollups=True).insert_transactions(records[:3])
+
+    query: Query = Query(engine)
+    assert query.loan_amount_stmt() is Query(engine).loan_amount_stmt()
+    assert query.loan_amount_stmt() is not Query(engine, True).loan_amount_stmt()
+    assert query.get_loan_amount(date(2000, 1, 1), date(2100, 1, 1)) == (
+        pytest.approx(sum(record.total_loan_amount for record in records[:3]))
+    )
+    assert query.get_highest_loan_amt_by_broker(records[0].broker) == max(
+        record.total_loan_amount
+        for record in records[:3]
+        if record.broker == records[0].broker
+    )
+    # Pooled connections of shared engines are closed.
+    dispose_engines()
+    Init.sqlite(path).drop_db()
+    assert not os.listdir(tmp_path)
+
+
+def test_partitions_need_postgres(tmp_path):
+    with pytest.raises(ValueError):
+        Init.sqlite(str(tmp_path / "transaction.db")).create_db(partition_by_month=True)
+
+
+def _by_broker(rows: List[dict]) -> dict:
+    """Rows keyed by (broker, period), row order of a period is not defined."""
+    return {(row["broker"], row["period"]): row["loan_amounts"] for row in rows}